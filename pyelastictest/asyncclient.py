@@ -0,0 +1,115 @@
+import itertools
+import threading
+
+from pyelastictest.client import ExtendedClient
+from pyelastictest.futures import Executor
+
+
+class AsyncClient(object):
+    """Runs :class:`~pyelastictest.client.ExtendedClient` calls in a pool of
+    worker threads and returns :class:`~pyelastictest.futures.Future`
+    instances for their results.
+
+    Any client method can be called on this class, for example
+    ``client.create_template(name, settings)`` or
+    ``client.bulk_index(index, doc_type, docs)``, and returns a future.
+    Calls are distributed across all node urls in a round-robin fashion.
+    Each worker thread keeps one client per node url, so connections are
+    kept alive and reused.
+
+    This allows a test suite to overlap I/O across many indexes and nodes,
+    while the harness itself supports the same Python versions as the
+    synchronous client.
+    """
+
+    def __init__(self, urls, workers=None, **client_options):
+        """Create the client and start its worker threads.
+
+        :param urls: A list of node urls, for example
+                     :attr:`Cluster.urls <pyelastictest.cluster.Cluster.urls>`.
+        :type urls: list
+        :param workers: The number of worker threads, defaults to four
+                        per node url.
+        :type workers: int
+        :param client_options: Keyword arguments passed to each
+                               :class:`~pyelastictest.client.ExtendedClient`.
+        """
+        self.urls = list(urls)
+        self.client_options = client_options
+        self._counter = itertools.count()
+        self._local = threading.local()
+        self._executor = Executor(workers or 4 * len(self.urls))
+
+    def next_client(self):
+        """Return the client for the next node url, which belongs to the
+        calling worker thread.
+
+        :rtype: :class:`~pyelastictest.client.ExtendedClient`
+        """
+        clients = getattr(self._local, 'clients', None)
+        if clients is None:
+            clients = self._local.clients = {}
+        url = self.urls[next(self._counter) % len(self.urls)]
+        client = clients.get(url)
+        if client is None:
+            client = clients[url] = ExtendedClient(
+                [url], **self.client_options)
+        return client
+
+    def _call(self, name, args, kw):
+        return getattr(self.next_client(), name)(*args, **kw)
+
+    def submit(self, name, *args, **kw):
+        """Call the client method `name` in the background.
+
+        :rtype: :class:`~pyelastictest.futures.Future`
+        """
+        return self._executor.submit(self._call, name, args, kw)
+
+    def run(self, func, *args, **kw):
+        """Call an arbitrary function in the background.
+
+        :rtype: :class:`~pyelastictest.futures.Future`
+        """
+        return self._executor.submit(func, *args, **kw)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not hasattr(ExtendedClient, name):
+            raise AttributeError(name)
+
+        def method(*args, **kw):
+            return self.submit(name, *args, **kw)
+        method.__name__ = name
+        return method
+
+    def wait_until_ready(self, cluster, timeout=30):
+        """Wait for a cluster to be ready in the background.
+
+        :param cluster: The cluster to wait for.
+        :type cluster: :class:`~pyelastictest.cluster.Cluster`
+        :param timeout: Time in seconds to wait for the cluster.
+        :type timeout: int
+        :rtype: :class:`~pyelastictest.futures.Future`
+        """
+        return self.run(cluster.wait_until_ready, timeout)
+
+    def setup_es(self, isolated, cluster=None, **kw):
+        """Call :meth:`Isolated.setup_es
+        <pyelastictest.isolated.Isolated.setup_es>` in the background.
+
+        :rtype: :class:`~pyelastictest.futures.Future`
+        """
+        return self.run(isolated.setup_es, cluster, **kw)
+
+    def teardown_es(self, isolated):
+        """Call :meth:`Isolated.teardown_es
+        <pyelastictest.isolated.Isolated.teardown_es>` in the background.
+
+        :rtype: :class:`~pyelastictest.futures.Future`
+        """
+        return self.run(isolated.teardown_es)
+
+    def close(self):
+        """Finish all pending calls and stop the worker threads.
+        """
+        self._executor.shutdown()
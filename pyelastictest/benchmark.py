@@ -0,0 +1,255 @@
+"""Benchmarks of the cluster lifecycle, test isolation and fixture loading.
+
+Run them via ``pyelastictest benchmark``. Each benchmark is run a number of
+times and the measurements are summarized with percentiles. The report can
+be stored as JSON and used as the baseline for later runs, which flags all
+measurements whose median got slower by more than a threshold.
+"""
+import json
+import logging
+import os
+import platform
+import time
+
+from pyelastictest.cache import get_es_version
+from pyelastictest.cache import write_json
+from pyelastictest.cluster import Cluster
+from pyelastictest.fixtures import FixtureLoader
+from pyelastictest.isolated import Isolated
+from pyelastictest.stats import summarize
+
+LOGGER = logging.getLogger('pyelastictest.benchmark')
+
+BENCHMARKS = {}
+
+#: Units of measurements where larger values are better.
+HIGHER_IS_BETTER = ('docs/s',)
+
+DEFAULTS = {
+    'sizes': (1, 3),
+    'indexes': 10,
+    'templates': 10,
+    'isolations': ('delete', 'snapshot', 'namespace'),
+    'docs': 10000,
+    'monitor_interval': None,
+}
+
+
+def register(func):
+    """Register a benchmark function, named after the function.
+
+    Benchmark functions are called with the number of runs and a dictionary
+    of options and return a list of `(name, samples, unit)` tuples.
+    """
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def _cluster(options, **kw):
+    cluster = Cluster(monitor_interval=options['monitor_interval'], **kw)
+    options['clusters'].append(cluster)
+    return cluster
+
+
+def _timed(func, *args, **kw):
+    begin = time.time()
+    func(*args, **kw)
+    return time.time() - begin
+
+
+@register
+def cold_start(runs, options):
+    """Start and stop clusters of each of the given `sizes`."""
+    results = []
+    for size in options['sizes']:
+        samples = []
+        for i in range(runs):
+            cluster = _cluster(options, size=size)
+            try:
+                samples.append(_timed(cluster.start))
+            finally:
+                cluster.terminate()
+        results.append(('cold_start_%s' % size, samples, 's'))
+    return results
+
+
+@register
+def node_restart(runs, options):
+    """Restart a single node of a two node cluster."""
+    cluster = _cluster(options, size=2)
+    samples = []
+    try:
+        cluster.start()
+        for i in range(runs):
+            samples.append(cluster[1].restart()['seconds'])
+    finally:
+        cluster.terminate()
+    return [('node_restart', samples, 's')]
+
+
+@register
+def isolation(runs, options):
+    """Setup and teardown test isolation with a number of `indexes` and
+    `templates` created by each test, for each of the `isolations`.
+    """
+    cluster = _cluster(options)
+    results = []
+    try:
+        cluster.start()
+        for mode in options['isolations']:
+            setup = []
+            teardown = []
+            for i in range(runs):
+                iso = Isolated()
+                setup.append(_timed(iso.setup_es, cluster, isolation=mode))
+                client = iso.es_client
+                for n in range(options['templates']):
+                    client.create_template(
+                        iso.prefixed('template_%s' % n),
+                        {'template': iso.prefixed('template_%s_*' % n)})
+                for n in range(options['indexes']):
+                    client.create_index(iso.prefixed('index_%s' % n))
+                client.health(wait_for_status='yellow')
+                teardown.append(_timed(iso.teardown_es))
+            results.append(('isolation_%s_setup' % mode, setup, 's'))
+            results.append(('isolation_%s_teardown' % mode, teardown, 's'))
+    finally:
+        cluster.terminate()
+    return results
+
+
+@register
+def bulk_load(runs, options):
+    """Load a number of generated `docs` via the fixture loader."""
+    cluster = _cluster(options)
+    samples = []
+    try:
+        cluster.start()
+        loader = FixtureLoader(cluster.urls)
+        try:
+            for i in range(runs):
+                docs = ({'id': n, 'title': 'Document %s' % n, 'value': n}
+                        for n in range(options['docs']))
+                stats = loader.load('benchmark_%s' % i, 'doc', docs)
+                samples.append(stats['docs_per_second'])
+                cluster.client.delete_index('benchmark_%s' % i)
+        finally:
+            loader.close()
+    finally:
+        cluster.terminate()
+    return [('bulk_load', samples, 'docs/s')]
+
+
+def _es_version(install_path):
+    if not install_path or not os.path.isdir(install_path):
+        return 'unknown'
+    return get_es_version(install_path)
+
+
+def run_benchmarks(names=None, runs=5, **options):
+    """Run benchmarks and return a report.
+
+    :param names: The benchmarks to run, defaults to all.
+    :type names: list
+    :param runs: The number of times each measurement is repeated.
+    :type runs: int
+    :param options: Overrides of the :data:`DEFAULTS` options. If a
+                    `monitor_interval` is given, the resource usage of
+                    each cluster is sampled and added to the report under
+                    `resources`, see
+                    :meth:`ResourceMonitor.attach
+                    <pyelastictest.monitor.ResourceMonitor.attach>`.
+    :returns: A dictionary with information about the `environment` and the
+              summarized `results` of each measurement, keyed by name.
+    """
+    opts = dict(DEFAULTS)
+    opts.update(options)
+    report = {
+        'created': time.time(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'elasticsearch': _es_version(os.environ.get('ES_PATH')),
+        },
+        'runs': runs,
+        'results': {},
+    }
+    for name in names or sorted(BENCHMARKS):
+        if name not in BENCHMARKS:
+            raise ValueError('Unknown benchmark: %s' % name)
+        LOGGER.info('Running benchmark %s' % name)
+        opts['clusters'] = []
+        for key, samples, unit in BENCHMARKS[name](runs, opts):
+            result = summarize(samples)
+            result['unit'] = unit
+            report['results'][key] = result
+        for i, cluster in enumerate(opts['clusters']):
+            if cluster.install_path:
+                report['environment']['elasticsearch'] = _es_version(
+                    cluster.install_path)
+            if cluster.monitor is not None and cluster.monitor.samples:
+                cluster.monitor.attach(report, '%s_%s' % (name, i))
+    return report
+
+
+def compare(report, baseline, threshold=0.2):
+    """Compare the median of each measurement in a report to a baseline.
+
+    :param report: A report as returned by :func:`run_benchmarks`.
+    :type report: dict
+    :param baseline: An earlier report.
+    :type baseline: dict
+    :param threshold: The relative change of the median, which is flagged
+                      as a regression.
+    :type threshold: float
+    :returns: A list of dictionaries with the `name`, `baseline` and
+              `current` median, the relative `change` and a `regression`
+              flag, sorted by name.
+    """
+    comparison = []
+    for name, result in sorted(report['results'].items()):
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous['p50']:
+            continue
+        change = (result['p50'] - previous['p50']) / previous['p50']
+        if result['unit'] in HIGHER_IS_BETTER:
+            regression = change < -threshold
+        else:
+            regression = change > threshold
+        comparison.append({
+            'name': name,
+            'baseline': previous['p50'],
+            'current': result['p50'],
+            'change': change,
+            'regression': regression,
+        })
+    return comparison
+
+
+def load_report(path):
+    """Read a report stored as JSON."""
+    with open(path) as fd:
+        return json.load(fd)
+
+
+def write_report(report, path):
+    """Atomically store a report as JSON."""
+    write_json(path, report)
+
+
+def format_report(report, comparison=None):
+    """Return a human readable table of a report and its comparison to a
+    baseline.
+    """
+    changes = dict((c['name'], c) for c in comparison or ())
+    lines = ['%-32s %10s %10s %10s %8s' % (
+        'benchmark', 'p50', 'p90', 'p99', 'change')]
+    for name, result in sorted(report['results'].items()):
+        line = '%-32s %10.3f %10.3f %10.3f' % (
+            name, result['p50'], result['p90'], result['p99'])
+        if name in changes:
+            line += ' %+7.1f%%' % (changes[name]['change'] * 100)
+            if changes[name]['regression']:
+                line += ' REGRESSION'
+        lines.append(line)
+    return '\n'.join(lines)
@@ -0,0 +1,319 @@
+import glob
+import hashlib
+import json
+import os
+import os.path
+import shutil
+import tarfile
+import tempfile
+import time
+
+
+def get_cache_path(cache_path=None):
+    """Return the cache directory to use or `None` if caching is disabled.
+
+    :param cache_path: An explicit cache directory. If `None` is specified,
+                       the path will be taken from the `ES_CACHE_PATH`
+                       environment variable.
+    :type cache_path: str
+    """
+    if cache_path is None:
+        cache_path = os.environ.get('ES_CACHE_PATH')
+    if not cache_path:
+        return None
+    if not os.path.isdir(cache_path):
+        os.makedirs(cache_path)
+    return cache_path
+
+
+def get_es_version(install_path):
+    """Return the ElasticSearch version of an install path, as found in the
+    name of its main jar file, or `unknown`.
+
+    :param install_path: The filesystem path to an unpacked ElasticSearch
+                         tarball.
+    :type install_path: str
+    """
+    jars = glob.glob(os.path.join(install_path, 'lib', 'elasticsearch-*.jar'))
+    for jar in sorted(jars):
+        version = os.path.basename(jar)[len('elasticsearch-'):-len('.jar')]
+        if version and version[0].isdigit():
+            return version
+    return 'unknown'
+
+
+def write_json(path, data):
+    """Atomically replace the file at `path` with a JSON dump of `data`.
+    """
+    tmp_path = '%s.%s.tmp' % (path, os.getpid())
+    with open(tmp_path, 'w') as fd:
+        json.dump(data, fd)
+    os.rename(tmp_path, path)
+
+
+def hash_key(*parts):
+    """Return a hex digest identifying the given parts.
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def link_tree(source, target):
+    """Recreate the directory tree of `source` inside `target`, hardlinking
+    all files. Files are copied if they cannot be linked, for example if
+    both directories live on different filesystems.
+    """
+    for root, dirs, files in os.walk(source):
+        dest = os.path.join(target, os.path.relpath(root, source))
+        if not os.path.isdir(dest):
+            os.makedirs(dest)
+        for name in files:
+            src_file = os.path.join(root, name)
+            dest_file = os.path.join(dest, name)
+            if os.path.exists(dest_file):
+                os.remove(dest_file)
+            try:
+                os.link(src_file, dest_file)
+            except OSError:
+                shutil.copy2(src_file, dest_file)
+
+
+class NodeTemplate(object):
+    """A prebuilt node directory tree kept in the cache directory.
+
+    The template contains everything that is the same for all nodes using
+    the same ElasticSearch installation and configuration, like the startup
+    scripts and the logging configuration. New node directories are created
+    by hardlinking the template files.
+    """
+
+    def __init__(self, cache_path, install_path, populate, config=''):
+        """Create a node template.
+
+        :param cache_path: The cache directory.
+        :type cache_path: str
+        :param install_path: The filesystem path to an unpacked ElasticSearch
+                             tarball.
+        :type install_path: str
+        :param populate: A callable taking a target directory and the
+                         install path, which writes the template contents.
+        :type populate: callable
+        :param config: Any configuration written by `populate`, included in
+                       the template key.
+        :type config: str
+        """
+        self.install_path = install_path
+        self.populate = populate
+        self.key = hash_key(
+            os.path.abspath(install_path), get_es_version(install_path),
+            config)
+        self.path = os.path.join(cache_path, 'templates', self.key)
+
+    def build(self):
+        """Build the template if it doesn't exist yet.
+
+        The template is written to a temporary directory first and renamed
+        into place, so concurrent builds in multiple threads or processes
+        are safe.
+        """
+        if os.path.isdir(self.path):
+            return
+        parent = os.path.dirname(self.path)
+        if not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                # created concurrently
+                pass
+        tmp_path = tempfile.mkdtemp(dir=parent)
+        try:
+            self.populate(tmp_path, self.install_path)
+            os.rename(tmp_path, self.path)
+        except OSError:
+            if not os.path.isdir(self.path):
+                raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    def copy_to(self, target):
+        """Create a copy of the template in the target directory.
+
+        :param target: The working directory of a node.
+        :type target: str
+        """
+        self.build()
+        link_tree(self.path, target)
+
+
+def dir_size(path):
+    """Return the total size in bytes of all files below `path`.
+    """
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class FixtureCache(object):
+    """A content-addressed cache of node data directories.
+
+    After the fixtures of a cluster are loaded, the data directory of each
+    node is archived under a key derived from the fixture files, mappings
+    and ElasticSearch version. Later runs restore the archives before the
+    nodes are started, so the cluster comes up with the indexes already
+    present.
+
+    Entries are evicted by age and, oldest first, when the cache grows
+    larger than its size limit.
+    """
+
+    def __init__(self, cache_path=None, max_bytes=1024 ** 3,
+                 max_age=7 * 24 * 3600):
+        """Create a fixture cache.
+
+        :param cache_path: The cache directory. If `None` is specified, the
+                           path will be taken from the `ES_CACHE_PATH`
+                           environment variable.
+        :type cache_path: str
+        :param max_bytes: The maximum total size of all entries.
+        :type max_bytes: int
+        :param max_age: The maximum age in seconds of unused entries.
+        :type max_age: int
+        """
+        cache_path = get_cache_path(cache_path)
+        if cache_path is None:
+            raise ValueError(
+                'ES_CACHE_PATH environment variable must be defined.')
+        self.path = os.path.join(cache_path, 'fixtures')
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def key(self, install_path, files=(), mappings=None):
+        """Return the cache key for a set of fixtures.
+
+        :param install_path: The ElasticSearch install path, whose version
+                             is part of the key.
+        :type install_path: str
+        :param files: A list of fixture file paths, whose contents are part
+                      of the key.
+        :type files: list
+        :param mappings: Any JSON serializable mappings or settings used
+                         for the fixture indexes.
+        """
+        digest = hashlib.sha1()
+        digest.update(get_es_version(install_path).encode('utf-8'))
+        digest.update(json.dumps(mappings, sort_keys=True).encode('utf-8'))
+        for path in files:
+            with open(path, 'rb') as fd:
+                for block in iter(lambda: fd.read(65536), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.path, key)
+
+    def _archive(self, key, i):
+        return os.path.join(self._entry(key), 'node_%s.tar' % i)
+
+    def restore(self, key, cluster):
+        """Configure a cluster to start with the cached data directories.
+
+        This has to be called before the cluster is started.
+
+        :param key: The cache key.
+        :type key: str
+        :param cluster: The cluster, which must have the same size as the
+                        cluster the entry was stored from.
+        :type cluster: :class:`~pyelastictest.cluster.Cluster`
+        :returns: `True` if a matching cache entry was found.
+        """
+        entry = self._entry(key)
+        if not all(os.path.isfile(self._archive(key, i))
+                   for i in range(len(cluster))) or \
+                os.path.isfile(self._archive(key, len(cluster))):
+            return False
+        # mark the entry as recently used
+        os.utime(entry, None)
+        cluster.data_seeds = [self._archive(key, i)
+                              for i in range(len(cluster))]
+        return True
+
+    def store(self, key, cluster):
+        """Flush all indexes and archive the data directories of a running
+        cluster.
+
+        :param key: The cache key.
+        :type key: str
+        :param cluster: The cluster.
+        :type cluster: :class:`~pyelastictest.cluster.Cluster`
+        """
+        cluster.client.flush()
+        # stage outside of the entries, so a concurrent evict ignores it
+        tmp_path = tempfile.mkdtemp(prefix='fixtures-',
+                                    dir=os.path.dirname(self.path))
+        try:
+            for i, node in enumerate(cluster.nodes):
+                data_path = os.path.join(
+                    node.working_path, 'data', cluster.name)
+                archive = tarfile.open(
+                    os.path.join(tmp_path, 'node_%s.tar' % i), 'w')
+                try:
+                    archive.add(data_path, arcname='.')
+                finally:
+                    archive.close()
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            os.rename(tmp_path, self._entry(key))
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict()
+
+    def start_cluster(self, cluster, key, load):
+        """Start a cluster with its fixtures restored from the cache, or start
+        it, call `load` and store the fixtures in the cache.
+
+        :param cluster: The cluster, which mustn't be started yet.
+        :type cluster: :class:`~pyelastictest.cluster.Cluster`
+        :param key: The cache key.
+        :type key: str
+        :param load: A callable taking the cluster as its only argument,
+                     which loads all fixtures.
+        :type load: callable
+        :returns: `True` if the fixtures were restored from the cache.
+        """
+        if self.restore(key, cluster):
+            cluster.start()
+            return True
+        cluster.start()
+        load(cluster)
+        self.store(key, cluster)
+        return False
+
+    def evict(self):
+        """Remove all entries older than `max_age` and the least recently
+        used entries exceeding `max_bytes`.
+        """
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if not os.path.isdir(path):
+                continue
+            mtime = os.path.getmtime(path)
+            if now - mtime > self.max_age:
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                entries.append((mtime, dir_size(path), path))
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
@@ -0,0 +1,202 @@
+import os
+import os.path
+import re
+import subprocess
+import threading
+import time
+import uuid
+
+from pyelastictest.cache import get_cache_path
+from pyelastictest.cache import hash_key
+
+VERSION_PATTERN = re.compile(r'version "(\d+)(?:\.(\d+))?')
+
+
+def get_java_path():
+    """Return the java executable used by the ElasticSearch start script.
+    """
+    java_home = os.environ.get('JAVA_HOME')
+    if java_home:
+        return os.path.join(java_home, 'bin', 'java')
+    return 'java'
+
+
+def get_java_version(java_path=None):
+    """Return the major version of a java executable, for example `8` for
+    `1.8.0_362` or `17` for `17.0.2`, or `None` if it can't be determined.
+    """
+    try:
+        proc = subprocess.Popen([java_path or get_java_path(), '-version'],
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        output = proc.communicate()[0]
+    except OSError:
+        return None
+    match = VERSION_PATTERN.search(output.decode('utf-8', 'replace'))
+    if match is None:
+        return None
+    major = int(match.group(1))
+    if major == 1 and match.group(2):
+        major = int(match.group(2))
+    return major
+
+
+class CDSArchive(object):
+    """A class data sharing archive of all classes loaded by a node, kept
+    in the cache directory.
+
+    Loading the ElasticSearch classes from the jar files is a large part of
+    the startup time of each node. On Java 13 and later the first node
+    started without an archive writes one when it exits and all later nodes
+    map the archived classes instead. The archive is keyed by the set of
+    jar files and the java version, so any change to either creates a new
+    archive. Older Java versions only share the JDK classes.
+    """
+
+    def __init__(self, cache_path, install_path, java_path=None):
+        """Create a class data sharing archive.
+
+        :param cache_path: The cache directory.
+        :type cache_path: str
+        :param install_path: The filesystem path to an unpacked ElasticSearch
+                             tarball.
+        :type install_path: str
+        :param java_path: The java executable, defaults to the one in
+                          `JAVA_HOME` or on the `PATH`.
+        :type java_path: str
+        """
+        self.cache_path = os.path.join(cache_path, 'cds')
+        self.install_path = install_path
+        self.java_path = java_path or get_java_path()
+        self._version = None
+        self._dumping = False
+        self._lock = threading.Lock()
+
+    @property
+    def java_version(self):
+        """The major version of the java executable."""
+        if self._version is None:
+            self._version = get_java_version(self.java_path) or 0
+        return self._version
+
+    @property
+    def key(self):
+        """A hash of the name, size and modification time of all jar files
+        and the java version.
+        """
+        jars = []
+        for root, dirs, files in os.walk(
+                os.path.join(self.install_path, 'lib')):
+            for name in files:
+                if name.endswith('.jar'):
+                    jar = os.path.join(root, name)
+                    stat = os.stat(jar)
+                    jars.append((os.path.relpath(jar, self.install_path),
+                                 stat.st_size, int(stat.st_mtime)))
+        return hash_key(sorted(jars), self.java_version)
+
+    @property
+    def path(self):
+        """The filesystem path of the archive for the current jar set."""
+        return os.path.join(self.cache_path, '%s.jsa' % self.key)
+
+    @property
+    def supported(self):
+        """Whether the java version can archive application classes."""
+        return self.java_version >= 13
+
+    def java_options(self):
+        """Return the JVM options for a new node process and the mode,
+        either `use` if an archive exists, `dump` if the process should
+        write one when it exits or `default` to only share the JDK classes.
+
+        Only one process at a time is asked to write the archive. It has to
+        be passed to :meth:`finish` after it exited.
+
+        :returns: A tuple of a list of options, the mode and the temporary
+                  path the archive is written to in `dump` mode.
+        """
+        path = self.path
+        if os.path.isfile(path):
+            return (['-XX:SharedArchiveFile=%s' % path, '-Xshare:auto'],
+                    'use', None)
+        if self.supported:
+            with self._lock:
+                if not self._dumping:
+                    self._dumping = True
+                    if not os.path.isdir(self.cache_path):
+                        try:
+                            os.makedirs(self.cache_path)
+                        except OSError:
+                            # created concurrently
+                            pass
+                    tmp_path = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+                    return (['-XX:ArchiveClassesAtExit=%s' % tmp_path],
+                            'dump', tmp_path)
+        return ['-Xshare:auto'], 'default', None
+
+    def finish(self, tmp_path):
+        """Move an archive written by an exited node process into place.
+
+        :param tmp_path: The temporary path returned by :meth:`java_options`.
+        :type tmp_path: str
+        :returns: `True` if an archive was written.
+        """
+        with self._lock:
+            self._dumping = False
+        if not tmp_path or not os.path.isfile(tmp_path):
+            return False
+        if os.path.getsize(tmp_path):
+            os.rename(tmp_path, tmp_path.rsplit('.', 2)[0])
+            return True
+        os.remove(tmp_path)
+        return False
+
+
+def measure_startup(runs=1, **cluster_options):
+    """Measure the cluster startup time with and without class data sharing.
+
+    A cluster with class data sharing disabled is started first, followed by
+    one which writes the archive, if none exists yet, and finally clusters
+    using the archive.
+
+    :param runs: The number of clusters to start for each measurement.
+    :type runs: int
+    :param cluster_options: Keyword arguments passed to
+                            :class:`~pyelastictest.cluster.Cluster`. A
+                            cache path is required.
+    :returns: A dictionary with the average startup time in seconds
+              `without` and `with` the archive and the time of the run which
+              created it under `dump`, if any.
+    """
+    from pyelastictest.cluster import Cluster
+    from pyelastictest.node import get_profile
+
+    if get_cache_path(cluster_options.get('cache_path')) is None:
+        raise ValueError(
+            'ES_CACHE_PATH environment variable must be defined.')
+    base = get_profile(cluster_options.pop('profile', None))
+
+    def start(class_data_sharing):
+        profile = dict(base, class_data_sharing=class_data_sharing)
+        cluster = Cluster(profile=profile, **cluster_options)
+        try:
+            begin = time.time()
+            cluster.start()
+            duration = time.time() - begin
+        finally:
+            cluster.terminate()
+        return cluster, duration
+
+    result = {}
+    result['without'] = sum(start(False)[1] for i in range(runs)) / runs
+    durations = []
+    cluster, duration = start(True)
+    if 'dump' in [node.jvm_settings.get('cds') for node in cluster.nodes]:
+        result['dump'] = duration
+    else:
+        durations.append(duration)
+    while len(durations) < runs:
+        durations.append(start(True)[1])
+    result['with'] = sum(durations) / runs
+    return result
@@ -1,6 +1,58 @@
+import sys
+import threading
+import time
+
 from pyelasticsearch import ElasticSearch
 from pyelasticsearch.client import es_kwargs
 
+from pyelastictest.instrument import RECORDERS
+from pyelastictest.instrument import record_request
+
+
+def join_names(names):
+    """Return a comma-separated string for a list of index or template names.
+    Single names are returned unchanged.
+    """
+    if isinstance(names, (list, tuple, set, frozenset)):
+        return ','.join(sorted(names))
+    return names
+
+
+def run_parallel(funcs, limit=None):
+    """Call the given functions in parallel threads and wait for all of them
+    to finish.
+
+    :param funcs: A list of callables taking no arguments.
+    :type funcs: list
+    :param limit: The maximum number of threads, by default one thread per
+                  function is used.
+    :type limit: int
+    :raises: The first exception raised by any of the functions.
+    """
+    funcs = list(funcs)
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if not funcs:
+                    return
+                func = funcs.pop(0)
+            try:
+                func()
+            except Exception:
+                errors.append(sys.exc_info()[1])
+
+    threads = [threading.Thread(target=worker)
+               for i in range(min(len(funcs), limit or len(funcs)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
 
 class ExtendedClient(ElasticSearch):
     """Wrapper around pyelasticsearch's client to add some missing
@@ -8,8 +60,51 @@ class ExtendedClient(ElasticSearch):
 
     This class is not meant for external use and doesn't constitute a
     public API.
+
+    The client keeps a registry of template names, which is updated by all
+    template calls made through the client. Template changes made by other
+    clients are only noticed by the next :meth:`list_templates` call.
+
+    All requests are passed to the active recorders of
+    :mod:`pyelastictest.instrument`.
     """
 
+    def __init__(self, urls, *args, **kw):
+        if isinstance(urls, (list, tuple)) or not hasattr(urls, 'startswith'):
+            urls = list(urls)
+        else:
+            urls = [urls]
+        super(ExtendedClient, self).__init__(urls, *args, **kw)
+        self.urls = urls
+        self._template_names = None
+        self._response = threading.local()
+
+    def send_request(self, method, path_components, body='',
+                     query_params=None, encode_body=True):
+        if not RECORDERS:
+            return super(ExtendedClient, self).send_request(
+                method, path_components, body, query_params, encode_body)
+        if body and encode_body:
+            # encode once, to measure the size of the request
+            body = self._encode_json(body)
+            encode_body = False
+        self._response.info = (None, None)
+        begin = time.time()
+        try:
+            return super(ExtendedClient, self).send_request(
+                method, path_components, body, query_params, encode_body)
+        finally:
+            status, received = self._response.info
+            record_request(method, path_components, status,
+                           len(body or ''), received, begin,
+                           time.time() - begin)
+
+    def _decode_response(self, response):
+        if RECORDERS:
+            self._response.info = (response.status_code,
+                                   len(response.content))
+        return super(ExtendedClient, self)._decode_response(response)
+
     @es_kwargs()
     def create_template(self, name, settings, query_params=None):
         """
@@ -23,8 +118,11 @@ class ExtendedClient(ElasticSearch):
         .. _`ES's index-template API`:
            http://tinyurl.com/es-index-template
         """
-        return self.send_request('PUT', ['_template', name], settings,
-                                 query_params=query_params)
+        res = self.send_request('PUT', ['_template', name], settings,
+                                query_params=query_params)
+        if self._template_names is not None:
+            self._template_names.add(name)
+        return res
 
     @es_kwargs()
     def delete_template(self, name, query_params=None):
@@ -38,8 +136,26 @@ class ExtendedClient(ElasticSearch):
         .. _`ES's index-template API`:
             http://tinyurl.com/es-index-template
         """
-        return self.send_request('DELETE', ['_template', name],
-                                 query_params=query_params)
+        try:
+            res = self.send_request('DELETE', ['_template', name],
+                                    query_params=query_params)
+        except Exception:
+            # the registry might be out of sync
+            self._template_names = None
+            raise
+        if self._template_names is not None:
+            self._template_names.discard(name)
+        return res
+
+    def delete_templates(self, names, limit=10):
+        """
+        Delete multiple index templates using concurrent requests.
+
+        :arg names: An iterable of template names.
+        :arg limit: The maximum number of concurrent requests.
+        """
+        run_parallel([lambda name=name: self.delete_template(name)
+                      for name in names], limit=limit)
 
     @es_kwargs()
     def get_template(self, name, query_params=None):
@@ -65,12 +181,26 @@ class ExtendedClient(ElasticSearch):
         .. _`ES's index-template API`:
             http://tinyurl.com/es-index-template
         """
+        # filtering out the index metadata would filter out templates too
         res = self.cluster_state(filter_routing_table=True,
                                  filter_nodes=True, filter_blocks=True)
-        return res['metadata']['templates']
+        templates = res['metadata']['templates']
+        self._template_names = set(templates.keys())
+        return templates
+
+    def template_names(self, cached=True):
+        """
+        Get a set of all index template names.
+
+        :arg cached: Return the names from the template registry if
+            possible, instead of fetching them from the cluster.
+        """
+        if not cached or self._template_names is None:
+            self.list_templates()
+        return set(self._template_names)
 
     @es_kwargs('filter_nodes', 'filter_routing_table', 'filter_metadata',
-               'filter_blocks', 'filter_indices')
+               'filter_blocks', 'filter_indices', 'local')
     def cluster_state(self, query_params=None):
         """
         The cluster state API allows to get a comprehensive state
@@ -86,3 +216,124 @@ class ExtendedClient(ElasticSearch):
         """
         return self.send_request(
             'GET', ['_cluster', 'state'], query_params=query_params)
+
+    @es_kwargs()
+    def cluster_settings(self, query_params=None):
+        """
+        Get the persistent and transient cluster settings.
+
+        See `ES's cluster-update-settings API`_ for more detail.
+
+        .. _`ES's cluster-update-settings API`:
+           http://tinyurl.com/es-cluster-settings
+        """
+        return self.send_request(
+            'GET', ['_cluster', 'settings'], query_params=query_params)
+
+    @es_kwargs()
+    def update_cluster_settings(self, settings, query_params=None):
+        """
+        Update the cluster settings.
+
+        :arg settings: A dictionary with `persistent` and / or `transient`
+            settings.
+
+        See `ES's cluster-update-settings API`_ for more detail.
+
+        .. _`ES's cluster-update-settings API`:
+           http://tinyurl.com/es-cluster-settings
+        """
+        return self.send_request('PUT', ['_cluster', 'settings'], settings,
+                                 query_params=query_params)
+
+    @es_kwargs()
+    def index_stats(self, index=None, query_params=None):
+        """
+        Get document and indexing statistics for one or more indexes.
+
+        :arg index: An index or iterable of indexes, defaults to all indexes.
+
+        See `ES's indices-stats API`_ for more detail.
+
+        .. _`ES's indices-stats API`:
+           http://tinyurl.com/es-indices-stats
+        """
+        path = ['_stats']
+        if index:
+            path.insert(0, join_names(index))
+        return self.send_request('GET', path, query_params=query_params)
+
+    @es_kwargs()
+    def recovery_status(self, index=None, query_params=None):
+        """
+        Get the status of all shards of one or more indexes, including the
+        progress of their last recovery.
+
+        :arg index: An index or iterable of indexes, defaults to all indexes.
+
+        See `ES's indices-status API`_ for more detail.
+
+        .. _`ES's indices-status API`:
+           http://tinyurl.com/es-indices-status
+        """
+        path = ['_status']
+        if index:
+            path.insert(0, join_names(index))
+        query_params = dict(query_params or {}, recovery='true')
+        return self.send_request('GET', path, query_params=query_params)
+
+    @es_kwargs('jvm', 'thread_pool', 'process', 'os', 'indices')
+    def node_stats(self, node='_local', query_params=None):
+        """
+        Get statistics of one or more cluster nodes.
+
+        :arg node: A node id or name, defaults to the node the request is
+            sent to.
+
+        See `ES's nodes-stats API`_ for more detail.
+
+        .. _`ES's nodes-stats API`:
+           http://tinyurl.com/es-nodes-stats
+        """
+        return self.send_request('GET', ['_cluster', 'nodes', node, 'stats'],
+                                 query_params=query_params)
+
+    @es_kwargs('refresh', 'consistency', 'replication')
+    def bulk(self, body, index=None, query_params=None):
+        """
+        Send a raw bulk request.
+
+        :arg body: The request body, newline-delimited JSON action and source
+            lines, ending in a newline.
+        :arg index: An optional default index for all actions.
+
+        See `ES's bulk API`_ for more detail.
+
+        .. _`ES's bulk API`:
+           http://tinyurl.com/es-bulk
+        """
+        path = ['_bulk']
+        if index:
+            path.insert(0, index)
+        return self.send_request('POST', path, body, encode_body=False,
+                                 query_params=query_params)
+
+    def load_fixtures(self, index, doc_type, docs, **kw):
+        """
+        Load documents into an index via concurrent bulk requests.
+
+        :arg index: The name of the index.
+        :arg doc_type: The document type.
+        :arg docs: An iterable of documents or the path to a file with one
+            JSON document per line.
+
+        Further keyword arguments are passed to
+        :meth:`FixtureLoader.load <pyelastictest.fixtures.FixtureLoader.load>`.
+        Returns a dictionary with load statistics.
+        """
+        from pyelastictest.fixtures import FixtureLoader
+        loader = FixtureLoader(self.urls)
+        try:
+            return loader.load(index, doc_type, docs, **kw)
+        finally:
+            loader.close()
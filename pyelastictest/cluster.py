@@ -1,22 +1,64 @@
 import atexit
+import json
 import logging
 import os
 import shutil
 import socket
 import tempfile
+import threading
 import time
 import uuid
 
 from pyelasticsearch.exceptions import ElasticHttpError
 from requests.exceptions import RequestException
 
+from pyelastictest.cache import get_cache_path
+from pyelastictest.cache import NodeTemplate
+from pyelastictest.cds import CDSArchive
 from pyelastictest.client import ExtendedClient
+from pyelastictest.client import run_parallel
+from pyelastictest.futures import Future
+from pyelastictest.futures import run_in_thread
+from pyelastictest.memory import MemoryNode
+from pyelastictest.memory import MemoryStore
+from pyelastictest.monitor import ResourceMonitor
+from pyelastictest.node import get_profile
+from pyelastictest.node import LOG_CONF
 from pyelastictest.node import Node
+from pyelastictest.node import populate_node_dir
+from pyelastictest.ports import PortAllocator
+from pyelastictest.ports import PortBindError
+from pyelastictest.ramdisk import disk_usage
+from pyelastictest.ramdisk import free_space
+from pyelastictest.ramdisk import get_ram_budget
+from pyelastictest.ramdisk import get_ram_path
+from pyelastictest.ramdisk import is_ram_backed
+from pyelastictest.ramdisk import RAM_NODE_SIZE
 
+BACKENDS = {
+    'jvm': Node,
+    'memory': MemoryNode,
+}
+BOOT = None
+BOOT_LOCK = threading.Lock()
 CLUSTER = None
+LOGGER = logging.getLogger('pyelastictest.cluster')
 PYES_LOGGER = logging.getLogger('pyelasticsearch')
 REQUESTS_LOGGER = logging.getLogger('requests.packages.urllib3.connectionpool')
 
+#: The name of the protected index template with the :data:`SPEED_SETTINGS`.
+SPEED_TEMPLATE = 'pyelastictest_speed'
+
+#: Index settings trading durability for speed, used by the speed template.
+SPEED_SETTINGS = {
+    'index.number_of_shards': 1,
+    'index.number_of_replicas': 0,
+    'index.refresh_interval': '30s',
+    'index.translog.flush_threshold_ops': 100000,
+    'index.translog.flush_threshold_size': '1gb',
+    'index.merge.policy.segments_per_tier': 50,
+}
+
 
 def get_es_path():
     """Return the `ES_PATH` environment variable or raise a `ValueError` if
@@ -28,16 +70,131 @@ def get_es_path():
     return ES_PATH
 
 
+def _create_cluster():
+    if os.environ.get('ES_POOL_PATH'):
+        from pyelastictest.pool import is_pool_running
+        from pyelastictest.pool import lease_cluster
+        if is_pool_running():
+            lease = lease_cluster()
+            atexit.register(lease.release)
+            return lease.cluster
+        LOGGER.warning('No cluster pool is running in %s' %
+                       os.environ['ES_POOL_PATH'])
+    cluster = Cluster()
+    cluster.start()
+    return cluster
+
+
 def get_cluster():
     """Get or create a module global cluster.
+
+    If the `ES_POOL_PATH` environment variable is set, a cluster is leased
+    from the :class:`~pyelastictest.pool.ClusterPool` running in that
+    directory instead. The lease is released when the process exits. If no
+    pool is running, a new cluster is started.
+
+    If the cluster is booting in the background, see :func:`boot_cluster`,
+    this waits until it is ready.
     """
-    global CLUSTER
+    global BOOT, CLUSTER
     if CLUSTER is None:
-        CLUSTER = Cluster()
-        CLUSTER.start()
+        boot = BOOT
+        if boot is None:
+            CLUSTER = _create_cluster()
+        else:
+            try:
+                CLUSTER = boot.result()
+            finally:
+                BOOT = None
     return CLUSTER
 
 
+def boot_cluster():
+    """Start creating the module global cluster of :func:`get_cluster` in a
+    background thread, so the startup overlaps with test collection and
+    imports. Calling this more than once or after the cluster is ready has
+    no effect.
+
+    This is done automatically when :mod:`pyelastictest.isolated` is
+    imported and the `ES_BACKGROUND_BOOT` environment variable is set, or
+    by the nose plugin in :mod:`pyelastictest.noseplugin`.
+
+    :returns: A :class:`~pyelastictest.futures.Future` for the cluster.
+    """
+    global BOOT
+    with BOOT_LOCK:
+        if BOOT is None:
+            if CLUSTER is not None:
+                BOOT = Future()
+                BOOT.set_result(CLUSTER)
+            else:
+                BOOT = run_in_thread(_create_cluster)
+        return BOOT
+
+
+def reset_cluster(cluster):
+    """Delete all indexes and templates of a cluster, except for the
+    protected :data:`SPEED_TEMPLATE`, which is recreated if it is missing.
+
+    :param cluster: The cluster to reset.
+    :type cluster: :class:`~pyelastictest.cluster.Cluster`
+    """
+    client = cluster.client
+    names = client.template_names(cached=False)
+    names.discard(SPEED_TEMPLATE)
+    client.delete_templates(names)
+    client.delete_all_indexes()
+    install_speed_template(cluster)
+
+
+def get_speed_template(speed_template=None):
+    """Return the body of the speed template or `None` if it is disabled.
+
+    :param speed_template: `True` to use the :data:`SPEED_SETTINGS`, a
+                           dictionary of settings overriding them, where
+                           `None` values remove a setting, or `False`. If
+                           `None` is specified, the value will be taken from
+                           the `ES_SPEED_TEMPLATE` environment variable,
+                           either `1` or a JSON object of overrides, and
+                           defaults to `False`.
+    :rtype: dict
+    """
+    if speed_template is None:
+        value = os.environ.get('ES_SPEED_TEMPLATE', '').strip()
+        if value.startswith('{'):
+            speed_template = json.loads(value)
+        else:
+            speed_template = value.lower() in ('1', 'true', 'yes', 'on')
+    if speed_template is False:
+        return None
+    settings = dict(SPEED_SETTINGS)
+    if speed_template is not True:
+        settings.update(speed_template)
+    settings = dict((key, value) for key, value in settings.items()
+                    if value is not None)
+    # the lowest order lets all other templates override these settings
+    return {'template': '*', 'order': -1, 'settings': settings}
+
+
+def install_speed_template(cluster):
+    """Create the speed template of a cluster, if it has one and the
+    template doesn't exist. The client's template registry is used to
+    check for it, so this is cheap to call before each test.
+
+    :param cluster: The cluster.
+    :type cluster: :class:`~pyelastictest.cluster.Cluster`
+    :returns: `True` if the template was created.
+    """
+    body = getattr(cluster, 'speed_template', None)
+    if body is None:
+        return False
+    client = cluster.client
+    if SPEED_TEMPLATE in client.template_names(cached=True):
+        return False
+    client.create_template(SPEED_TEMPLATE, body)
+    return True
+
+
 def get_free_port(ip='127.0.0.1'):
     """Let the operating system give us a free port.
 
@@ -61,8 +218,10 @@ class Cluster(object):
     stopped at the end of the test run and the temporary data cleaned up.
     """
 
-    def __init__(self,
-                 install_path=None, ip='127.0.0.1', size=1, ports=None):
+    def __init__(self, install_path=None, ip='127.0.0.1', size=1, ports=None,
+                 cache_path=None, backend=None, profile=None,
+                 monitor_interval=None, ram_path=None, ram_budget=None,
+                 speed_template=None):
         """Create an ElasticSearch cluster.
 
         :param install_path: The filesystem path to an unpacked ElasticSearch
@@ -78,17 +237,93 @@ class Cluster(object):
                       transport port. By default the code lets the OS choose
                       free ports.
         :type ports: list
+        :param cache_path: An optional directory to cache prebuilt node
+                           templates in. If `None` is specified, the path
+                           will be taken from the `ES_CACHE_PATH` environment
+                           variable. Without a cache path no templates or
+                           class data sharing archives are used.
+        :type cache_path: str
+        :param backend: Either `jvm` to run ElasticSearch subprocesses or
+                        `memory` to answer a subset of the API from
+                        in-process HTTP servers, see
+                        :mod:`pyelastictest.memory`. If `None` is specified,
+                        the backend will be taken from the `ES_BACKEND`
+                        environment variable and defaults to `jvm`.
+        :type backend: str
+        :param profile: The JVM profile of all nodes, either the name of one
+                        of the :data:`~pyelastictest.node.PROFILES` or a
+                        dictionary of overrides, see
+                        :func:`~pyelastictest.node.get_profile`. If `None`
+                        is specified, the name will be taken from the
+                        `ES_PROFILE` environment variable and defaults to
+                        `fast-start`.
+        :param monitor_interval: Sample the resource usage of all nodes
+                                 every given number of seconds, once the
+                                 cluster is started. A summary is logged
+                                 when the cluster is stopped, see
+                                 :mod:`pyelastictest.monitor`.
+        :type monitor_interval: float
+        :param ram_path: A directory on a RAM-backed filesystem, like
+                         `/dev/shm`, to place the node directories in. If
+                         `None` is specified, the path will be taken from
+                         the `ES_RAM_PATH` environment variable. Without a
+                         RAM path all nodes use the temporary directory.
+        :type ram_path: str
+        :param ram_budget: The number of bytes the nodes may use in the
+                           `ram_path`, see
+                           :func:`~pyelastictest.ramdisk.get_ram_budget`.
+                           Nodes which don't fit are placed on disk.
+        :param speed_template: Install the protected :data:`SPEED_TEMPLATE`
+                               index template on start, see
+                               :func:`get_speed_template`.
         """
-        if install_path is None:
+        if backend is None:
+            backend = os.environ.get('ES_BACKEND') or 'jvm'
+        if backend not in BACKENDS:
+            raise ValueError('Unknown backend: %s' % backend)
+        self.backend = backend
+        self.memory_store = None
+        if backend == 'memory':
+            self.memory_store = MemoryStore(self)
+        elif install_path is None:
             install_path = get_es_path()
         self.install_path = install_path
+        self.profile = get_profile(profile)
+        self.cache_path = get_cache_path(cache_path)
+        self.template = None
+        self.cds = None
+        if self.cache_path is not None and backend == 'jvm':
+            self.template = NodeTemplate(
+                self.cache_path, install_path, populate_node_dir,
+                config=LOG_CONF)
+            self.cds = CDSArchive(self.cache_path, install_path)
         self.ip = ip
         self.size = size
         self.name = uuid.uuid4().hex
-        self.working_path = tempfile.mkdtemp()
+        self.speed_template = get_speed_template(speed_template)
+        self.ram_path = get_ram_path(ram_path)
+        self.ram_budget = None
+        self.disk_path = None
+        self.disk_usage = {}
+        if self.ram_path is not None:
+            if is_ram_backed(self.ram_path) is False:
+                LOGGER.warning('%s is not on a RAM-backed filesystem' %
+                               self.ram_path)
+            self.ram_budget = get_ram_budget(ram_budget, size)
+            self.working_path = tempfile.mkdtemp(
+                prefix='pyelastictest-', dir=self.ram_path)
+        else:
+            self.working_path = tempfile.mkdtemp()
         self.nodes = []
+        self._node_count = 0
         self.client = None
+        self.data_seeds = None
+        self.timings = {}
+        self.monitor = None
+        if monitor_interval:
+            self.monitor = ResourceMonitor(self, interval=monitor_interval)
         self.health_filter = InfoLogFilter()
+        self.port_allocator = PortAllocator(ip)
         # configure cluster ports
         self.configure_ports(size, ports)
 
@@ -97,8 +332,8 @@ class Cluster(object):
         self.transport_ports = []
         if ports is None:
             for i in range(size):
-                self.ports.append(get_free_port(self.ip))
-                self.transport_ports.append(get_free_port(self.ip))
+                self.ports.append(self.port_allocator.reserve())
+                self.transport_ports.append(self.port_allocator.reserve())
         elif len(ports) != size:
             raise ValueError("The specified ports didn't match the size.")
         else:
@@ -113,36 +348,280 @@ class Cluster(object):
         """
         return ['http://%s:%s' % (self.ip, p) for p in self.ports]
 
+    @property
+    def jvm_settings(self):
+        """Exposes the JVM settings each node was started with, keyed by
+        node name.
+        """
+        return dict((node.name, node.jvm_settings) for node in self.nodes)
+
+    def in_ram(self, node):
+        """Return whether the working directory of a node is in RAM."""
+        return (self.ram_path is not None and
+                node.working_path.startswith(self.working_path + os.sep))
+
+    def make_node_path(self):
+        """Create the working directory of a new node.
+
+        With a `ram_path` the directory is placed in RAM as long as the
+        node fits into the `ram_budget` and the free space of the
+        filesystem, and on disk otherwise.
+        """
+        if self.ram_path is not None:
+            used = sum(max(disk_usage(n.working_path), RAM_NODE_SIZE)
+                       for n in self.nodes if self.in_ram(n))
+            if (used + RAM_NODE_SIZE <= self.ram_budget and
+                    free_space(self.working_path) >= RAM_NODE_SIZE):
+                return tempfile.mkdtemp(dir=self.working_path)
+            LOGGER.info('The RAM budget of %s bytes is exhausted, placing '
+                        'the node on disk' % self.ram_budget)
+            if self.disk_path is None:
+                self.disk_path = tempfile.mkdtemp()
+            return tempfile.mkdtemp(dir=self.disk_path)
+        return tempfile.mkdtemp(dir=self.working_path)
+
+    def node_disk_usage(self):
+        """Return the bytes used by the working directory of each node.
+
+        :returns: A dictionary keyed by node name, with the `bytes` and
+                  whether the directory is `in_ram`.
+        """
+        return dict((node.name, {'bytes': disk_usage(node.working_path),
+                                 'in_ram': self.in_ram(node)})
+                    for node in self.nodes)
+
+    def _create_node(self, port, trans_port):
+        node = BACKENDS[self.backend](
+            self, '%s_%s' % (self.name, self._node_count), port, trans_port)
+        self._node_count += 1
+        return node
+
     def start(self, timeout=30):
         """Start all cluster nodes and wait for them to be ready.
 
+        All nodes are prepared and spawned in parallel. Nodes which are
+        already running are left alone. The time spent in each phase is
+        recorded in :attr:`timings` and in the `timings` of each node.
+
         :param timeout: Time in seconds to wait for cluster startup to succeed.
         :type timeout: int
         :raises: `OSError` if any of the cluster nodes couldn't be started.
         """
         atexit.register(lambda proc: proc.terminate(), self)
-        for i in range(self.size):
-            port = self.ports[i]
-            transport_port = self.transport_ports[i]
-            node = Node(self, '%s_%s' % (self.name, i), port, transport_port)
-            self.nodes.append(node)
-            node.start()
+        begin = time.time()
+        if not self.nodes:
+            for i in range(self.size):
+                node = self._create_node(self.ports[i],
+                                         self.transport_ports[i])
+                if self.data_seeds:
+                    node.data_seed = self.data_seeds[i]
+                self.nodes.append(node)
+        run_parallel([n.start for n in self.nodes if not n.running])
+        self.timings['spawn'] = time.time() - begin
 
         self.client = ExtendedClient(self.urls, max_retries=len(self))
         # silence massive log output
         try:
             PYES_LOGGER.addFilter(self.health_filter)
             REQUESTS_LOGGER.addFilter(self.health_filter)
-            self.wait_until_ready(timeout)
+            attempts = 3
+            while True:
+                try:
+                    self.wait_until_ready(timeout)
+                    break
+                except PortBindError:
+                    attempts -= 1
+                    if not attempts:
+                        raise
+                    self._rebind_exited_nodes()
         finally:
             PYES_LOGGER.removeFilter(self.health_filter)
             REQUESTS_LOGGER.removeFilter(self.health_filter)
+        install_speed_template(self)
+        self.timings['start'] = time.time() - begin
+        if self.monitor is not None:
+            self.monitor.start()
 
     def stop(self):
         """Stop all cluster nodes."""
+        if self.monitor is not None and self.monitor.running:
+            self.monitor.stop()
+            LOGGER.info('Resource usage of cluster %s:\n%s' % (
+                self.name, self.monitor.format_summary()))
         for node in self.nodes:
             node.stop()
 
+    def _rebind_exited_nodes(self):
+        """Move all nodes which exited to fresh ports and start them."""
+        for i, node in enumerate(self.nodes):
+            if node.is_alive():
+                continue
+            LOGGER.info("Node %s couldn't bind to its ports, retrying" % (
+                node.name))
+            node.stop()
+            self.port_allocator.release(node.port)
+            self.port_allocator.release(node.trans_port)
+            self.ports[i] = self.port_allocator.reserve()
+            self.transport_ports[i] = self.port_allocator.reserve()
+            self.hosts[i] = '%s:%s' % (self.ip, self.transport_ports[i])
+            node.set_ports(self.ports[i], self.transport_ports[i])
+            node.start()
+        self.client = ExtendedClient(self.urls, max_retries=len(self))
+
+    def _shards_on(self, node_id):
+        state = self.client.cluster_state(
+            filter_metadata=True, filter_blocks=True, filter_nodes=True)
+        routing = state.get('routing_nodes', {}).get('nodes', {})
+        return len(routing.get(node_id, []))
+
+    def _wait_for_rebalance(self, deadline, grace=1.0):
+        """Wait until all shards are started and no shards are relocating,
+        allowing the cluster `grace` seconds to start relocating shards.
+        Return the maximum number of relocating shards seen.
+        """
+        begin = time.time()
+        relocating = 0
+        while True:
+            health = self.client.health(wait_for_nodes='>=%s' % len(self))
+            current = health.get('relocating_shards', 0)
+            relocating = max(relocating, current)
+            settled = (current == 0 and
+                       health.get('initializing_shards', 0) == 0 and
+                       health.get('status') == 'green')
+            if settled and (relocating or time.time() - begin >= grace):
+                return relocating
+            if time.time() >= deadline:
+                raise OSError("Cluster %s didn't rebalance in time" % (
+                    self.name))
+            time.sleep(0.1)
+
+    def add_node(self, timeout=60):
+        """Start an additional node and wait for it to join the cluster and
+        for shards to be rebalanced onto it.
+
+        :param timeout: Time in seconds to wait for the node and the
+                        rebalancing.
+        :type timeout: int
+        :returns: A dictionary with the new `node`, the total `seconds`, the
+                  time until the node `joined`, the `rebalance_seconds`, the
+                  maximum number of `relocating` shards seen and the number
+                  of `shards` allocated to the new node.
+        :raises: `OSError` if the node didn't join or the cluster didn't
+                 rebalance in time.
+        """
+        if not self.nodes:
+            raise ValueError('The cluster has to be started first.')
+        begin = time.time()
+        deadline = begin + timeout
+        port = self.port_allocator.reserve()
+        trans_port = self.port_allocator.reserve()
+        self.ports.append(port)
+        self.transport_ports.append(trans_port)
+        self.hosts.append('%s:%s' % (self.ip, trans_port))
+        self.size += 1
+        node = self._create_node(port, trans_port)
+        self.nodes.append(node)
+        node.start()
+        self.client = ExtendedClient(self.urls, max_retries=len(self))
+        if not node.wait_until_started(deadline - time.time()):
+            raise OSError("Node %s didn't start in time" % node.name)
+        health = self.client.health(
+            wait_for_nodes='>=%s' % len(self),
+            timeout='%dms' % max((deadline - time.time()) * 1000, 1))
+        if health.get('timed_out'):
+            raise OSError("Node %s didn't join in time" % node.name)
+        joined = time.time()
+        relocating = self._wait_for_rebalance(deadline)
+        shards = 0
+        if self.memory_store is None:
+            shards = self._shards_on(node.node_id())
+        result = {
+            'node': node,
+            'seconds': time.time() - begin,
+            'joined': joined - begin,
+            'rebalance_seconds': time.time() - joined,
+            'relocating': relocating,
+            'shards': shards,
+        }
+        self.timings['add_node'] = result['seconds']
+        return result
+
+    def remove_node(self, node=None, timeout=60):
+        """Move all shards off a node, stop it and remove it from the
+        cluster.
+
+        :param node: The node to remove, defaults to the last node.
+        :type node: :class:`~pyelastictest.node.Node`
+        :param timeout: Time in seconds to wait for the shards to move.
+        :type timeout: int
+        :returns: A dictionary with the total `seconds`, the time it took to
+                  `drain` the node and the number of `shards` moved.
+        :raises: `OSError` if the shards couldn't be moved or the node
+                 didn't leave the cluster in time.
+        """
+        if len(self.nodes) < 2:
+            raise ValueError("Can't remove the last node of a cluster.")
+        if node is None:
+            node = self.nodes[-1]
+        begin = time.time()
+        deadline = begin + timeout
+        shards = 0
+        if self.memory_store is None:
+            node_id = node.node_id()
+            shards = self._shards_on(node_id)
+            exclude = 'cluster.routing.allocation.exclude._id'
+            self.client.update_cluster_settings(
+                {'transient': {exclude: node_id}})
+            try:
+                while self._shards_on(node_id):
+                    if time.time() >= deadline:
+                        raise OSError("Couldn't move shards off node %s" % (
+                            node.name))
+                    time.sleep(0.1)
+            finally:
+                self.client.update_cluster_settings(
+                    {'transient': {exclude: ''}})
+        drained = time.time()
+        node.stop()
+        self.port_allocator.release(node.port)
+        self.port_allocator.release(node.trans_port)
+        i = self.nodes.index(node)
+        del self.nodes[i]
+        del self.ports[i]
+        del self.transport_ports[i]
+        del self.hosts[i]
+        self.size -= 1
+        self.client = ExtendedClient(self.urls, max_retries=len(self))
+        health = self.client.health(
+            wait_for_nodes=str(len(self)),
+            timeout='%ds' % max(int(deadline - time.time()), 1))
+        if health.get('timed_out'):
+            raise OSError("Node %s didn't leave the cluster in time" % (
+                node.name))
+        result = {
+            'seconds': time.time() - begin,
+            'drain': drained - begin,
+            'shards': shards,
+        }
+        self.timings['remove_node'] = result['seconds']
+        return result
+
+    def rolling_restart(self, timeout=60):
+        """Restart one node after another, waiting for each node to rejoin
+        the cluster and all shards to recover before restarting the next.
+        The total time is recorded in :attr:`timings`.
+
+        :param timeout: Time in seconds to wait for each node.
+        :type timeout: int
+        :returns: A list of the results of :meth:`Node.restart
+                  <pyelastictest.node.Node.restart>`.
+        :raises: `OSError` if a node didn't recover in time.
+        """
+        begin = time.time()
+        results = [node.restart(timeout) for node in self.nodes]
+        self.timings['rolling_restart'] = time.time() - begin
+        return results
+
     def terminate(self):
         """Stop the cluster and remove all working directories.
 
@@ -151,26 +630,49 @@ class Cluster(object):
         """
         self.stop()
         self.client = None
+        self.port_allocator.release_all()
+        if os.path.isdir(self.working_path):
+            self.disk_usage = self.node_disk_usage()
+            for name, usage in sorted(self.disk_usage.items()):
+                LOGGER.info('Node %s used %.1f MB %s' % (
+                    name, usage['bytes'] / 1024.0 ** 2,
+                    usage['in_ram'] and 'in RAM' or 'on disk'))
         shutil.rmtree(self.working_path, ignore_errors=True)
+        if self.disk_path is not None:
+            shutil.rmtree(self.disk_path, ignore_errors=True)
 
     def wait_until_ready(self, timeout=30):
-        time.sleep(2)
-        now = time.time()
-        while time.time() - now < timeout:
-            try:
-                # check to see if our process is ready
-                health = self.client.health(
-                    wait_for_status="green",
-                    wait_for_nodes='>=%s' % len(self),
-                )
-            except (ElasticHttpError, RequestException, socket.error):
-                # wait a bit before re-trying
-                time.sleep(0.2)
-            else:
-                if health['cluster_name'] == self.name:
-                    break
-        else:  # pragma: nocover
+        """Wait for all nodes to join the cluster and the cluster to reach a
+        green state.
+
+        The log output of each node is watched for the start message, so a
+        crashed node is detected right away. Afterwards a single health
+        request waits on the server side for all nodes to join and all
+        shards to be allocated.
+
+        :param timeout: Time in seconds to wait for the cluster.
+        :type timeout: int
+        :raises: `OSError` if the cluster didn't get ready in time or a node
+                 process exited.
+        """
+        begin = time.time()
+        deadline = begin + timeout
+        for node in self.nodes:
+            if not node.wait_until_started(deadline - time.time()):
+                raise OSError("Node %s didn't start in time" % node.name)
+        try:
+            health = self.client.health(
+                wait_for_status='green',
+                wait_for_nodes='>=%s' % len(self),
+                timeout='%dms' % max((deadline - time.time()) * 1000, 1))
+        except (ElasticHttpError, RequestException, socket.error):
+            raise OSError("Couldn't start elasticsearch")
+        if health.get('timed_out') or health['cluster_name'] != self.name:
             raise OSError("Couldn't start elasticsearch")
+        now = time.time()
+        for node in self.nodes:
+            node.timings.setdefault('joined', now - node.started)
+        self.timings['ready'] = now - begin
 
     def __getitem__(self, n):
         """Return the zero to n-th cluster node.
@@ -183,6 +685,54 @@ class Cluster(object):
         return self.size
 
 
+class AttachedCluster(object):
+    """A running cluster which is managed by another process.
+
+    It provides the same attributes as :class:`Cluster` which are needed for
+    test isolation, but doesn't have any local nodes. Stopping or
+    terminating it only disconnects the client.
+    """
+
+    def __init__(self, name, urls, speed_template=None):
+        """Attach to a running cluster.
+
+        :param name: The cluster name.
+        :type name: str
+        :param urls: A list of client urls of all cluster nodes.
+        :type urls: list
+        :param speed_template: Recreate the protected speed template if it
+                               is missing, see :func:`get_speed_template`.
+        """
+        self.name = name
+        self.speed_template = get_speed_template(speed_template)
+        self.urls = list(urls)
+        self.size = len(self.urls)
+        self.nodes = []
+        self.client = ExtendedClient(self.urls, max_retries=len(self))
+
+    def is_healthy(self):
+        """Return whether the cluster is reachable, has the expected name
+        and isn't in a red state.
+        """
+        try:
+            health = self.client.health()
+        except (ElasticHttpError, RequestException, socket.error):
+            return False
+        return (health['cluster_name'] == self.name and
+                health['status'] != 'red')
+
+    def stop(self):
+        """Disconnect from the cluster."""
+        self.client = None
+
+    terminate = stop
+
+    def __len__(self):
+        """Return the number of cluster nodes.
+        """
+        return self.size
+
+
 class InfoLogFilter(logging.Filter):
 
     def filter(self, record):
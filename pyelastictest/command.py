@@ -0,0 +1,214 @@
+"""The `pyelastictest` command line entry point.
+
+Usage: ``pyelastictest <command> [options]``, run a command with `--help` for
+its options.
+"""
+import json
+import logging
+import optparse
+import os
+import os.path
+import signal
+import subprocess
+import sys
+import time
+
+COMMANDS = {}
+
+
+def command(func):
+    """Register a function as a sub-command, named after the function.
+    """
+    COMMANDS[func.__name__] = func
+    return func
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt()
+
+
+@command
+def pool(args):
+    """Keep a pool of warm clusters running for parallel test runners."""
+    from pyelastictest.pool import ClusterPool
+
+    parser = optparse.OptionParser(usage='%prog pool [options]')
+    parser.add_option('--path', dest='path', default=None,
+                      help='pool directory, defaults to $ES_POOL_PATH')
+    parser.add_option('--size', dest='size', type='int', default=2,
+                      help='number of clusters to keep running')
+    parser.add_option('--nodes', dest='nodes', type='int', default=1,
+                      help='number of nodes per cluster')
+    parser.add_option('--interval', dest='interval', type='float',
+                      default=5.0, help='seconds between health checks')
+    options, args = parser.parse_args(args)
+    ClusterPool(pool_path=options.path, size=options.size,
+                interval=options.interval,
+                cluster_options={'size': options.nodes}).serve_forever()
+
+
+@command
+def serve(args):
+    """Keep one cluster running in the background across test runs."""
+    from pyelastictest.pool import ClusterPool
+    from pyelastictest.pool import get_pool_path
+    from pyelastictest.pool import is_pool_running
+
+    parser = optparse.OptionParser(usage='%prog serve [options]')
+    parser.add_option('--path', dest='path', default=None,
+                      help='state directory, defaults to $ES_POOL_PATH')
+    parser.add_option('--nodes', dest='nodes', type='int', default=1,
+                      help='number of cluster nodes')
+    parser.add_option('--idle-timeout', dest='idle_timeout', type='float',
+                      default=1800.0,
+                      help='seconds without a test run before exiting')
+    parser.add_option('--detach', dest='detach', action='store_true',
+                      default=False,
+                      help='run in the background once the cluster is up')
+    parser.add_option('--start-timeout', dest='start_timeout', type='float',
+                      default=300.0,
+                      help='seconds to wait for a detached cluster to start')
+    options, args = parser.parse_args(args)
+    path = os.path.abspath(get_pool_path(options.path))
+    if is_pool_running(path):
+        sys.stderr.write('A cluster is already served from %s\n' % path)
+        return 0
+    if options.detach:
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        log = open(os.path.join(path, 'serve.log'), 'a')
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'pyelastictest.command', 'serve',
+             '--path', path, '--nodes', str(options.nodes),
+             '--idle-timeout', str(options.idle_timeout)],
+            stdout=log, stderr=subprocess.STDOUT, preexec_fn=os.setsid)
+        log.close()
+        log_path = os.path.join(path, 'serve.log')
+        state_path = os.path.join(path, '0.json')
+        deadline = time.time() + options.start_timeout
+        while not os.path.exists(state_path):
+            if process.poll() is not None:
+                sys.stderr.write('Failed to start, see %s\n' % log_path)
+                return 1
+            if time.time() > deadline:
+                # the child leads its own process group, stop its nodes too
+                os.killpg(process.pid, signal.SIGTERM)
+                process.wait()
+                sys.stderr.write('Failed to start within %s seconds, see %s\n'
+                                 % (options.start_timeout, log_path))
+                return 1
+            time.sleep(0.1)
+        sys.stdout.write('export ES_POOL_PATH=%s\n' % path)
+        return 0
+    ClusterPool(pool_path=path, size=1, cluster_options={
+        'size': options.nodes}, idle_timeout=options.idle_timeout,
+    ).serve_forever()
+    return 0
+
+
+@command
+def benchmark(args):
+    """Run benchmarks and compare them to a baseline report."""
+    from pyelastictest import benchmark
+
+    parser = optparse.OptionParser(usage='%prog benchmark [options] [names]')
+    parser.add_option('--runs', dest='runs', type='int', default=5,
+                      help='number of runs per measurement')
+    parser.add_option('--sizes', dest='sizes', default='1,3',
+                      help='comma separated cluster sizes for cold starts')
+    parser.add_option('--indexes', dest='indexes', type='int', default=10,
+                      help='number of indexes created per isolated test')
+    parser.add_option('--templates', dest='templates', type='int',
+                      default=10,
+                      help='number of templates created per isolated test')
+    parser.add_option('--docs', dest='docs', type='int', default=10000,
+                      help='number of documents per bulk load')
+    parser.add_option('--monitor', dest='monitor', type='float',
+                      default=None,
+                      help='seconds between resource usage samples')
+    parser.add_option('--output', dest='output', default=None,
+                      help='write the JSON report to this file')
+    parser.add_option('--baseline', dest='baseline', default=None,
+                      help='compare to the JSON report in this file')
+    parser.add_option('--threshold', dest='threshold', type='float',
+                      default=0.2,
+                      help='relative change of the median to flag')
+    options, args = parser.parse_args(args)
+    report = benchmark.run_benchmarks(
+        args or None, runs=options.runs,
+        sizes=[int(size) for size in options.sizes.split(',')],
+        indexes=options.indexes, templates=options.templates,
+        docs=options.docs, monitor_interval=options.monitor)
+    comparison = None
+    if options.baseline:
+        comparison = benchmark.compare(
+            report, benchmark.load_report(options.baseline),
+            options.threshold)
+        report['comparison'] = comparison
+    if options.output:
+        benchmark.write_report(report, options.output)
+    sys.stdout.write(benchmark.format_report(report, comparison) + '\n')
+    if comparison and any(c['regression'] for c in comparison):
+        return 1
+    return 0
+
+
+@command
+def load(args):
+    """Drive a workload against a new or an existing cluster."""
+    from pyelastictest.cluster import AttachedCluster
+    from pyelastictest.cluster import Cluster
+    from pyelastictest.load import run_load
+    from pyelastictest.load import Workload
+
+    parser = optparse.OptionParser(usage='%prog load [options] workload.json')
+    parser.add_option('--url', dest='urls', action='append', default=[],
+                      help='node url of an existing cluster, repeatable')
+    parser.add_option('--nodes', dest='nodes', type='int', default=1,
+                      help='number of nodes of a new cluster')
+    parser.add_option('--workers', dest='workers', type='int', default=None,
+                      help='number of workers, defaults to two per node')
+    parser.add_option('--processes', dest='processes', action='store_true',
+                      default=False, help='run workers in processes')
+    parser.add_option('--output', dest='output', default=None,
+                      help='write the JSON report to this file')
+    options, args = parser.parse_args(args)
+    if len(args) != 1:
+        parser.error('expected one workload file')
+    workload = Workload.from_file(args[0])
+    if options.urls:
+        cluster = AttachedCluster('load', options.urls)
+    else:
+        cluster = Cluster(size=options.nodes)
+        cluster.start()
+    try:
+        report = run_load(cluster, workload, workers=options.workers,
+                          processes=options.processes)
+    finally:
+        if not options.urls:
+            cluster.terminate()
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if options.output:
+        with open(options.output, 'w') as fd:
+            fd.write(output)
+    sys.stdout.write(output + '\n')
+    return 0
+
+
+def main(argv=None):
+    """Run a sub-command, as given by the first command line argument.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv or argv[0] not in COMMANDS:
+        names = ', '.join(sorted(COMMANDS))
+        sys.stderr.write('Usage: pyelastictest <command> [options]\n'
+                         'Available commands: %s\n' % names)
+        return 2
+    logging.basicConfig(level=logging.INFO)
+    signal.signal(signal.SIGTERM, _terminate)
+    return COMMANDS[argv[0]](argv[1:])
+
+
+if __name__ == '__main__':  # pragma: nocover
+    sys.exit(main())
@@ -0,0 +1,166 @@
+import datetime
+import json
+import logging
+import time
+
+from pyelasticsearch.exceptions import ElasticHttpNotFoundError
+
+from pyelastictest.asyncclient import AsyncClient
+
+LOGGER = logging.getLogger('pyelastictest.fixtures')
+
+
+def read_json_lines(path):
+    """Yield one document per non-empty line of a JSON-lines file.
+
+    :param path: The filesystem path of the file.
+    :type path: str
+    """
+    with open(path) as fd:
+        for line in fd:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _encode_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError('%r is not JSON serializable' % value)
+
+
+class FixtureLoader(object):
+    """Streams documents into chunked bulk requests, which are sent
+    concurrently across all node urls.
+
+    The chunk size is measured in bytes and adapts to the observed request
+    latency: it grows while requests are faster than half the
+    `target_latency` and shrinks when they are slower.
+    """
+
+    def __init__(self, urls, concurrency=None, chunk_bytes=1024 * 1024,
+                 min_chunk_bytes=64 * 1024, max_chunk_bytes=16 * 1024 * 1024,
+                 target_latency=0.5):
+        """Create a fixture loader.
+
+        :param urls: A list of node urls.
+        :type urls: list
+        :param concurrency: The maximum number of concurrent bulk requests,
+                            defaults to two per node url.
+        :type concurrency: int
+        :param chunk_bytes: The initial size of each bulk request in bytes.
+        :type chunk_bytes: int
+        :param min_chunk_bytes: The lower bound for the chunk size.
+        :type min_chunk_bytes: int
+        :param max_chunk_bytes: The upper bound for the chunk size.
+        :type max_chunk_bytes: int
+        :param target_latency: The desired time in seconds per bulk request.
+        :type target_latency: float
+        """
+        self.urls = list(urls)
+        self.concurrency = concurrency or 2 * len(self.urls)
+        self.chunk_bytes = chunk_bytes
+        self.min_chunk_bytes = min_chunk_bytes
+        self.max_chunk_bytes = max_chunk_bytes
+        self.target_latency = target_latency
+        self.client = AsyncClient(self.urls, workers=self.concurrency)
+
+    def close(self):
+        """Stop the worker threads."""
+        self.client.close()
+
+    def _send(self, body, index):
+        begin = time.time()
+        res = self.client.next_client().bulk(body, index=index)
+        latency = time.time() - begin
+        if latency < self.target_latency / 2:
+            self.chunk_bytes = min(self.chunk_bytes * 2, self.max_chunk_bytes)
+        elif latency > self.target_latency:
+            self.chunk_bytes = max(self.chunk_bytes // 2, self.min_chunk_bytes)
+        return len([item for item in res.get('items', [])
+                    if 'error' in list(item.values())[0]])
+
+    def _chunks(self, doc_type, docs, id_field):
+        lines = []
+        size = 0
+        count = 0
+        for doc in docs:
+            action = {'_type': doc_type}
+            if doc.get(id_field) is not None:
+                action['_id'] = doc[id_field]
+            for line in (json.dumps({'index': action}),
+                         json.dumps(doc, default=_encode_default)):
+                lines.append(line)
+                size += len(line) + 1
+            count += 1
+            if size >= self.chunk_bytes:
+                yield count, '\n'.join(lines) + '\n'
+                lines = []
+                size = 0
+                count = 0
+        if lines:
+            yield count, '\n'.join(lines) + '\n'
+
+    def _disable_refresh(self, index):
+        """Disable refresh for an index, creating it if necessary, and
+        return the prior refresh interval. A new index is created with the
+        settings of matching templates, so their interval is restored.
+        """
+        sync = self.client.next_client()
+        try:
+            settings = sync.get_settings(index)[index]['settings']
+        except (ElasticHttpNotFoundError, KeyError):
+            sync.create_index(index)
+            settings = sync.get_settings(index)[index]['settings']
+        sync.update_settings(index, {'index': {'refresh_interval': '-1'}})
+        return settings.get('index.refresh_interval', '1s')
+
+    def load(self, index, doc_type, docs, id_field='id', refresh=True):
+        """Load documents into an index.
+
+        Refresh is disabled for the index during the load and a single
+        refresh is done at the end.
+
+        :param index: The name of the index, which is created if it doesn't
+                      exist.
+        :type index: str
+        :param doc_type: The document type.
+        :type doc_type: str
+        :param docs: An iterable of documents or the path to a file with one
+                     JSON document per line.
+        :param id_field: The document field holding the document id.
+        :type id_field: str
+        :param refresh: Refresh the index after loading.
+        :type refresh: bool
+        :returns: A dictionary with the number of `docs`, `bytes`,
+                  `requests` and `errors`, the `seconds` the load took and
+                  the `docs_per_second`.
+        """
+        if hasattr(docs, 'startswith'):
+            docs = read_json_lines(docs)
+        begin = time.time()
+        prior_interval = self._disable_refresh(index)
+        stats = {'docs': 0, 'bytes': 0, 'requests': 0, 'errors': 0}
+        pending = []
+        try:
+            for count, body in self._chunks(doc_type, docs, id_field):
+                if len(pending) >= self.concurrency:
+                    stats['errors'] += pending.pop(0).result()
+                pending.append(self.client.run(self._send, body, index))
+                stats['docs'] += count
+                stats['bytes'] += len(body)
+                stats['requests'] += 1
+            for future in pending:
+                stats['errors'] += future.result()
+        finally:
+            sync = self.client.next_client()
+            sync.update_settings(
+                index, {'index': {'refresh_interval': prior_interval}})
+            if refresh:
+                sync.refresh(index)
+        stats['seconds'] = time.time() - begin
+        stats['docs_per_second'] = stats['docs'] / max(stats['seconds'],
+                                                       1e-6)
+        LOGGER.info('Loaded %(docs)s documents in %(seconds).2fs '
+                    '(%(docs_per_second).0f docs/s)' % stats)
+        return stats
@@ -0,0 +1,144 @@
+import sys
+import threading
+
+try:
+    from queue import Queue
+except ImportError:  # pragma: nocover
+    from Queue import Queue
+
+
+class Future(object):
+    """The result of a call running in the background.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._error = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def set_result(self, result):
+        """Set the result and notify all waiting threads."""
+        self._result = result
+        self._finish()
+
+    def set_exception(self, error):
+        """Set an exception, which is raised by :meth:`result`."""
+        self._error = error
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def add_done_callback(self, callback):
+        """Call `callback` with the future as its only argument, as soon as
+        the future is done.
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def done(self):
+        """Return whether the call has finished."""
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """Wait for the call to finish and return its result.
+
+        :param timeout: Time in seconds to wait or `None` to wait forever.
+        :type timeout: float
+        :raises: The exception raised by the call or `OSError` if the call
+                 didn't finish in time.
+        """
+        self._event.wait(timeout)
+        if not self._event.is_set():
+            raise OSError('Timed out waiting for result')
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+def run_in_thread(func, *args, **kw):
+    """Call `func` in a new daemon thread.
+
+    :rtype: :class:`Future`
+    """
+    future = Future()
+
+    def target():
+        try:
+            future.set_result(func(*args, **kw))
+        except Exception:
+            future.set_exception(sys.exc_info()[1])
+
+    thread = threading.Thread(target=target)
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+def gather(futures, timeout=None):
+    """Wait for all futures and return a list of their results.
+
+    :param futures: An iterable of :class:`Future` instances.
+    :param timeout: Time in seconds to wait for each future.
+    :type timeout: float
+    """
+    return [future.result(timeout) for future in futures]
+
+
+class Executor(object):
+    """A fixed pool of worker threads running calls in the background.
+    """
+
+    def __init__(self, workers=4):
+        """Create and start the worker threads.
+
+        :param workers: The number of worker threads.
+        :type workers: int
+        """
+        self._queue = Queue()
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args, kw = item
+            try:
+                future.set_result(func(*args, **kw))
+            except Exception:
+                future.set_exception(sys.exc_info()[1])
+
+    def submit(self, func, *args, **kw):
+        """Schedule a call and return a :class:`Future` for its result.
+        """
+        future = Future()
+        self._queue.put((future, func, args, kw))
+        return future
+
+    def shutdown(self, wait=True):
+        """Stop all worker threads after all pending calls are done.
+
+        :param wait: Wait for the worker threads to finish.
+        :type wait: bool
+        """
+        for thread in self._threads:
+            self._queue.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
@@ -0,0 +1,226 @@
+"""Record the requests sent through
+:class:`~pyelastictest.client.ExtendedClient`.
+
+Every request is passed to all active :class:`RequestRecorder` instances,
+which aggregate the count, wall time and bytes per method and endpoint.
+Without any active recorder the client only does a single list check per
+request.
+
+A session wide recorder is activated via :func:`enable_session` or by
+setting the `ES_INSTRUMENT_PATH` or `ES_TRACE_PATH` environment variables.
+At exit its summary is logged and written as JSON to `ES_INSTRUMENT_PATH`
+and all requests are written as a Chrome trace to `ES_TRACE_PATH`, which
+can be opened in ``chrome://tracing``.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+LOGGER = logging.getLogger('pyelastictest.instrument')
+
+# all active recorders
+RECORDERS = []
+SESSION = None
+
+
+def endpoint(path_components):
+    """Return the endpoint of a request path, replacing all index, type and
+    document names by `{name}`, so calls to the same API are grouped
+    together.
+
+    :param path_components: The path segments of a request.
+    :type path_components: list
+    """
+    parts = []
+    for part in path_components:
+        part = str(part)
+        if not part.startswith('_'):
+            part = '{name}'
+        parts.append(part)
+    return '/' + '/'.join(parts)
+
+
+class RequestRecorder(object):
+    """An in-memory aggregator of request statistics.
+
+    Requests are grouped by method and :func:`endpoint`. If `trace` is
+    enabled, the individual requests are kept as well, up to a limit, for
+    :meth:`export_trace`.
+    """
+
+    def __init__(self, trace=False, max_events=100000):
+        """Create a recorder.
+
+        :param trace: Keep the individual requests.
+        :type trace: bool
+        :param max_events: The maximum number of requests kept for tracing,
+                           older requests are dropped first.
+        :type max_events: int
+        """
+        self.trace = trace
+        self.events = deque(maxlen=max_events)
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start recording requests."""
+        if self not in RECORDERS:
+            RECORDERS.append(self)
+        return self
+
+    def stop(self):
+        """Stop recording requests."""
+        if self in RECORDERS:
+            RECORDERS.remove(self)
+
+    def reset(self):
+        """Forget all recorded requests."""
+        with self._lock:
+            self.stats = {}
+            self.events.clear()
+
+    def record(self, method, path_components, status, sent, received,
+               begin, duration):
+        """Record a single request.
+
+        :param method: The HTTP method.
+        :type method: str
+        :param path_components: The path segments.
+        :type path_components: list
+        :param status: The HTTP status code or `None` if no response was
+                       received.
+        :type status: int
+        :param sent: The size of the request body in bytes.
+        :type sent: int
+        :param received: The size of the response body in bytes, or `None`
+                         if unknown.
+        :type received: int
+        :param begin: The start time as returned by :func:`time.time`.
+        :type begin: float
+        :param duration: The wall time in seconds.
+        :type duration: float
+        """
+        key = (method, endpoint(path_components))
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = {
+                    'count': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                    'bytes_sent': 0, 'bytes_received': 0, 'statuses': {}}
+            stats['count'] += 1
+            stats['seconds'] += duration
+            stats['max_seconds'] = max(stats['max_seconds'], duration)
+            stats['bytes_sent'] += sent
+            stats['bytes_received'] += received or 0
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+            if self.trace:
+                self.events.append((
+                    method, '/'.join(str(p) for p in path_components),
+                    status, sent, received, begin, duration,
+                    threading.current_thread().ident))
+
+    def summary(self):
+        """Return the statistics of each method and endpoint, sorted by
+        the total time spent, slowest first.
+
+        :returns: A list of dictionaries with the `method`, `endpoint`,
+                  `count`, total `seconds`, `max_seconds`, `bytes_sent`,
+                  `bytes_received` and the count of each status code in
+                  `statuses`.
+        """
+        result = []
+        with self._lock:
+            for (method, path), stats in self.stats.items():
+                item = dict(stats, method=method, endpoint=path)
+                item['statuses'] = dict((str(status), count) for
+                                        status, count in
+                                        stats['statuses'].items())
+                result.append(item)
+        result.sort(key=lambda item: -item['seconds'])
+        return result
+
+    def format_summary(self, limit=10):
+        """Return a human readable table of the slowest endpoints."""
+        lines = ['%-8s %-40s %8s %10s %10s' % (
+            'method', 'endpoint', 'count', 'seconds', 'max')]
+        for item in self.summary()[:limit]:
+            lines.append('%-8s %-40s %8d %10.3f %10.3f' % (
+                item['method'], item['endpoint'], item['count'],
+                item['seconds'], item['max_seconds']))
+        return '\n'.join(lines)
+
+    def export_json(self, path):
+        """Write the :meth:`summary` as JSON to a file."""
+        with open(path, 'w') as fd:
+            json.dump(self.summary(), fd, indent=2, sort_keys=True)
+
+    def export_trace(self, path):
+        """Write all traced requests to a file in the Chrome trace event
+        format.
+        """
+        pid = os.getpid()
+        trace = []
+        with self._lock:
+            events = list(self.events)
+        for (method, path_name, status, sent, received, begin, duration,
+                tid) in events:
+            trace.append({
+                'name': '%s /%s' % (method, path_name),
+                'cat': 'elasticsearch',
+                'ph': 'X',
+                'ts': int(begin * 1000000),
+                'dur': int(duration * 1000000),
+                'pid': pid,
+                'tid': tid,
+                'args': {'status': status, 'bytes_sent': sent,
+                         'bytes_received': received},
+            })
+        with open(path, 'w') as fd:
+            json.dump({'traceEvents': trace}, fd)
+
+
+def record_request(method, path_components, status, sent, received, begin,
+                   duration):
+    """Pass a request to all active recorders."""
+    for recorder in list(RECORDERS):
+        recorder.record(method, path_components, status, sent, received,
+                        begin, duration)
+
+
+def _finish_session():
+    recorder = SESSION
+    recorder.stop()
+    if not recorder.stats:
+        return
+    LOGGER.info('Elasticsearch requests:\n%s' % recorder.format_summary())
+    json_path = os.environ.get('ES_INSTRUMENT_PATH')
+    if json_path:
+        recorder.export_json(json_path)
+    trace_path = os.environ.get('ES_TRACE_PATH')
+    if trace_path:
+        recorder.export_trace(trace_path)
+
+
+def enable_session(trace=None):
+    """Start the session wide recorder, if it isn't running yet, and
+    return it. Its results are reported at exit.
+
+    :param trace: Keep all requests for a Chrome trace, defaults to whether
+                  the `ES_TRACE_PATH` environment variable is set.
+    :type trace: bool
+    :rtype: :class:`RequestRecorder`
+    """
+    global SESSION
+    if SESSION is None:
+        if trace is None:
+            trace = bool(os.environ.get('ES_TRACE_PATH'))
+        SESSION = RequestRecorder(trace=trace)
+        atexit.register(_finish_session)
+    return SESSION.start()
+
+
+if os.environ.get('ES_INSTRUMENT_PATH') or os.environ.get('ES_TRACE_PATH'):
+    enable_session()
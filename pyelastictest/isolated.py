@@ -1,18 +1,33 @@
+import json
+import os
+import time
+import uuid
 from contextlib import contextmanager
 from unittest import TestCase
 
+from pyelasticsearch.exceptions import ElasticHttpNotFoundError
+
+from pyelastictest import instrument
+from pyelastictest.cache import hash_key
+from pyelastictest.client import join_names
+from pyelastictest.cluster import boot_cluster
 from pyelastictest.cluster import get_cluster
+from pyelastictest.cluster import install_speed_template
+from pyelastictest.cluster import SPEED_TEMPLATE
+
+# in-memory copies of pristine indexes, keyed by cluster and index name
+SNAPSHOTS = {}
 
 
 @contextmanager
-def isolated(cluster=None):
+def isolated(cluster=None, isolation=None):
     """Provide isolation as a context manager.
 
-    The cluster argument is the same as the one to :attr:`Isolated.setup_es`.
+    The arguments are the same as the ones to :attr:`Isolated.setup_es`.
     """
     isolated = Isolated()
     try:
-        isolated.setup_es(cluster)
+        isolated.setup_es(cluster, isolation=isolation)
         yield isolated
     finally:
         isolated.teardown_es()
@@ -22,46 +37,250 @@ class Isolated(object):
     """Provides test data isolation for a running
     :class:`~pyelastictest.cluster.Cluster`.
 
-    Currently it deletes all indexes on teardown. Prior existing templates
-    will be detected and left alone. All extra templates will be removed.
-    Changes to prior templates aren't detected nor are changes to cluster
-    settings.
+    Three isolation strategies are available, selected via the
+    :attr:`isolation` attribute:
+
+    `delete`
+        The default. Deletes all indexes on teardown. Prior existing
+        templates will be detected and left alone. All extra templates will
+        be removed. Changes to prior templates aren't detected nor are
+        changes to cluster settings.
+
+    `snapshot`
+        Fingerprints the indexes, templates and cluster settings on setup
+        and only drops or restores what changed on teardown. Prior indexes
+        are kept as in-memory snapshots and restored via a bulk request if
+        a test changed them. This is fast if a suite loads its fixture
+        indexes once and most tests only read from them. Changed
+        persistent and transient cluster settings are restored to their
+        prior values, but settings added by a test can't be removed, as
+        ElasticSearch doesn't support deleting cluster settings.
+
+    `namespace`
+        Assigns a unique :attr:`es_prefix` to each instance. Tests have to
+        use :meth:`prefixed` names for all their indexes and templates.
+        Teardown only deletes the prefixed indexes, using one wildcard
+        request, and prefixed templates. Many tests can run concurrently
+        against a single cluster in this mode.
+
+    In all strategies the protected speed template of the cluster, see
+    :func:`~pyelastictest.cluster.get_speed_template`, is never deleted and
+    is recreated on setup if it is missing.
+
+    The duration of the last teardown is stored in :attr:`teardown_time`.
+
+    If :attr:`record_requests` is enabled or the session wide recorder of
+    :mod:`pyelastictest.instrument` is active, all requests between setup
+    and teardown are recorded, including those of other threads, and a
+    summary is stored in :attr:`es_requests`.
     """
 
-    def setup_es(self, cluster=None):
+    #: The isolation strategy, either `delete`, `snapshot` or `namespace`.
+    isolation = 'delete'
+
+    #: The index and template name prefix, only set in `namespace` mode.
+    es_prefix = ''
+
+    #: Time in seconds the last :attr:`teardown_es` call took.
+    teardown_time = None
+
+    #: Record the requests of each test.
+    record_requests = False
+
+    #: The recorder of the current test, if requests are recorded.
+    es_recorder = None
+
+    #: The request summary of the last test, see
+    #: :meth:`RequestRecorder.summary
+    #: <pyelastictest.instrument.RequestRecorder.summary>`.
+    es_requests = None
+
+    def setup_es(self, cluster=None, isolation=None):
         """Setup isolation and capture current state of the cluster.
 
         :param cluster: Specifies the cluster, if none is specifies
                         calls :attr:`~pyelastictest.cluster.get_cluster`
                         to get or create a module global cluster.
         :type cluster: :class:`~pyelastictest.cluster.Cluster`
-
+        :param isolation: Overrides the :attr:`isolation` strategy.
+        :type isolation: str
         """
+        if isolation is not None:
+            self.isolation = isolation
+        if self.isolation not in ('delete', 'snapshot', 'namespace'):
+            raise ValueError('Unknown isolation strategy: %s' % self.isolation)
+        if self.record_requests or instrument.SESSION is not None:
+            self.es_recorder = instrument.RequestRecorder().start()
         if cluster is None:
             cluster = get_cluster()
         self.es_cluster = cluster
         self.es_client = self.es_cluster.client
-        self._prior_templates = self._get_template_names()
+        install_speed_template(cluster)
+        getattr(self, '_setup_%s' % self.isolation)()
 
     def teardown_es(self):
-        """Returns the cluster to its prior state and deletes all indexes.
+        """Returns the cluster to its prior state.
         """
+        begin = time.time()
+        try:
+            getattr(self, '_teardown_%s' % self.isolation)()
+        finally:
+            self.teardown_time = time.time() - begin
+            if self.es_recorder is not None:
+                self.es_recorder.stop()
+                self.es_requests = self.es_recorder.summary()
+                self.es_recorder = None
+
+    def prefixed(self, name):
+        """Return the given index or template name with the
+        :attr:`es_prefix` of this instance.
+
+        :param name: An index or template name.
+        :type name: str
+        """
+        return self.es_prefix + name
+
+    def _setup_delete(self):
+        # the registry is accurate after the last teardown
+        self._prior_templates = self.es_client.template_names(cached=True)
+
+    def _teardown_delete(self):
         self._delete_extra_templates()
         self.es_client.delete_all_indexes()
 
     def _delete_extra_templates(self):
-        current_templates = self._get_template_names()
-        for t in current_templates - self._prior_templates:
-            self.es_cluster.client.delete_template(t)
+        current_templates = self.es_client.template_names(cached=False)
+        current_templates.discard(SPEED_TEMPLATE)
+        self.es_client.delete_templates(
+            current_templates - self._prior_templates)
+
+    def _setup_namespace(self):
+        self.es_prefix = 'test_%s_' % uuid.uuid4().hex[:16]
+
+    def _teardown_namespace(self):
+        client = self.es_client
+        try:
+            client.delete_index(self.es_prefix + '*')
+        except ElasticHttpNotFoundError:
+            # no index was created
+            pass
+        client.delete_templates([
+            name for name in client.template_names(cached=False)
+            if name.startswith(self.es_prefix)])
+
+    def _setup_snapshot(self):
+        self._prior_state = self._fingerprint()
+        templates, indices, settings = self._prior_state
+        for name, (fingerprint, metadata, count) in indices.items():
+            key = (self.es_cluster.name, name)
+            if SNAPSHOTS.get(key, (None, ))[0] != fingerprint:
+                SNAPSHOTS[key] = (fingerprint, self._snapshot_index(name,
+                                                                    count))
+
+    def _teardown_snapshot(self):
+        client = self.es_client
+        prior_templates, prior_indices, prior_settings = self._prior_state
+        templates, indices, settings = self._fingerprint()
+
+        extra = set(indices) - set(prior_indices)
+        changed = [name for name, value in prior_indices.items()
+                   if indices.get(name, (None, ))[0] != value[0]]
+        drop = extra | set(n for n in changed if n in indices)
+        if drop:
+            client.delete_index(join_names(drop))
+        for name in changed:
+            self._restore_index(name, prior_indices[name][1])
 
-    def _get_template_names(self):
-        return set(self.es_cluster.client.list_templates().keys())
+        client.delete_templates(
+            set(templates) - set(prior_templates) - set([SPEED_TEMPLATE]))
+        for name, body in prior_templates.items():
+            if templates.get(name) != body:
+                client.create_template(name, body)
+
+        restore = {}
+        for scope in ('persistent', 'transient'):
+            current = settings.get(scope) or {}
+            # ElasticSearch doesn't allow to remove cluster settings, only
+            # the prior values of changed settings can be restored
+            changed_settings = dict(
+                (key, value) for key, value in
+                (prior_settings.get(scope) or {}).items()
+                if current.get(key) != value)
+            if changed_settings:
+                restore[scope] = changed_settings
+        if restore:
+            client.update_cluster_settings(restore)
+
+        if changed:
+            # restored indexes got new statistics, carry over their snapshots
+            self._prior_state = self._fingerprint()
+            for name, value in self._prior_state[1].items():
+                key = (self.es_cluster.name, name)
+                if name in changed and key in SNAPSHOTS:
+                    SNAPSHOTS[key] = (value[0], SNAPSHOTS[key][1])
+
+    def _fingerprint(self):
+        """Return the templates, an index name to (fingerprint, metadata,
+        document count) mapping and the cluster settings.
+        """
+        client = self.es_client
+        state = client.cluster_state(filter_routing_table=True,
+                                     filter_nodes=True, filter_blocks=True)
+        metadata = state['metadata']
+        stats = {}
+        if metadata['indices']:
+            # make document counts include all pending changes
+            client.refresh()
+            stats = client.index_stats()['indices']
+        indices = {}
+        for name, index_meta in metadata['indices'].items():
+            primaries = stats.get(name, {}).get('primaries', {})
+            docs = primaries.get('docs', {})
+            indexing = primaries.get('indexing', {})
+            fingerprint = hash_key(
+                json.dumps(index_meta, sort_keys=True),
+                docs.get('count'), docs.get('deleted'),
+                indexing.get('index_total'), indexing.get('delete_total'))
+            indices[name] = (fingerprint, index_meta, docs.get('count', 0))
+        return (metadata['templates'], indices, client.cluster_settings())
+
+    def _snapshot_index(self, name, count):
+        if not count:
+            return []
+        res = self.es_client.send_request('GET', [name, '_search'], {
+            'query': {'match_all': {}},
+            'size': count,
+        })
+        return [(hit['_type'], hit['_id'], hit['_source'])
+                for hit in res['hits']['hits']]
+
+    def _restore_index(self, name, metadata):
+        client = self.es_client
+        client.create_index(name, settings={
+            'settings': metadata.get('settings', {}),
+            'mappings': metadata.get('mappings', {}),
+        })
+        aliases = metadata.get('aliases') or []
+        if aliases:
+            client.send_request('POST', ['_aliases'], {'actions': [
+                {'add': {'index': name, 'alias': alias}}
+                for alias in aliases]})
+        docs = SNAPSHOTS.get((self.es_cluster.name, name), (None, []))[1]
+        if docs:
+            lines = []
+            for doc_type, doc_id, source in docs:
+                lines.append(json.dumps({'index': {
+                    '_index': name, '_type': doc_type, '_id': doc_id}}))
+                lines.append(json.dumps(source))
+            client.bulk('\n'.join(lines) + '\n', refresh='true')
 
 
 class IsolatedTestCase(TestCase, Isolated):
     """A test case with the :attr:`Isolated` class mixed in.
 
     Setup and teardown methods are called to provide test data isolation.
+    Set the :attr:`~Isolated.isolation` class attribute to choose the
+    isolation strategy.
     """
 
     def setUp(self):
@@ -73,3 +292,7 @@ class IsolatedTestCase(TestCase, Isolated):
         """Calls :attr:`Isolated.teardown_es`."""
         self.teardown_es()
         super(IsolatedTestCase, self).tearDown()
+
+
+if os.environ.get('ES_BACKGROUND_BOOT'):
+    boot_cluster()
@@ -0,0 +1,240 @@
+"""Generate indexing and query load against a cluster.
+
+A :class:`Workload` describes the documents to index, the mix of queries
+to run and a list of phases, each with a duration, a target rate and the
+share of writes. :func:`run_load` drives the workload from a number of
+worker threads or processes spread across all node urls and reports the
+throughput, latency histograms and error rate of each phase.
+"""
+import itertools
+import json
+import logging
+import multiprocessing
+import random
+import socket
+import time
+
+from pyelasticsearch.exceptions import ElasticHttpError
+from pyelasticsearch.exceptions import IndexAlreadyExistsError
+from requests.exceptions import RequestException
+
+from pyelastictest.client import ExtendedClient
+from pyelastictest.fixtures import read_json_lines
+from pyelastictest.futures import gather
+from pyelastictest.futures import run_in_thread
+from pyelastictest.stats import Histogram
+
+LOGGER = logging.getLogger('pyelastictest.load')
+
+
+class Workload(object):
+    """A description of the load to generate.
+
+    Workloads are sent to worker processes, so all documents and queries
+    have to be picklable.
+    """
+
+    def __init__(self, index, documents, queries=None, doc_type='doc',
+                 phases=None, duration=10.0, rate=None, write_ratio=0.5):
+        """Create a workload.
+
+        :param index: The name of the index to write to and query.
+        :type index: str
+        :param documents: A list of documents, which is cycled through, or a
+                          module level function taking a sequence number
+                          and returning a new document.
+        :param queries: A list of `(weight, body)` tuples of query bodies,
+                        chosen at random in proportion to their weight.
+                        Defaults to a `match_all` query.
+        :type queries: list
+        :param doc_type: The document type.
+        :type doc_type: str
+        :param phases: A list of dictionaries with a `name`, a `duration`
+                       in seconds and an optional `rate` and `write_ratio`.
+                       Defaults to a single phase using the `duration`,
+                       `rate` and `write_ratio` arguments.
+        :type phases: list
+        :param duration: The duration of the default phase in seconds.
+        :type duration: float
+        :param rate: The target number of requests per second across all
+                     workers, or `None` to send requests as fast as
+                     possible.
+        :type rate: float
+        :param write_ratio: The share of index requests, between 0 and 1.
+        :type write_ratio: float
+        """
+        self.index = index
+        self.documents = documents
+        self.queries = queries or [(1, {'query': {'match_all': {}}})]
+        self.doc_type = doc_type
+        if phases is None:
+            phases = [{'name': 'main', 'duration': duration}]
+        self.phases = []
+        for phase in phases:
+            phase = dict(phase)
+            phase.setdefault('rate', rate)
+            phase.setdefault('write_ratio', write_ratio)
+            self.phases.append(phase)
+
+    @classmethod
+    def from_file(cls, path):
+        """Create a workload from a JSON file.
+
+        The file contains an object with the keyword arguments of the
+        workload. `documents` is either a list of documents or the path to
+        a file with one JSON document per line and `queries` a list of
+        objects with a `weight` and a `body`.
+
+        :param path: The filesystem path of the file.
+        :type path: str
+        """
+        with open(path) as fd:
+            spec = json.load(fd)
+        if hasattr(spec['documents'], 'startswith'):
+            spec['documents'] = list(read_json_lines(spec['documents']))
+        if spec.get('queries'):
+            spec['queries'] = [(query.get('weight', 1), query['body'])
+                               for query in spec['queries']]
+        return cls(**dict((str(key), value) for key, value in spec.items()))
+
+    def document(self, n):
+        """Return the `n`-th document."""
+        if callable(self.documents):
+            return self.documents(n)
+        return self.documents[n % len(self.documents)]
+
+    def query(self, rand):
+        """Return a random query body, chosen by weight."""
+        point = rand.uniform(0, sum(weight for weight, body in self.queries))
+        for weight, body in self.queries:
+            point -= weight
+            if point <= 0:
+                break
+        return body
+
+
+def _run_worker(args):
+    """Run all phases of a workload in one worker and return the results
+    of each phase, with histograms converted to dictionaries.
+    """
+    workload, url, worker, workers, start_at = args
+    client = ExtendedClient([url], max_retries=0)
+    rand = random.Random(worker)
+    # each worker indexes every n-th document
+    sequence = itertools.count()
+    results = []
+    phase_start = start_at
+    for phase in workload.phases:
+        phase_end = phase_start + phase['duration']
+        reads = Histogram()
+        writes = Histogram()
+        errors = 0
+        interval = None
+        if phase['rate']:
+            interval = float(workers) / phase['rate']
+        scheduled = phase_start
+        time.sleep(max(phase_start - time.time(), 0))
+        while True:
+            now = time.time()
+            if interval is not None:
+                if scheduled > now:
+                    time.sleep(scheduled - now)
+                # measure from the scheduled time, so a slow cluster
+                # doesn't hide its queueing delay
+                begin = scheduled
+                scheduled += interval
+            else:
+                begin = now
+            if begin >= phase_end:
+                break
+            write = rand.random() < phase['write_ratio']
+            try:
+                if write:
+                    n = next(sequence) * workers + worker
+                    client.index(workload.index, workload.doc_type,
+                                 workload.document(n), id=n)
+                else:
+                    client.search(workload.query(rand),
+                                  index=workload.index)
+            except (ElasticHttpError, RequestException, socket.error):
+                errors += 1
+            if write:
+                writes.record(time.time() - begin)
+            else:
+                reads.record(time.time() - begin)
+        results.append({
+            'reads': reads.to_dict(),
+            'writes': writes.to_dict(),
+            'errors': errors,
+        })
+        phase_start = phase_end
+    return results
+
+
+def run_load(cluster, workload, workers=None, processes=False):
+    """Drive a workload against a cluster.
+
+    :param cluster: A running cluster.
+    :type cluster: :class:`~pyelastictest.cluster.Cluster`
+    :param workload: The workload.
+    :type workload: :class:`Workload`
+    :param workers: The number of workers, defaults to two per node.
+    :type workers: int
+    :param processes: Run each worker in its own process instead of a
+                      thread, to avoid contention on the interpreter lock.
+    :type processes: bool
+    :returns: A list of dictionaries with the `name`, `seconds`,
+              `requests`, `requests_per_second`, `errors` and `error_rate`
+              of each phase and summaries of the `read` and `write`
+              latency histograms.
+    """
+    urls = cluster.urls
+    workers = workers or 2 * len(urls)
+    # create the index up front, so early queries don't race its creation
+    client = ExtendedClient(urls, max_retries=len(urls))
+    try:
+        client.create_index(workload.index)
+    except IndexAlreadyExistsError:
+        pass
+    client.health(workload.index, wait_for_status='yellow', timeout='30s')
+    # give all workers time to start up before the first phase
+    delay = 0.5
+    if processes:
+        delay += 0.5 * workers
+    start_at = time.time() + delay
+    args = [(workload, urls[i % len(urls)], i, workers, start_at)
+            for i in range(workers)]
+    if processes:
+        pool = multiprocessing.Pool(workers)
+        try:
+            worker_results = pool.map(_run_worker, args)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        worker_results = gather([run_in_thread(_run_worker, arg)
+                                 for arg in args])
+    report = []
+    for i, phase in enumerate(workload.phases):
+        reads = Histogram()
+        writes = Histogram()
+        errors = 0
+        for results in worker_results:
+            reads.merge(Histogram(results[i]['reads']))
+            writes.merge(Histogram(results[i]['writes']))
+            errors += results[i]['errors']
+        requests = reads.count + writes.count
+        summary = {
+            'name': phase['name'],
+            'seconds': phase['duration'],
+            'requests': requests,
+            'requests_per_second': requests / float(phase['duration']),
+            'errors': errors,
+            'error_rate': errors / float(max(requests, 1)),
+            'read': reads.summarize(),
+            'write': writes.summarize(),
+        }
+        LOGGER.info('Phase %(name)s: %(requests_per_second).0f requests/s, '
+                    '%(errors)s errors' % summary)
+        report.append(summary)
+    return report
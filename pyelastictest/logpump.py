@@ -0,0 +1,130 @@
+import logging
+import mmap
+import os
+import re
+import threading
+from collections import deque
+
+LEVEL_PATTERN = re.compile(r'^\[[^\]]*\]\[(\w+)\s*\]')
+LEVELS = {
+    'TRACE': logging.DEBUG,
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARN': logging.WARNING,
+    'ERROR': logging.ERROR,
+    'FATAL': logging.CRITICAL,
+}
+
+
+def parse_level(line, default=logging.INFO):
+    """Return the logging level of an ElasticSearch log line or `default`
+    if the line doesn't start with a level, like stack trace lines.
+    """
+    match = LEVEL_PATTERN.match(line)
+    if match is None:
+        return default
+    return LEVELS.get(match.group(1), default)
+
+
+class LogPump(object):
+    """Tails a subprocess pipe in a background thread.
+
+    All output is appended to a log file, without keeping it in memory.
+    The most recent lines are kept in a fixed-size ring buffer and lines
+    at or above a given level are forwarded to a logger right away.
+    """
+
+    def __init__(self, stream, path, logger, size=1000,
+                 level=logging.WARNING):
+        """Create a log pump.
+
+        :param stream: The pipe to read from.
+        :param path: The log file to append all output to.
+        :type path: str
+        :param logger: The logger to forward lines to.
+        :type logger: :class:`logging.Logger`
+        :param size: The number of recent lines to keep in memory.
+        :type size: int
+        :param level: The minimum level of forwarded lines.
+        :type level: int
+        """
+        self.stream = stream
+        self.path = path
+        self.logger = logger
+        self.level = level
+        self.lines = deque(maxlen=size)
+        self.closed = False
+        self._watches = []
+        self._thread = None
+
+    def watch(self, pattern):
+        """Return an event which is set as soon as a line matching the
+        regular expression `pattern` is read, or the pipe is closed. Check
+        :attr:`closed` to distinguish both cases.
+
+        Watches should be added before the pump is started, so no line is
+        missed.
+
+        :param pattern: A regular expression.
+        :type pattern: str
+        :rtype: :class:`threading.Event`
+        """
+        event = threading.Event()
+        if self.closed:
+            event.set()
+        else:
+            self._watches.append((re.compile(pattern), event))
+        return event
+
+    def start(self):
+        """Start reading from the pipe in a daemon thread."""
+        self._thread = threading.Thread(target=self._pump)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _pump(self):
+        last_level = logging.INFO
+        # unbuffered, so the file is always complete for readers
+        with open(self.path, 'ab', 0) as log_file:
+            for raw in iter(self.stream.readline, b''):
+                log_file.write(raw)
+                line = raw.decode('utf-8', 'replace').rstrip()
+                self.lines.append(line)
+                last_level = parse_level(line, last_level)
+                if last_level >= self.level:
+                    self.logger.log(last_level, line)
+                for regex, event in self._watches:
+                    if regex.search(line):
+                        event.set()
+        self.stream.close()
+        self.closed = True
+        for regex, event in self._watches:
+            event.set()
+
+    def join(self, timeout=None):
+        """Wait for the pipe to be closed and all output to be written.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def tail(self, lines=None):
+        """Return the most recent lines of output.
+
+        :param lines: The number of lines, defaults to all buffered lines.
+        :type lines: int
+        """
+        result = list(self.lines)
+        if lines is not None:
+            result = result[-lines:]
+        return result
+
+    def view(self):
+        """Return a read-only memory map of the full log file, or `None` if
+        the log is empty. The caller is responsible for closing the map.
+
+        :rtype: :class:`mmap.mmap`
+        """
+        if not os.path.exists(self.path) or not os.path.getsize(self.path):
+            return None
+        with open(self.path, 'rb') as fd:
+            return mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
@@ -0,0 +1,701 @@
+"""An in-process stand-in for ElasticSearch nodes.
+
+The memory backend answers the subset of the HTTP API used by
+:class:`~pyelastictest.client.ExtendedClient` and
+:class:`~pyelastictest.isolated.Isolated`: cluster health, state and
+settings, index templates, index creation and deletion, settings, aliases,
+document index, get and delete requests, bulk requests, refresh, status and
+stats, as well as searches and counts using `match_all`, `term`, `terms`,
+`ids`, `bool` and `filtered` queries.
+
+All data is kept in memory and shared by all nodes of a cluster. Documents
+are visible to searches right away, there is no analysis beyond lowercasing
+and splitting strings on non-alphanumeric characters, and scores are
+always `1.0`. Tests relying on anything else need to use the default `jvm`
+backend.
+"""
+import fnmatch
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+
+try:
+    from http.server import BaseHTTPRequestHandler
+    from http.server import HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qsl
+    from urllib.parse import unquote
+    from urllib.parse import urlsplit
+except ImportError:  # pragma: nocover
+    from BaseHTTPServer import BaseHTTPRequestHandler
+    from BaseHTTPServer import HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib import unquote
+    from urlparse import parse_qsl
+    from urlparse import urlsplit
+
+from pyelastictest.client import ExtendedClient
+
+VERSION = '0.20.5'
+TOKEN_SPLIT = re.compile(r'[^\w]+', re.UNICODE)
+
+
+class RequestError(Exception):
+    """An error answered with an HTTP error status and the given error
+    message or result.
+    """
+
+    def __init__(self, status, error):
+        Exception.__init__(self, error)
+        self.status = status
+        self.error = error
+
+
+def flatten_settings(settings, prefix=''):
+    """Flatten nested index settings into `index.`-prefixed dotted keys with
+    string values, as returned by ElasticSearch.
+    """
+    result = {}
+    for key, value in (settings or {}).items():
+        key = prefix + key
+        if isinstance(value, dict):
+            result.update(flatten_settings(value, key + '.'))
+            continue
+        if not key.startswith('index.'):
+            key = 'index.' + key
+        if isinstance(value, bool):
+            value = str(value).lower()
+        result[key] = str(value)
+    return result
+
+
+def _tokens(value):
+    if isinstance(value, (list, tuple)):
+        result = set()
+        for item in value:
+            result |= _tokens(item)
+        return result
+    if hasattr(value, 'lower'):
+        return set([value]) | set(t for t in TOKEN_SPLIT.split(value.lower())
+                                  if t)
+    return set([value])
+
+
+def _field(source, name):
+    value = source
+    for part in name.split('.'):
+        if isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+
+def matches(query, doc_id, source):
+    """Return whether a document matches a query.
+
+    :raises: :class:`RequestError` for unsupported queries.
+    """
+    if not query:
+        return True
+    name, body = list(query.items())[0]
+    if name == 'match_all':
+        return True
+    if name in ('term', 'match', 'text', 'field'):
+        field, value = list(body.items())[0]
+        if isinstance(value, dict):
+            value = value.get('value', value.get('query'))
+        return value in _tokens(_field(source, field))
+    if name == 'terms':
+        field, values = [(k, v) for k, v in body.items()
+                         if k not in ('minimum_match', 'execution')][0]
+        return bool(_tokens(_field(source, field)) & set(values))
+    if name == 'ids':
+        return doc_id in body.get('values', [])
+    if name == 'bool':
+        def as_list(value):
+            if isinstance(value, dict):
+                return [value]
+            return value or []
+        if not all(matches(q, doc_id, source)
+                   for q in as_list(body.get('must'))):
+            return False
+        if any(matches(q, doc_id, source)
+               for q in as_list(body.get('must_not'))):
+            return False
+        should = as_list(body.get('should'))
+        return not should or any(matches(q, doc_id, source) for q in should)
+    if name in ('filtered', 'constant_score'):
+        return (matches(body.get('query'), doc_id, source) and
+                matches(body.get('filter'), doc_id, source))
+    raise RequestError(400, 'SearchParseException[No parser for [%s]]' % name)
+
+
+class Index(object):
+    """The data and metadata of one index.
+    """
+
+    def __init__(self, settings, mappings):
+        self.settings = settings
+        self.mappings = mappings
+        self.aliases = set()
+        self.docs = {}
+        self.index_total = 0
+        self.delete_total = 0
+
+    def metadata(self):
+        return {
+            'state': 'open',
+            'settings': dict(self.settings),
+            'mappings': dict(self.mappings),
+            'aliases': sorted(self.aliases),
+        }
+
+    def shards(self):
+        primaries = int(self.settings.get('index.number_of_shards', 1))
+        replicas = int(self.settings.get('index.number_of_replicas', 0))
+        return primaries, primaries * (1 + replicas)
+
+
+class MemoryStore(object):
+    """The shared in-memory state of a cluster, answering HTTP requests.
+    """
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+        self.indices = {}
+        self.templates = {}
+        self.settings = {'persistent': {}, 'transient': {}}
+        self.lock = threading.RLock()
+
+    # helpers
+
+    def _resolve(self, names, must_exist=True):
+        if names in (None, '', '_all', '*'):
+            return sorted(self.indices)
+        result = []
+        for name in names.split(','):
+            found = [i for i in sorted(self.indices)
+                     if fnmatch.fnmatchcase(i, name) or
+                     name in self.indices[i].aliases]
+            if not found and must_exist and '*' not in name:
+                raise RequestError(404, 'IndexMissingException[[%s] missing]'
+                                   % name)
+            result.extend(f for f in found if f not in result)
+        return result
+
+    def _create_index(self, name, body):
+        if name in self.indices:
+            raise RequestError(400, 'IndexAlreadyExistsException[[%s] '
+                               'Already exists]' % name)
+        if name.startswith('_') or name != name.lower():
+            raise RequestError(400, 'InvalidIndexNameException[[%s] '
+                               'Invalid index name]' % name)
+        settings = {'index.number_of_shards': '1',
+                    'index.number_of_replicas': '0'}
+        mappings = {}
+        templates = sorted(self.templates.values(),
+                           key=lambda t: t.get('order', 0))
+        for template in templates:
+            if fnmatch.fnmatchcase(name, template['template']):
+                settings.update(template.get('settings', {}))
+                mappings.update(template.get('mappings', {}))
+        body = body or {}
+        index_settings = body.get('settings', body)
+        index_settings = dict((k, v) for k, v in index_settings.items()
+                              if k != 'mappings')
+        settings.update(flatten_settings(index_settings))
+        mappings.update(body.get('mappings', {}))
+        self.indices[name] = Index(settings, mappings)
+        return self.indices[name]
+
+    def _get_index(self, name, create=False):
+        index = self.indices.get(name)
+        if index is None:
+            for candidate in self.indices.values():
+                if name in candidate.aliases:
+                    return candidate
+            if not create:
+                raise RequestError(404, 'IndexMissingException[[%s] missing]'
+                                   % name)
+            index = self._create_index(name, None)
+        return index
+
+    def _index_doc(self, name, doc_type, doc_id, source, op_type='index'):
+        index = self._get_index(name, create=True)
+        if doc_id is None:
+            doc_id = uuid.uuid4().hex
+        doc_id = str(doc_id)
+        key = (doc_type, doc_id)
+        if op_type == 'create' and key in index.docs:
+            raise RequestError(409, 'DocumentAlreadyExistsException[[%s][0] '
+                               '[%s][%s]: document already exists]'
+                               % (name, doc_type, doc_id))
+        version = index.docs.get(key, (0, None))[0] + 1
+        index.docs[key] = (version, source)
+        index.index_total += 1
+        if doc_type not in index.mappings:
+            index.mappings[doc_type] = {'properties': {}}
+        return {'ok': True, '_index': name, '_type': doc_type, '_id': doc_id,
+                '_version': version}
+
+    def _delete_doc(self, name, doc_type, doc_id, strict=True):
+        index = self._get_index(name)
+        doc_id = str(doc_id)
+        entry = index.docs.pop((doc_type, doc_id), None)
+        index.delete_total += 1
+        result = {'ok': True, '_index': name, '_type': doc_type,
+                  '_id': doc_id, 'found': entry is not None,
+                  '_version': entry and entry[0] + 1 or 1}
+        if entry is None and strict:
+            raise RequestError(404, result)
+        return result
+
+    def _shards(self, names):
+        total = sum(self.indices[n].shards()[1] for n in names)
+        return {'total': total, 'successful': total, 'failed': 0}
+
+    # request dispatch
+
+    def handle(self, method, path, params, body):
+        """Answer a request.
+
+        :returns: A tuple of the HTTP status and a JSON serializable result.
+        """
+        parts = [unquote(p) for p in path.split('/') if p]
+        with self.lock:
+            try:
+                if body and (not parts or parts[-1] != '_bulk'):
+                    try:
+                        body = json.loads(body)
+                    except ValueError:
+                        raise RequestError(400, 'Failed to parse body')
+                return 200, self._dispatch(method, parts, params, body)
+            except RequestError as error:
+                if isinstance(error.error, dict):
+                    return error.status, error.error
+                return error.status, {'error': error.error,
+                                      'status': error.status}
+
+    def _dispatch(self, method, parts, params, body):
+        if not parts:
+            if method == 'DELETE':
+                # pyelasticsearch strips `_all` from delete_all_indexes
+                return self._index(method, ['_all'], params, body)
+            if method not in ('GET', 'HEAD'):
+                raise RequestError(400, 'No handler found for uri [/] and '
+                                   'method [%s]' % method)
+            return {'ok': True, 'status': 200, 'name': self.cluster.name,
+                    'version': {'number': VERSION}}
+        first = parts[0]
+        if first == '_cluster':
+            return self._cluster(method, parts[1:], params, body)
+        if first == '_template':
+            return self._template(method, parts[1:], body)
+        if first == '_aliases':
+            return self._aliases(body)
+        if first == '_bulk':
+            return self._bulk(body, None, None, params)
+        if first in ('_search', '_count'):
+            return self._search(first, None, None, params, body)
+        if first in ('_refresh', '_flush', '_optimize'):
+            return {'ok': True, '_shards': self._shards(self.indices)}
+        if first in ('_status', '_stats'):
+            return self._stats(first, None)
+        if first.startswith('_') and first != '_all':
+            raise RequestError(400, 'No handler found for uri [/%s]' % first)
+        return self._index(method, parts, params, body)
+
+    def _cluster(self, method, parts, params, body):
+        action = parts and parts[0]
+        if action == 'health':
+            indices = list(self.indices.values())
+            primaries = sum(i.shards()[0] for i in indices)
+            nodes = len([n for n in self.cluster.nodes if n.running])
+            return {
+                'cluster_name': self.cluster.name,
+                'status': 'green',
+                'timed_out': False,
+                'number_of_nodes': nodes,
+                'number_of_data_nodes': nodes,
+                'active_primary_shards': primaries,
+                'active_shards': sum(i.shards()[1] for i in indices),
+                'relocating_shards': 0,
+                'initializing_shards': 0,
+                'unassigned_shards': 0,
+            }
+        if action == 'state':
+            return self._state(params)
+        if action == 'settings':
+            if method == 'GET':
+                return self.settings
+            for scope in ('persistent', 'transient'):
+                self.settings[scope].update(dict(
+                    (k, str(v)) for k, v in (body.get(scope) or {}).items()))
+            return {'ok': True}
+        raise RequestError(400, 'No handler found for uri [/_cluster/%s]'
+                           % action)
+
+    def _state(self, params):
+        nodes = dict((node.name, {
+            'name': node.name,
+            'transport_address': 'inet[/%s:%s]' % (self.cluster.ip,
+                                                   node.trans_port),
+        }) for node in self.cluster.nodes if node.running)
+        names = params.get('filter_indices')
+        state = {
+            'cluster_name': self.cluster.name,
+            'master_node': nodes and sorted(nodes)[0] or None,
+            'blocks': {},
+            'nodes': nodes,
+            'metadata': {
+                'templates': dict(self.templates),
+                'indices': dict(
+                    (name, self.indices[name].metadata())
+                    for name in self._resolve(names, must_exist=False)),
+            },
+            'routing_table': {'indices': {}},
+        }
+        for name in ('nodes', 'routing_table', 'metadata', 'blocks'):
+            if params.get('filter_' + name) in ('true', '1'):
+                del state[name]
+        return state
+
+    def _template(self, method, parts, body):
+        if not parts:
+            return dict(self.templates)
+        name = parts[0]
+        if method == 'GET':
+            if name in self.templates:
+                return {name: self.templates[name]}
+            return {}
+        if method == 'DELETE':
+            if name not in self.templates:
+                raise RequestError(404, 'IndexTemplateMissingException'
+                                   '[[%s] missing]' % name)
+            del self.templates[name]
+            return {'ok': True, 'acknowledged': True}
+        self.templates[name] = {
+            'template': body['template'],
+            'order': body.get('order', 0),
+            'settings': flatten_settings(body.get('settings')),
+            'mappings': body.get('mappings', {}),
+        }
+        return {'ok': True, 'acknowledged': True}
+
+    def _aliases(self, body):
+        for action in body.get('actions', []):
+            name, options = list(action.items())[0]
+            index = self._get_index(options['index'])
+            if name == 'add':
+                index.aliases.add(options['alias'])
+            else:
+                index.aliases.discard(options['alias'])
+        return {'ok': True, 'acknowledged': True}
+
+    def _stats(self, action, names):
+        names = self._resolve(names)
+        indices = {}
+        for name in names:
+            index = self.indices[name]
+            if action == '_status':
+                indices[name] = {
+                    'index': {},
+                    'docs': {'num_docs': len(index.docs),
+                             'max_doc': len(index.docs),
+                             'deleted_docs': 0},
+                    'shards': {},
+                }
+            else:
+                stats = {
+                    'docs': {'count': len(index.docs), 'deleted': 0},
+                    'indexing': {'index_total': index.index_total,
+                                 'delete_total': index.delete_total},
+                }
+                indices[name] = {'primaries': stats, 'total': stats}
+        return {'ok': True, '_shards': self._shards(names),
+                'indices': indices}
+
+    def _bulk(self, body, index, doc_type, params):
+        lines = [line for line in (body or '').splitlines() if line.strip()]
+        items = []
+        begin = time.time()
+        while lines:
+            action = json.loads(lines.pop(0))
+            op_type, meta = list(action.items())[0]
+            name = meta.get('_index', index)
+            type_ = meta.get('_type', doc_type)
+            try:
+                if op_type == 'delete':
+                    result = self._delete_doc(name, type_, meta['_id'],
+                                              strict=False)
+                else:
+                    source = json.loads(lines.pop(0))
+                    result = self._index_doc(name, type_, meta.get('_id'),
+                                             source, op_type)
+            except RequestError as error:
+                result = {'_index': name, '_type': type_,
+                          '_id': meta.get('_id'), 'error': error.error}
+            items.append({op_type: result})
+        return {'took': int((time.time() - begin) * 1000), 'items': items}
+
+    def _search(self, action, names, doc_type, params, body):
+        body = body or {}
+        query = body.get('query')
+        if 'q' in params:
+            q = params['q']
+            if q in ('*', '*:*'):
+                query = {'match_all': {}}
+            elif ':' in q:
+                field, value = q.split(':', 1)
+                query = {'term': {field: value}}
+            else:
+                query = {'term': {'_all': q}}
+        elif action == '_count' and body and 'query' not in body:
+            query = body
+        hits = []
+        types = doc_type and doc_type.split(',')
+        for name in self._resolve(names):
+            for (type_, doc_id), (version, source) in sorted(
+                    self.indices[name].docs.items()):
+                if types and type_ not in types:
+                    continue
+                if not self._matches(query, doc_id, source):
+                    continue
+                hits.append({'_index': name, '_type': type_, '_id': doc_id,
+                             '_score': 1.0, '_source': source})
+        shards = self._shards(self._resolve(names))
+        if action == '_count':
+            return {'count': len(hits), '_shards': shards}
+        for sort in reversed(body.get('sort', [])):
+            if isinstance(sort, dict):
+                field, order = list(sort.items())[0]
+                if isinstance(order, dict):
+                    order = order.get('order', 'asc')
+            else:
+                field, order = sort, 'asc'
+            hits.sort(key=lambda hit: _field(hit['_source'], field),
+                      reverse=order == 'desc')
+        start = int(params.get('from', body.get('from', 0)))
+        size = int(params.get('size', body.get('size', 10)))
+        return {
+            'took': 1,
+            'timed_out': False,
+            '_shards': shards,
+            'hits': {
+                'total': len(hits),
+                'max_score': hits and 1.0 or None,
+                'hits': hits[start:start + size],
+            },
+        }
+
+    def _matches(self, query, doc_id, source):
+        if query and list(query.keys())[0] == 'term':
+            field, value = list(query['term'].items())[0]
+            if field == '_all':
+                return any(value in _tokens(v) for v in source.values())
+        return matches(query, doc_id, source)
+
+    def _index(self, method, parts, params, body):
+        names = parts[0]
+        if len(parts) == 1:
+            if method in ('PUT', 'POST'):
+                self._create_index(names, body)
+                return {'ok': True, 'acknowledged': True}
+            if method == 'DELETE':
+                found = self._resolve(names)
+                if not found and names not in ('_all', '*'):
+                    raise RequestError(404, 'IndexMissingException[[%s] '
+                                       'missing]' % names)
+                for name in found:
+                    del self.indices[name]
+                return {'ok': True, 'acknowledged': True}
+            if method == 'HEAD':
+                self._resolve(names)
+                return {}
+            return dict((name, self.indices[name].metadata())
+                        for name in self._resolve(names))
+        second = parts[1]
+        if second in ('_refresh', '_flush', '_optimize'):
+            return {'ok': True, '_shards': self._shards(self._resolve(names))}
+        if second in ('_status', '_stats'):
+            return self._stats(second, names)
+        if second in ('_search', '_count'):
+            return self._search(second, names, None, params, body)
+        if second == '_bulk':
+            return self._bulk(body, names, None, params)
+        if second == '_settings':
+            resolved = self._resolve(names)
+            if method == 'GET':
+                return dict((name, {'settings': self.indices[name].settings})
+                            for name in resolved)
+            for name in resolved:
+                self.indices[name].settings.update(flatten_settings(body))
+            return {'ok': True}
+        if second == '_mapping':
+            return dict((name, self.indices[name].mappings)
+                        for name in self._resolve(names))
+        doc_type = second
+        if len(parts) == 2:
+            if method == 'POST':
+                return self._index_doc(names, doc_type, None, body)
+            raise RequestError(400, 'No handler found for uri [/%s]'
+                               % '/'.join(parts))
+        third = parts[2]
+        if third in ('_search', '_count'):
+            return self._search(third, names, doc_type, params, body)
+        if third == '_bulk':
+            return self._bulk(body, names, doc_type, params)
+        if third == '_mapping':
+            index = self._get_index(names)
+            if method == 'GET':
+                return {doc_type: index.mappings.get(doc_type, {})}
+            index.mappings.update(body)
+            return {'ok': True, 'acknowledged': True}
+        if len(parts) > 3 and parts[3] == '_create':
+            method, params = 'PUT', dict(params, op_type='create')
+        if method in ('PUT', 'POST'):
+            return self._index_doc(names, doc_type, third, body,
+                                   params.get('op_type', 'index'))
+        if method == 'DELETE':
+            return self._delete_doc(names, doc_type, third)
+        index = self._get_index(names)
+        entry = index.docs.get((doc_type, third))
+        if entry is None:
+            raise RequestError(404, {'_index': names, '_type': doc_type,
+                                     '_id': third, 'exists': False})
+        return {'_index': names, '_type': doc_type, '_id': third,
+                '_version': entry[0], 'exists': True, '_source': entry[1]}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Passes all requests on to the :class:`MemoryStore` of the server.
+    """
+
+    def _handle(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        body = length and self.rfile.read(length).decode('utf-8') or None
+        status, result = self.server.store.handle(
+            self.command, url.path, params, body)
+        data = json.dumps(result).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(data)
+
+    do_GET = do_PUT = do_POST = do_DELETE = do_HEAD = _handle
+
+    def log_message(self, format, *args):
+        self.server.logger.debug(format % args)
+
+
+class MemoryServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class MemoryNode(object):
+    """A cluster node answering requests from an in-process HTTP server
+    instead of an ElasticSearch subprocess.
+
+    It provides the same interface as :class:`~pyelastictest.node.Node`.
+    """
+
+    def __init__(self, cluster, name, port, trans_port):
+        """Create a new cluster node.
+
+        The arguments are the same as for :class:`~pyelastictest.node.Node`.
+        """
+        self.cluster = cluster
+        self.working_path = cluster.make_node_path()
+        self.name = name
+        self.port = port
+        self.trans_port = trans_port
+        self.url = 'http://%s:%s' % (self.cluster.ip, port)
+        self.running = False
+        self.process = None
+        self.logger = logging.getLogger(self.name)
+        self.client = None
+        self.data_seed = None
+        self.started = None
+        self.timings = {}
+        self.stdout = None
+        self.stderr = None
+        self.server = None
+        self.jvm_settings = {}
+
+    def start(self):
+        """Start serving requests in a background thread.
+        """
+        self.started = time.time()
+        self.timings = {}
+        self.cluster.port_allocator.unbind(self.port)
+        self.cluster.port_allocator.unbind(self.trans_port)
+        self.server = MemoryServer((self.cluster.ip, self.port),
+                                   RequestHandler)
+        self.server.store = self.cluster.memory_store
+        self.server.logger = self.logger
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.timings['spawn'] = time.time() - self.started
+        self.client = ExtendedClient([self.url], max_retries=0)
+        self.running = True
+
+    def stop(self):
+        """Stop the HTTP server.
+        """
+        if self.running:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        self.client = None
+        self.running = False
+
+    def restart(self, timeout=60):
+        """Restart the HTTP server. All data is kept in the shared store, so
+        there is nothing to recover.
+        """
+        begin = time.time()
+        self.stop()
+        self.start()
+        self.wait_until_started()
+        now = time.time()
+        result = {'seconds': now - begin,
+                  'joined': now - begin, 'recovery_seconds': 0.0,
+                  'recovered_bytes': 0, 'shards': 0}
+        self.timings['restart'] = result
+        return result
+
+    def set_ports(self, port, trans_port):
+        """Move the stopped node to new ports."""
+        self.port = port
+        self.trans_port = trans_port
+        self.url = 'http://%s:%s' % (self.cluster.ip, port)
+
+    def log_view(self, name='stdout'):
+        """Return `None`, the node doesn't produce any output."""
+        return None
+
+    def is_alive(self):
+        """Return whether the node is serving requests."""
+        return self.running
+
+    def wait_until_started(self, timeout=30):
+        """Return `True`, the node is ready as soon as it is started.
+
+        :raises: `OSError` if the node isn't running.
+        """
+        if not self.running:
+            raise OSError("Node %s isn't running" % self.name)
+        if 'joined' not in self.timings:
+            self.timings['listening'] = self.timings['joined'] = \
+                time.time() - self.started
+        return True
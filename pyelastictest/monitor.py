@@ -0,0 +1,227 @@
+import os
+import socket
+import threading
+import time
+from collections import deque
+from collections import namedtuple
+
+from pyelasticsearch.exceptions import ElasticHttpError
+from requests.exceptions import RequestException
+
+#: A single measurement of a node. CPU time is in seconds, memory in bytes,
+#: `gc_time` in milliseconds and any unavailable value is `None`.
+Sample = namedtuple('Sample', [
+    'time', 'cpu', 'rss', 'heap_used', 'heap_committed', 'gc_count',
+    'gc_time', 'rejected'])
+
+
+def read_proc_stat(pid):
+    """Return the total CPU time in seconds and the resident set size in
+    bytes of a process, or `(None, None)` if `/proc` isn't available or the
+    process is gone.
+    """
+    try:
+        with open('/proc/%s/stat' % pid) as fd:
+            data = fd.read()
+    except (IOError, OSError):
+        return None, None
+    # the command name in parentheses may contain spaces
+    fields = data[data.rindex(')') + 2:].split()
+    ticks = os.sysconf('SC_CLK_TCK')
+    cpu = (int(fields[11]) + int(fields[12])) / float(ticks)
+    rss = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+    return cpu, rss
+
+
+def parse_node_stats(stats):
+    """Return the heap usage, total GC count and time and the number of
+    rejected thread pool tasks from a nodes stats response of a single node.
+    """
+    nodes = list(stats.get('nodes', {}).values())
+    if not nodes:
+        return None, None, None, None, None
+    node = nodes[0]
+    jvm = node.get('jvm', {})
+    mem = jvm.get('mem', {})
+    gc = jvm.get('gc', {})
+    rejected = None
+    pools = node.get('thread_pool')
+    if pools:
+        rejected = sum(pool.get('rejected', 0) for pool in pools.values())
+    return (mem.get('heap_used_in_bytes'), mem.get('heap_committed_in_bytes'),
+            gc.get('collection_count'), gc.get('collection_time_in_millis'),
+            rejected)
+
+
+def _delta(first, last):
+    if first is None or last is None:
+        return None
+    return last - first
+
+
+def _maximum(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return max(values)
+
+
+class ResourceMonitor(object):
+    """Samples the resource usage of all nodes of a cluster in a background
+    thread.
+
+    Each sample holds the CPU time and resident set size of the node
+    process, read from `/proc`, and the heap usage, GC counts and times and
+    thread pool rejections reported by the node stats API. The most recent
+    samples of each node are kept in a fixed-size ring buffer.
+    """
+
+    def __init__(self, cluster, interval=1.0, size=3600):
+        """Create a resource monitor.
+
+        :param cluster: The cluster to monitor.
+        :type cluster: :class:`~pyelastictest.cluster.Cluster`
+        :param interval: Time in seconds between samples.
+        :type interval: float
+        :param size: The number of samples kept per node.
+        :type size: int
+        """
+        self.cluster = cluster
+        self.interval = interval
+        self.size = size
+        self.samples = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        """Whether the sampling thread is running."""
+        return self._thread is not None
+
+    def start(self):
+        """Start sampling in a daemon thread."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and take a final sample."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self.sample()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.sample()
+            self._stopped.wait(self.interval)
+
+    def sample(self):
+        """Take one sample of each running node."""
+        for node in list(self.cluster.nodes):
+            if not node.running:
+                continue
+            cpu = rss = None
+            if node.process is not None:
+                cpu, rss = read_proc_stat(node.process.pid)
+            stats = (None, None, None, None, None)
+            client = node.client
+            if client is not None:
+                try:
+                    stats = parse_node_stats(client.node_stats(
+                        jvm='true', thread_pool='true'))
+                except (ElasticHttpError, RequestException, socket.error,
+                        ValueError):
+                    pass
+            samples = self.samples.get(node.name)
+            if samples is None:
+                samples = self.samples[node.name] = deque(maxlen=self.size)
+            samples.append(Sample(time.time(), cpu, rss, *stats))
+
+    def summary(self):
+        """Return a summary of the samples of each node, keyed by node name.
+
+        :returns: A dictionary per node with the number of `samples`, the
+                  sampled `seconds`, the average `cpu_percent`, the maximum
+                  `rss` and `heap_used`, the last `heap_committed`, the
+                  `gc_count` and `gc_seconds` during the sampled time and
+                  their share `gc_percent` of it, and the number of
+                  `rejected` tasks.
+        """
+        result = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            first = samples[0]
+            last = samples[-1]
+            seconds = last.time - first.time
+            cpu = _delta(first.cpu, last.cpu)
+            gc_time = _delta(first.gc_time, last.gc_time)
+            summary = {
+                'samples': len(samples),
+                'seconds': seconds,
+                'cpu_percent': None,
+                'rss': _maximum(s.rss for s in samples),
+                'heap_used': _maximum(s.heap_used for s in samples),
+                'heap_committed': last.heap_committed,
+                'gc_count': _delta(first.gc_count, last.gc_count),
+                'gc_seconds': None,
+                'gc_percent': None,
+                'rejected': _delta(first.rejected, last.rejected),
+            }
+            if gc_time is not None:
+                summary['gc_seconds'] = gc_time / 1000.0
+            if seconds > 0:
+                if cpu is not None:
+                    summary['cpu_percent'] = 100.0 * cpu / seconds
+                if gc_time is not None:
+                    summary['gc_percent'] = gc_time / 10.0 / seconds
+            result[name] = summary
+        return result
+
+    def format_summary(self):
+        """Return a human readable table of the :meth:`summary`."""
+        lines = ['%-40s %6s %10s %10s %8s %6s %8s' % (
+            'node', 'cpu%', 'rss MB', 'heap MB', 'gc', 'gc%', 'rejected')]
+
+        def fmt(value, pattern, scale=1):
+            if value is None:
+                return '-'
+            return pattern % (value / scale)
+        for name, item in sorted(self.summary().items()):
+            lines.append('%-40s %6s %10s %10s %8s %6s %8s' % (
+                name, fmt(item['cpu_percent'], '%.0f'),
+                fmt(item['rss'], '%.1f', 1024.0 ** 2),
+                fmt(item['heap_used'], '%.1f', 1024.0 ** 2),
+                fmt(item['gc_count'], '%d'),
+                fmt(item['gc_percent'], '%.1f'),
+                fmt(item['rejected'], '%d')))
+        return '\n'.join(lines)
+
+    def to_dict(self):
+        """Return the summary and all samples as a JSON serializable
+        dictionary. The samples of each node are stored as lists of values
+        in the order of the `fields`.
+        """
+        return {
+            'fields': list(Sample._fields),
+            'summary': self.summary(),
+            'samples': dict((name, [list(sample) for sample in samples])
+                            for name, samples in self.samples.items()),
+        }
+
+    def attach(self, report, name):
+        """Add the samples to a benchmark report, see
+        :func:`~pyelastictest.benchmark.run_benchmarks`.
+
+        :param report: The report.
+        :type report: dict
+        :param name: The name of the measurement the samples belong to.
+        :type name: str
+        """
+        report.setdefault('resources', {})[name] = self.to_dict()
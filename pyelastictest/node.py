@@ -3,7 +3,13 @@ import os
 import os.path
 import shutil
 import subprocess
-import tempfile
+import tarfile
+import time
+
+from pyelastictest.client import ExtendedClient
+from pyelastictest.logpump import LogPump
+from pyelastictest.ports import BIND_ERROR_PATTERN
+from pyelastictest.ports import PortBindError
 
 
 CONF = """\
@@ -45,13 +51,125 @@ appender:
       conversionPattern: "[%d{ISO8601}][%-5p][%-25c] %m%n"
 """
 
+# logged by ElasticSearch once the node is started and serving HTTP
+STARTED_PATTERN = r'\]: started$'
+
+PROFILES = {
+    # reduce JVM startup time
+    'fast-start': {
+        'min_memory': '64m',
+        'max_memory': None,
+        'java_opts': ['-client', '-XX:+TieredCompilation',
+                      '-XX:TieredStopAtLevel=1'],
+        'gc': None,
+        'class_data_sharing': True,
+    },
+    # fully optimizing JIT and a fixed heap for load tests
+    'throughput': {
+        'min_memory': '1g',
+        'max_memory': '1g',
+        'java_opts': ['-server', '-XX:+TieredCompilation'],
+        'gc': None,
+        'class_data_sharing': False,
+    },
+    # small heap and serial GC for many nodes on one machine
+    'low-memory': {
+        'min_memory': '32m',
+        'max_memory': '128m',
+        'java_opts': ['-client', '-XX:+TieredCompilation',
+                      '-XX:TieredStopAtLevel=1'],
+        'gc': 'serial',
+        'class_data_sharing': True,
+    },
+}
+
+GC_OPTIONS = {
+    'serial': '-XX:+UseSerialGC',
+    'parallel': '-XX:+UseParallelGC',
+    'g1': '-XX:+UseG1GC',
+}
+
+# GC options added by the ElasticSearch include script
+ES_GC_OPTIONS = ('UseParNewGC', 'UseConcMarkSweepGC',
+                 'CMSInitiatingOccupancyFraction',
+                 'UseCMSInitiatingOccupancyOnly')
+
+
+def get_profile(profile=None):
+    """Return the settings of a JVM profile.
+
+    :param profile: The name of one of the :data:`PROFILES` or a dictionary
+                    with a `base` profile name, defaulting to `fast-start`,
+                    and any settings to override. If `None` is specified,
+                    the name will be taken from the `ES_PROFILE`
+                    environment variable and defaults to `fast-start`.
+    :returns: A dictionary with the profile `name`, `min_memory`,
+              `max_memory`, `java_opts`, `gc` and `class_data_sharing`
+              settings.
+    :raises: `ValueError` for unknown profile names or GC choices.
+    """
+    if profile is None:
+        profile = os.environ.get('ES_PROFILE') or 'fast-start'
+    overrides = {}
+    if isinstance(profile, dict):
+        overrides = dict(profile)
+        profile = overrides.pop('base', overrides.pop('name', 'fast-start'))
+    if profile not in PROFILES:
+        raise ValueError('Unknown JVM profile: %s' % profile)
+    settings = dict(PROFILES[profile], name=profile)
+    settings.update(overrides)
+    if settings['gc'] is not None and settings['gc'] not in GC_OPTIONS:
+        raise ValueError('Unknown GC choice: %s' % settings['gc'])
+    return settings
+
+
+def strip_gc_options(include_path):
+    """Remove the GC options from a copy of the ElasticSearch include
+    script. The file is replaced instead of changed in place, so hardlinks
+    to the template are left alone.
+    """
+    with open(include_path) as fd:
+        lines = [line for line in fd
+                 if not any(option in line for option in ES_GC_OPTIONS)]
+    tmp_path = include_path + '.tmp'
+    with open(tmp_path, 'w') as fd:
+        fd.writelines(lines)
+    os.chmod(tmp_path, os.stat(include_path).st_mode)
+    os.rename(tmp_path, include_path)
+
+
+def populate_node_dir(working_path, install_path):
+    """Copy the startup scripts and write the logging configuration, which
+    are shared by all nodes using the same install path.
+
+    :param working_path: The working directory of a node.
+    :type working_path: str
+    :param install_path: The filesystem path to an unpacked ElasticSearch
+                         tarball.
+    :type install_path: str
+    """
+    bin_path = os.path.join(working_path, "bin")
+    config_path = os.path.join(working_path, "config")
+    for path in (bin_path, config_path):
+        if not os.path.exists(path):
+            os.mkdir(path)
+
+    # copy ES startup scripts
+    es_bin_dir = os.path.join(install_path, 'bin')
+    shutil.copy(os.path.join(es_bin_dir, 'elasticsearch'), bin_path)
+    shutil.copy(os.path.join(es_bin_dir, 'elasticsearch.in.sh'), bin_path)
+
+    # write log file
+    with open(os.path.join(config_path, "logging.yml"), "w") as config:
+        config.write(LOG_CONF)
+
 
 class Node(object):
     """Start a new ElasticSearch node, isolated in a temporary
     directory and part of a cluster.
     """
 
-    def __init__(self, cluster, name, port, trans_port):
+    def __init__(self, cluster, name, port, trans_port, profile=None):
         """Create a new cluster node.
 
         :param cluster: A cluster instance which this node is a part of.
@@ -62,9 +180,15 @@ class Node(object):
         :type port: int
         :param trans_port: The internal cluster communication port.
         :type trans_port: int
+        :param profile: The JVM profile, as accepted by :func:`get_profile`.
+                        Defaults to the profile of the cluster.
         """
         self.cluster = cluster
-        self.working_path = tempfile.mkdtemp(dir=cluster.working_path)
+        if profile is None:
+            profile = getattr(cluster, 'profile', None)
+        self.profile = get_profile(profile)
+        self.jvm_settings = {}
+        self.working_path = cluster.make_node_path()
         self.name = name
         self.port = port
         self.trans_port = trans_port
@@ -74,16 +198,39 @@ class Node(object):
         self.logger = logging.getLogger(self.name)
         self.stdout = None
         self.stderr = None
+        self.client = None
+        self.data_seed = None
+        self.started = None
+        self.timings = {}
+        self._args = None
+        self._environ = None
+        self._cds_dump = None
+        self._started_event = None
 
     def start(self):
         """Start the node as a subprocess in a temporary directory.
+
+        The working directory is prepared on the first call only, later
+        calls reuse the data path, configuration and ports. The call returns
+        as soon as the subprocess is spawned, use :meth:`wait_until_started`
+        to wait for the node. The time spent preparing the working
+        directory and spawning the process is recorded in :attr:`timings`.
+        """
+        if self._environ is None:
+            self.prepare()
+        self.spawn()
+
+    def prepare(self):
+        """Create the working directory, configuration and environment of
+        the node.
         """
+        begin = time.time()
+        self.timings = {}
         install_path = self.cluster.install_path
         bin_path = os.path.join(self.working_path, "bin")
         config_path = os.path.join(self.working_path, "config")
         conf_path = os.path.join(config_path, "elasticsearch.yml")
         log_path = os.path.join(self.working_path, "logs")
-        log_conf_path = os.path.join(config_path, "logging.yml")
         data_path = os.path.join(self.working_path, "data")
 
         # create temporary directory structure
@@ -91,10 +238,20 @@ class Node(object):
             if not os.path.exists(path):
                 os.mkdir(path)
 
-        # copy ES startup scripts
-        es_bin_dir = os.path.join(install_path, 'bin')
-        shutil.copy(os.path.join(es_bin_dir, 'elasticsearch'), bin_path)
-        shutil.copy(os.path.join(es_bin_dir, 'elasticsearch.in.sh'), bin_path)
+        # restore a data directory archived by the fixture cache
+        cluster_data_path = os.path.join(data_path, self.cluster.name)
+        if self.data_seed and not os.path.exists(cluster_data_path):
+            archive = tarfile.open(self.data_seed)
+            try:
+                archive.extractall(cluster_data_path)
+            finally:
+                archive.close()
+
+        # link prebuilt template or copy ES startup scripts
+        if self.cluster.template is not None:
+            self.cluster.template.copy_to(self.working_path)
+        else:
+            populate_node_dir(self.working_path, install_path)
 
         # write configuration file
         with open(conf_path, "w") as config:
@@ -111,16 +268,6 @@ class Node(object):
                 log_path=log_path,
             ))
 
-        # write log file
-        with open(log_conf_path, "w") as config:
-            config.write(LOG_CONF)
-
-        # create stdout/err files
-        self.stdout = tempfile.TemporaryFile(
-            suffix='stdout', dir=self.working_path)
-        self.stderr = tempfile.TemporaryFile(
-            suffix='stderr', dir=self.working_path)
-
         # setup environment, copy from base process
         environ = os.environ.copy()
         # configure explicit ES_INCLUDE, to prevent fallback to
@@ -130,35 +277,185 @@ class Node(object):
         # let the process find our jar files first
         path = '{dir}/elasticsearch-*:{dir}/*:{dir}/sigar/*:$ES_CLASSPATH'
         environ['ES_CLASSPATH'] = path.format(dir=lib_dir)
-        # reduce JVM startup time
-        environ['ES_MIN_MEM'] = '64m'
-        environ['JAVA_OPTS'] = \
-            '-client -XX:+TieredCompilation -XX:TieredStopAtLevel=1'
+        # apply JVM profile
+        profile = self.profile
+        java_opts = list(profile['java_opts'])
+        if profile['gc'] is not None:
+            strip_gc_options(environ['ES_INCLUDE'])
+            java_opts.append(GC_OPTIONS[profile['gc']])
+        self.jvm_settings = {'profile': profile['name']}
+        for key, value in (('ES_MIN_MEM', profile['min_memory']),
+                           ('ES_MAX_MEM', profile['max_memory']),
+                           ('JAVA_OPTS', ' '.join(java_opts))):
+            if value:
+                environ[key] = self.jvm_settings[key] = value
+
+        self._args = [bin_path + "/elasticsearch", "-f",
+                      "-Des.config=" + conf_path]
+        self._environ = environ
+        self.timings['prepare'] = time.time() - begin
+
+    def spawn(self):
+        """Spawn the node subprocess in the prepared working directory.
+        """
+        log_path = os.path.join(self.working_path, "logs")
+        environ = dict(self._environ)
+        # the class data sharing archive may have been written meanwhile
+        self._cds_dump = None
+        if self.profile['class_data_sharing']:
+            if self.cluster.cds is not None:
+                options, mode, self._cds_dump = \
+                    self.cluster.cds.java_options()
+            else:
+                options, mode = ['-Xshare:auto'], 'default'
+            environ['JAVA_OPTS'] = self.jvm_settings['JAVA_OPTS'] = \
+                ' '.join([environ.get('JAVA_OPTS', '')] + options).strip()
+            self.jvm_settings['cds'] = mode
 
+        for key in ('spawn', 'listening', 'joined'):
+            self.timings.pop(key, None)
+        # hand the reserved ports over to the node right before it binds
+        self.cluster.port_allocator.unbind(self.port)
+        self.cluster.port_allocator.unbind(self.trans_port)
+        self.started = time.time()
         self.process = subprocess.Popen(
-            args=[bin_path + "/elasticsearch", "-f",
-                  "-Des.config=" + conf_path],
-            stdout=self.stdout,
-            stderr=self.stderr,
-            env=environ
+            args=self._args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=environ,
+            close_fds=True,
         )
+        # pump the output into log files, forwarding warnings and errors
+        self.stdout = LogPump(self.process.stdout,
+                              os.path.join(log_path, 'stdout.log'),
+                              self.logger)
+        self.stderr = LogPump(self.process.stderr,
+                              os.path.join(log_path, 'stderr.log'),
+                              self.logger)
+        self._started_event = self.stdout.watch(STARTED_PATTERN)
+        self.stdout.start()
+        self.stderr.start()
+        self.timings['spawn'] = time.time() - self.started
+        self.client = ExtendedClient([self.url], max_retries=0)
         self.running = True
 
+    def set_ports(self, port, trans_port):
+        """Move the stopped node to new ports. The configuration is
+        rewritten on the next :meth:`start`.
+
+        :param port: The new HTTP port.
+        :type port: int
+        :param trans_port: The new transport port.
+        :type trans_port: int
+        """
+        self.port = port
+        self.trans_port = trans_port
+        self.url = 'http://%s:%s' % (self.cluster.ip, port)
+        self._environ = None
+
+    def is_alive(self):
+        """Return whether the node subprocess is still running.
+        """
+        return self.process is not None and self.process.poll() is None
+
+    def wait_until_started(self, timeout=30):
+        """Wait for the node to log that it has started.
+
+        The log output is watched instead of polling the node, so this
+        returns as soon as the start message is logged or the process
+        exits. The time since the process was spawned is recorded in
+        :attr:`timings` under the `listening` key.
+
+        :param timeout: Time in seconds to wait for the node.
+        :type timeout: float
+        :returns: `True` if the node started, `False` on timeout.
+        :raises: `OSError` if the node subprocess has exited, or
+                 :class:`~pyelastictest.ports.PortBindError` if it exited
+                 because one of its ports was taken.
+        """
+        self._started_event.wait(max(timeout, 0))
+        if self.stdout.closed or not self.is_alive():
+            self.stdout.join(1)
+            self.stderr.join(1)
+            output = '\n'.join(self.stdout.tail(10) + self.stderr.tail(10))
+            message = "Node %s exited with code %s: %s" % (
+                self.name, self.process.wait(), output)
+            if BIND_ERROR_PATTERN.search(output):
+                raise PortBindError(message, node=self)
+            raise OSError(message)
+        if not self._started_event.is_set():
+            return False
+        self.timings.setdefault('listening', time.time() - self.started)
+        return True
+
+    def restart(self, timeout=60):
+        """Restart the node, keeping its data path, configuration and ports.
+
+        Waits for the node to rejoin the cluster and for all shards of the
+        cluster to be recovered. The result is also stored in
+        :attr:`timings` under the `restart` key.
+
+        :param timeout: Time in seconds to wait for the node to start and
+                        recover.
+        :type timeout: int
+        :returns: A dictionary with the total `seconds`, the time until the
+                  node `joined` the cluster, and the longest
+                  `recovery_seconds`, the `recovered_bytes` and the number of
+                  `shards` recovered onto the node.
+        :raises: `OSError` if the node exited or didn't recover in time.
+        """
+        begin = time.time()
+        deadline = begin + timeout
+        self.stop()
+        self.spawn()
+        if not self.wait_until_started(deadline - time.time()):
+            raise OSError("Node %s didn't start in time" % self.name)
+        joined = time.time() - begin
+        health = self.client.health(
+            wait_for_status='green',
+            wait_for_nodes='>=%s' % len(self.cluster),
+            timeout='%dms' % max((deadline - time.time()) * 1000, 1))
+        if health.get('timed_out'):
+            raise OSError("Node %s didn't recover in time" % self.name)
+        result = dict(self.recovery_stats(),
+                      seconds=time.time() - begin, joined=joined)
+        self.timings['restart'] = result
+        return result
+
+    def node_id(self):
+        """Return the id the cluster assigned to the running node.
+        """
+        return list(self.client.node_stats()['nodes'].keys())[0]
+
+    def recovery_stats(self):
+        """Return the longest `recovery_seconds`, the `recovered_bytes` and
+        the number of `shards` of the last recovery of all shards allocated
+        to this node.
+        """
+        node_id = self.node_id()
+        status = self.client.recovery_status()
+        result = {'recovery_seconds': 0.0, 'recovered_bytes': 0, 'shards': 0}
+        for index in status.get('indices', {}).values():
+            for copies in index.get('shards', {}).values():
+                for copy in copies:
+                    if copy.get('routing', {}).get('node') != node_id:
+                        continue
+                    result['shards'] += 1
+                    for kind in ('gateway_recovery', 'peer_recovery'):
+                        recovery = copy.get(kind)
+                        if not recovery:
+                            continue
+                        result['recovered_bytes'] += recovery.get(
+                            'index', {}).get('recovered_size_in_bytes', 0)
+                        result['recovery_seconds'] = max(
+                            result['recovery_seconds'],
+                            recovery.get('time_in_millis', 0) / 1000.0)
+        return result
+
     def stop(self):
         """Stop the node and terminate the subprocess.
         """
         if self.running:
-            # dump log fies to logging module
-            self.logger.debug('### Begin captured stdout ###')
-            self.stdout.seek(0)
-            for line in self.stdout.readlines():
-                self.logger.debug(line)
-            self.logger.debug('### End captured stdout ###')
-            self.logger.debug('### Begin captured stderr ###')
-            self.stderr.seek(0)
-            for line in self.stderr.readlines():
-                self.logger.debug(line)
-            self.logger.debug('### End captured stderr ###')
             try:
                 self.process.terminate()
             except OSError:
@@ -166,4 +463,32 @@ class Node(object):
                 pass
             else:
                 self.process.wait()
+            if self._cds_dump is not None:
+                # the class data sharing archive is written at exit
+                self.cluster.cds.finish(self._cds_dump)
+                self._cds_dump = None
+            for name in ('stdout', 'stderr'):
+                pump = getattr(self, name)
+                pump.join(5)
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    # dump the most recent output to logging module
+                    self.logger.debug('### Begin captured %s ###' % name)
+                    for line in pump.tail():
+                        self.logger.debug(line)
+                    self.logger.debug('### End captured %s ###' % name)
+        self.client = None
         self.running = False
+
+    def log_view(self, name='stdout'):
+        """Return a read-only memory map of the full `stdout` or `stderr`
+        output of the node, or `None` if there is no output. The caller is
+        responsible for closing the map.
+
+        :param name: Either `stdout` or `stderr`.
+        :type name: str
+        :rtype: :class:`mmap.mmap`
+        """
+        pump = getattr(self, name)
+        if pump is None:
+            return None
+        return pump.view()
@@ -0,0 +1,18 @@
+"""A nose plugin, which boots the cluster of
+:func:`~pyelastictest.cluster.get_cluster` in the background as soon as the
+test run begins, so the startup overlaps with test collection. Enable it
+via ``nosetests --with-elasticsearch``.
+"""
+from nose.plugins import Plugin
+
+from pyelastictest.cluster import boot_cluster
+
+
+class BackgroundBoot(Plugin):
+    """Start the cluster in a background thread before tests are collected.
+    """
+
+    name = 'elasticsearch'
+
+    def begin(self):
+        boot_cluster()
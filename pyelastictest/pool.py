@@ -0,0 +1,312 @@
+import json
+import logging
+import os
+import os.path
+import threading
+import time
+
+from pyelastictest.cache import write_json
+from pyelastictest.cluster import AttachedCluster
+from pyelastictest.cluster import Cluster
+from pyelastictest.cluster import reset_cluster
+from pyelastictest.ports import lock_file
+
+LOGGER = logging.getLogger('pyelastictest.pool')
+
+
+def get_pool_path(pool_path=None):
+    """Return the pool directory, taken from the `ES_POOL_PATH` environment
+    variable if none is specified.
+
+    :param pool_path: An explicit pool directory.
+    :type pool_path: str
+    """
+    if pool_path is None:
+        pool_path = os.environ.get('ES_POOL_PATH')
+    if not pool_path:
+        raise ValueError('ES_POOL_PATH environment variable must be defined.')
+    return pool_path
+
+
+def is_pool_running(pool_path=None):
+    """Return whether a :class:`ClusterPool` is serving the pool directory.
+
+    :param pool_path: The pool directory. If `None` is specified, the path
+                      will be taken from the `ES_POOL_PATH` environment
+                      variable.
+    :type pool_path: str
+    """
+    path = os.path.join(get_pool_path(pool_path), 'pool.lock')
+    if not os.path.exists(path):
+        return False
+    lock = lock_file(path)
+    if lock is None:
+        return True
+    lock.close()
+    return False
+
+
+class ClusterPool(object):
+    """Keeps a number of warm clusters running and lets other processes
+    lease them.
+
+    Each cluster occupies a slot in the pool directory. A slot consists of
+    a `<slot>.json` descriptor with the cluster name and urls, which only
+    exists while the cluster is ready, and a `<slot>.lock` file. Leasing a
+    cluster means holding an exclusive `flock` on the lock file, so a lease
+    is released automatically if the leasing process dies.
+
+    A background thread checks the clusters and replaces dead ones as soon
+    as their slot isn't leased anymore. The pool itself holds a lock on
+    `pool.lock` while it is running, so only one pool serves a directory.
+
+    With an `idle_timeout` the pool stops itself once none of its clusters
+    was leased for that long, which makes a pool of one cluster usable as a
+    background daemon shared by consecutive test runs.
+    """
+
+    def __init__(self, pool_path=None, size=2, interval=5.0,
+                 cluster_options=None, idle_timeout=None):
+        """Create a cluster pool.
+
+        :param pool_path: The pool directory. If `None` is specified, the path
+                          will be taken from the `ES_POOL_PATH` environment
+                          variable.
+        :type pool_path: str
+        :param size: The number of clusters to keep running.
+        :type size: int
+        :param interval: Time in seconds between health checks.
+        :type interval: float
+        :param cluster_options: A dictionary of keyword arguments passed to
+                                each :class:`~pyelastictest.cluster.Cluster`.
+        :type cluster_options: dict
+        :param idle_timeout: Time in seconds after the last lease, after
+                             which :meth:`serve_forever` stops the pool, or
+                             `None` to keep running.
+        :type idle_timeout: float
+        """
+        self.pool_path = get_pool_path(pool_path)
+        self.size = size
+        self.interval = interval
+        self.cluster_options = cluster_options or {}
+        self.idle_timeout = idle_timeout
+        self.last_used = None
+        self.clusters = {}
+        self._booting = set()
+        self._lock = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def _path(self, slot, ext):
+        return os.path.join(self.pool_path, '%s.%s' % (slot, ext))
+
+    def start(self):
+        """Boot all clusters in the background and start monitoring them.
+
+        :raises: `OSError` if another pool serves the same directory.
+        """
+        if not os.path.isdir(self.pool_path):
+            os.makedirs(self.pool_path)
+        self._lock = lock_file(self._path('pool', 'lock'))
+        if self._lock is None:
+            raise OSError('A cluster pool is already running in %s' %
+                          self.pool_path)
+        self.last_used = time.time()
+        self._stopped.clear()
+        self.check()
+        self._thread = threading.Thread(target=self._maintain)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop monitoring and terminate all clusters.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        while self._booting:
+            time.sleep(0.1)
+        for slot, cluster in list(self.clusters.items()):
+            if os.path.exists(self._path(slot, 'json')):
+                os.remove(self._path(slot, 'json'))
+            cluster.terminate()
+        self.clusters = {}
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
+
+    def wait(self, timeout=None):
+        """Wait until all clusters are ready.
+
+        :param timeout: Time in seconds to wait or `None` to wait forever.
+        :type timeout: float
+        :returns: `True` if all clusters are ready.
+        """
+        begin = time.time()
+        while timeout is None or time.time() - begin < timeout:
+            if not self._booting and len(self.clusters) == self.size:
+                return True
+            time.sleep(0.1)
+        return False
+
+    def serve_forever(self):
+        """Start the pool and keep it running until interrupted or idle.
+        """
+        self.start()
+        try:
+            while not self._stopped.is_set():
+                self._stopped.wait(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def check(self):
+        """Replace all dead or missing clusters, whose slots aren't leased.
+        """
+        for slot in range(self.size):
+            if slot in self._booting:
+                continue
+            cluster = self.clusters.get(slot)
+            if cluster is not None and \
+                    all(node.is_alive() for node in cluster.nodes):
+                continue
+            lock = lock_file(self._path(slot, 'lock'))
+            if lock is None:
+                continue
+            self._booting.add(slot)
+            thread = threading.Thread(target=self._boot, args=(slot, lock))
+            thread.daemon = True
+            thread.start()
+
+    def is_idle(self):
+        """Return whether no cluster was leased for the `idle_timeout`.
+        """
+        now = time.time()
+        for slot in list(self.clusters):
+            path = self._path(slot, 'lock')
+            # leases touch the lock file, so short leases aren't missed
+            try:
+                self.last_used = max(self.last_used, os.path.getmtime(path))
+            except OSError:
+                pass
+            lock = lock_file(path)
+            if lock is None:
+                self.last_used = now
+            else:
+                lock.close()
+        if self.idle_timeout is None:
+            return False
+        return now - self.last_used > self.idle_timeout
+
+    def _maintain(self):
+        while not self._stopped.is_set():
+            self._stopped.wait(self.interval)
+            if self._stopped.is_set():
+                break
+            if self.is_idle():
+                LOGGER.info('No cluster was leased for %s seconds, stopping'
+                            % self.idle_timeout)
+                self._stopped.set()
+                break
+            self.check()
+
+    def _boot(self, slot, lock):
+        try:
+            if os.path.exists(self._path(slot, 'json')):
+                os.remove(self._path(slot, 'json'))
+            old = self.clusters.pop(slot, None)
+            if old is not None:
+                old.terminate()
+            cluster = Cluster(**self.cluster_options)
+            try:
+                cluster.start()
+            except Exception:
+                LOGGER.exception('Failed to start pool cluster %s' % slot)
+                cluster.terminate()
+                return
+            write_json(self._path(slot, 'json'), {
+                'name': cluster.name,
+                'urls': cluster.urls,
+                'pid': os.getpid(),
+            })
+            self.clusters[slot] = cluster
+        finally:
+            self._booting.discard(slot)
+            lock.close()
+
+
+class ClusterLease(object):
+    """A cluster leased from a :class:`ClusterPool`.
+    """
+
+    def __init__(self, pool_path, slot, lock, descriptor):
+        self.pool_path = pool_path
+        self.slot = slot
+        self.cluster = AttachedCluster(descriptor['name'], descriptor['urls'])
+        self._lock = lock
+        self._dirty = os.path.join(pool_path, '%s.dirty' % slot)
+
+    def acquire(self):
+        # reset clusters left behind by crashed processes
+        if os.path.exists(self._dirty):
+            reset_cluster(self.cluster)
+        open(self._dirty, 'w').close()
+        os.utime(self._lock.name, None)
+
+    def release(self):
+        """Reset the cluster and return it to the pool.
+        """
+        if self._lock is None:
+            return
+        try:
+            reset_cluster(self.cluster)
+            os.remove(self._dirty)
+        finally:
+            os.utime(self._lock.name, None)
+            self.cluster.stop()
+            self._lock.close()
+            self._lock = None
+
+
+def lease_cluster(pool_path=None, timeout=60):
+    """Lease a ready cluster from a :class:`ClusterPool`.
+
+    :param pool_path: The pool directory. If `None` is specified, the path
+                      will be taken from the `ES_POOL_PATH` environment
+                      variable.
+    :type pool_path: str
+    :param timeout: Time in seconds to wait for a cluster to become available.
+    :type timeout: float
+    :rtype: :class:`ClusterLease`
+    :raises: `OSError` if no cluster became available in time or no pool is
+             running.
+    """
+    pool_path = get_pool_path(pool_path)
+    begin = time.time()
+    while time.time() - begin < timeout:
+        if not is_pool_running(pool_path):
+            raise OSError('No cluster pool is running in %s' % pool_path)
+        names = os.path.isdir(pool_path) and os.listdir(pool_path) or []
+        for name in sorted(names):
+            if not name.endswith('.json'):
+                continue
+            slot = name[:-len('.json')]
+            lock = lock_file(os.path.join(pool_path, slot + '.lock'))
+            if lock is None:
+                continue
+            try:
+                with open(os.path.join(pool_path, name)) as fd:
+                    descriptor = json.load(fd)
+            except (IOError, OSError, ValueError):
+                lock.close()
+                continue
+            lease = ClusterLease(pool_path, slot, lock, descriptor)
+            if not lease.cluster.is_healthy():
+                lock.close()
+                continue
+            lease.acquire()
+            return lease
+        time.sleep(0.1)
+    raise OSError("Couldn't lease a cluster from %s" % pool_path)
@@ -0,0 +1,157 @@
+import errno
+import fcntl
+import os
+import os.path
+import re
+import socket
+import tempfile
+import threading
+
+# logged by ElasticSearch if the HTTP or transport port is taken
+BIND_ERROR_PATTERN = re.compile(
+    r'Bind(Transport|Http)Exception|Address already in use')
+
+
+class PortBindError(OSError):
+    """Raised if a node couldn't bind to its ports."""
+
+    def __init__(self, message, node=None):
+        OSError.__init__(self, message)
+        self.node = node
+
+
+def set_cloexec(fd):
+    """Keep a file descriptor from being inherited by subprocesses, which
+    would otherwise hold on to reserved sockets and locks.
+
+    :param fd: A file descriptor or an object with a `fileno` method.
+    """
+    if hasattr(fd, 'fileno'):
+        fd = fd.fileno()
+    flags = fcntl.fcntl(fd, fcntl.F_GETFD)
+    fcntl.fcntl(fd, fcntl.F_SETFD, flags | fcntl.FD_CLOEXEC)
+
+
+def lock_file(path):
+    """Try to get an exclusive lock on the given file.
+
+    :returns: The open file holding the lock or `None` if the file is
+              locked by someone else. Closing the file releases the lock.
+    """
+    fd = open(path, 'a')
+    set_cloexec(fd)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except (IOError, OSError):
+        fd.close()
+        return None
+    return fd
+
+
+def get_port_path(port_path=None):
+    """Return the directory holding the port lock files.
+
+    :param port_path: An explicit directory. If `None` is specified, the
+                      path will be taken from the `ES_PORT_PATH` environment
+                      variable and defaults to a directory in the system
+                      temporary directory.
+    :type port_path: str
+    """
+    if port_path is None:
+        port_path = os.environ.get('ES_PORT_PATH') or os.path.join(
+            tempfile.gettempdir(), 'pyelastictest-ports')
+    if not os.path.isdir(port_path):
+        try:
+            os.makedirs(port_path)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+    return port_path
+
+
+class PortAllocator(object):
+    """Reserves ports across all processes on the machine.
+
+    Each port is picked by the operating system and held in two ways: by a
+    bound socket, so no other process is given the same port, and by an
+    exclusive lock on a file named after the port, so other allocators skip
+    it even after the socket is closed. The socket has to be closed via
+    :meth:`unbind` right before the process using the port is started. The
+    lock is kept until the port is :meth:`released <release>`, or the
+    process exits.
+    """
+
+    def __init__(self, ip='127.0.0.1', port_path=None, attempts=100):
+        """Create a port allocator.
+
+        :param ip: The ip address to bind to.
+        :type ip: str
+        :param port_path: The directory holding the lock files, see
+                          :func:`get_port_path`.
+        :type port_path: str
+        :param attempts: The number of ports to try before giving up.
+        :type attempts: int
+        """
+        self.ip = ip
+        self.port_path = get_port_path(port_path)
+        self.attempts = attempts
+        self._sockets = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Reserve a free port.
+
+        :rtype: int
+        :raises: `OSError` if no port could be reserved.
+        """
+        for i in range(self.attempts):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            set_cloexec(sock)
+            try:
+                sock.bind((self.ip, 0))
+            except socket.error:
+                sock.close()
+                continue
+            port = sock.getsockname()[1]
+            lock = lock_file(os.path.join(self.port_path, '%s.lock' % port))
+            if lock is None:
+                # reserved by another process, which already unbound it
+                sock.close()
+                continue
+            with self._lock:
+                self._sockets[port] = sock
+                self._locks[port] = lock
+            return port
+        raise OSError("Couldn't reserve a free port")
+
+    def unbind(self, port):
+        """Close the socket holding a reserved port, so another process can
+        bind to it. The port stays reserved against other allocators.
+
+        :param port: The port.
+        :type port: int
+        """
+        with self._lock:
+            sock = self._sockets.pop(port, None)
+        if sock is not None:
+            sock.close()
+
+    def release(self, port):
+        """Release a reserved port.
+
+        :param port: The port.
+        :type port: int
+        """
+        self.unbind(port)
+        with self._lock:
+            lock = self._locks.pop(port, None)
+        if lock is not None:
+            lock.close()
+
+    def release_all(self):
+        """Release all ports reserved by this allocator."""
+        with self._lock:
+            ports = list(self._locks)
+        for port in ports:
+            self.release(port)
@@ -0,0 +1,139 @@
+"""Place the working directories of cluster nodes on a RAM-backed filesystem.
+
+Node data, logs and work files are written below the working directory of
+a cluster. On slow disks indexing heavy tests are bound by I/O, which a
+RAM-backed filesystem like `/dev/shm` or a dedicated `tmpfs` avoids.
+
+Each node placed in RAM reserves :data:`RAM_NODE_SIZE` bytes of the memory
+budget of its cluster, or its actual usage if that is larger. Nodes which
+don't fit into the budget or the free space of the filesystem are placed in
+a directory on disk instead.
+"""
+import os
+import os.path
+import re
+
+#: The space in bytes reserved for each node placed in RAM.
+RAM_NODE_SIZE = 128 * 1024 ** 2
+
+# filesystem types which keep their files in memory
+RAM_FILESYSTEMS = ('tmpfs', 'ramfs')
+
+SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+def parse_size(value):
+    """Return the number of bytes of a size like `512m` or `2g`.
+
+    :param value: A number of bytes, optionally followed by a `k`, `m` or
+                  `g` unit.
+    :type value: str
+    :rtype: int
+    """
+    if not hasattr(value, 'lower'):
+        return int(value)
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([kmg]?)b?\s*$', value.lower())
+    if match is None:
+        raise ValueError('Invalid size: %s' % value)
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def get_ram_path(ram_path=None):
+    """Return the directory on a RAM-backed filesystem to use for working
+    directories or `None` to use the default temporary directory.
+
+    :param ram_path: An explicit directory. If `None` is specified, the path
+                     will be taken from the `ES_RAM_PATH` environment
+                     variable.
+    :type ram_path: str
+    :raises: `ValueError` if the path isn't a directory.
+    """
+    if ram_path is None:
+        ram_path = os.environ.get('ES_RAM_PATH')
+    if not ram_path:
+        return None
+    if not os.path.isdir(ram_path):
+        raise ValueError('RAM path %s is not a directory.' % ram_path)
+    return ram_path
+
+
+def get_ram_budget(ram_budget=None, size=1):
+    """Return the memory budget of a cluster in bytes.
+
+    :param ram_budget: An explicit budget in bytes or as a string accepted
+                       by :func:`parse_size`. If `None` is specified, the
+                       budget will be taken from the `ES_RAM_BUDGET`
+                       environment variable and defaults to
+                       :data:`RAM_NODE_SIZE` per node.
+    :param size: The number of cluster nodes.
+    :type size: int
+    :rtype: int
+    """
+    if ram_budget is None:
+        ram_budget = os.environ.get('ES_RAM_BUDGET')
+    if not ram_budget:
+        return RAM_NODE_SIZE * size
+    return parse_size(ram_budget)
+
+
+def is_ram_backed(path, mounts_path='/proc/mounts'):
+    """Return whether a path is on a RAM-backed filesystem, or `None` if
+    the mount table can't be read.
+
+    :param path: The filesystem path.
+    :type path: str
+    """
+    try:
+        with open(mounts_path) as fd:
+            lines = fd.readlines()
+    except (IOError, OSError):
+        return None
+    path = os.path.realpath(path)
+    best = ''
+    fs_type = None
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        mount_point = fields[1].replace('\\040', ' ')
+        prefix = mount_point.rstrip('/') + '/'
+        if (path == mount_point or path.startswith(prefix)) and \
+                len(mount_point) >= len(best):
+            best = mount_point
+            fs_type = fields[2]
+    return fs_type in RAM_FILESYSTEMS
+
+
+def free_space(path):
+    """Return the space in bytes available to unprivileged users on the
+    filesystem of a path.
+    """
+    stat = os.statvfs(path)
+    return stat.f_bavail * stat.f_frsize
+
+
+def disk_usage(path):
+    """Return the space in bytes allocated for all files below a path.
+    Hardlinked files are counted once.
+
+    :param path: A file or directory.
+    :type path: str
+    """
+    seen = set()
+    total = 0
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in [dirpath] + [os.path.join(dirpath, f) for f in filenames]:
+            try:
+                stat = os.lstat(name)
+            except OSError:
+                continue
+            key = (stat.st_dev, stat.st_ino)
+            if key in seen:
+                continue
+            seen.add(key)
+            blocks = getattr(stat, 'st_blocks', None)
+            if blocks is None:  # pragma: nocover
+                total += stat.st_size
+            else:
+                total += blocks * 512
+    return total
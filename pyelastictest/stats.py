@@ -0,0 +1,133 @@
+import math
+
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(values, p):
+    """Return the `p`-th percentile of `values`, interpolating linearly
+    between the closest ranks.
+
+    :param values: A non-empty list of numbers.
+    :type values: list
+    :param p: The percentile, between 0 and 100.
+    :type p: float
+    """
+    values = sorted(values)
+    if not values:
+        raise ValueError('Percentile of an empty list.')
+    rank = (len(values) - 1) * p / 100.0
+    low = int(math.floor(rank))
+    high = int(math.ceil(rank))
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(values, percentiles=PERCENTILES):
+    """Return the count, minimum, maximum, mean and percentiles of a list
+    of measurements.
+
+    :param values: A non-empty list of numbers.
+    :type values: list
+    :param percentiles: The percentiles to include, as `p50`, `p90`, ...
+    :type percentiles: tuple
+    :rtype: dict
+    """
+    result = {
+        'count': len(values),
+        'min': min(values),
+        'max': max(values),
+        'mean': sum(values) / float(len(values)),
+    }
+    for p in percentiles:
+        result['p%s' % p] = percentile(values, p)
+    return result
+
+
+def _bit_length(value):
+    return len(bin(value)) - 2
+
+
+class Histogram(object):
+    """A histogram of latencies with a bounded relative error, in the style
+    of an HDR histogram.
+
+    Values are recorded in microseconds. Values below 256 are counted
+    exactly, larger values in logarithmic buckets split into 128 linear
+    sub-buckets, which keeps the error below one percent at any magnitude.
+    Only non-empty buckets are stored, so histograms are small, can be
+    merged and can be sent between processes as plain dictionaries.
+    """
+
+    def __init__(self, counts=None):
+        """Create a histogram.
+
+        :param counts: Bucket counts as returned by :meth:`to_dict`.
+        :type counts: dict
+        """
+        self.counts = {}
+        if counts:
+            for key, count in counts.items():
+                self.counts[int(key)] = count
+
+    @staticmethod
+    def _bucket(value):
+        shift = max(_bit_length(value) - 8, 0)
+        return (value >> shift) << shift
+
+    @staticmethod
+    def _midpoint(bucket):
+        shift = max(_bit_length(bucket) - 8, 0)
+        return bucket + ((1 << shift) - 1) / 2.0
+
+    def record(self, seconds):
+        """Record a value in seconds."""
+        bucket = self._bucket(max(int(seconds * 1000000), 0))
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+
+    def merge(self, other):
+        """Add the counts of another histogram to this one."""
+        for bucket, count in other.counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+
+    @property
+    def count(self):
+        """The number of recorded values."""
+        return sum(self.counts.values())
+
+    def percentile(self, p):
+        """Return the `p`-th percentile in seconds, or `None` if the
+        histogram is empty.
+        """
+        total = self.count
+        if not total:
+            return None
+        target = max(int(math.ceil(total * p / 100.0)), 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= target:
+                return self._midpoint(bucket) / 1000000.0
+
+    def summarize(self, percentiles=PERCENTILES + (99.9,)):
+        """Return the count, minimum, maximum, mean and percentiles in
+        seconds, like :func:`summarize`.
+        """
+        total = self.count
+        if not total:
+            return {'count': 0}
+        buckets = sorted(self.counts)
+        weighted = sum(self._midpoint(bucket) * count
+                       for bucket, count in self.counts.items())
+        result = {
+            'count': total,
+            'min': buckets[0] / 1000000.0,
+            'max': self._midpoint(buckets[-1]) / 1000000.0,
+            'mean': weighted / total / 1000000.0,
+        }
+        for p in percentiles:
+            result['p%s' % p] = self.percentile(p)
+        return result
+
+    def to_dict(self):
+        """Return the bucket counts as a JSON serializable dictionary."""
+        return dict((str(bucket), count)
+                    for bucket, count in self.counts.items())
@@ -0,0 +1,49 @@
+from pyelastictest import IsolatedTestCase
+
+
+class TestAsyncClient(IsolatedTestCase):
+
+    def setUp(self):
+        super(TestAsyncClient, self).setUp()
+        self.client = None
+
+    def tearDown(self):
+        if self.client is not None:
+            self.client.close()
+        super(TestAsyncClient, self).tearDown()
+
+    def _make_one(self):
+        from pyelastictest.asyncclient import AsyncClient
+        self.client = AsyncClient(self.es_cluster.urls, workers=4)
+        return self.client
+
+    def test_unknown_method(self):
+        client = self._make_one()
+        self.assertRaises(AttributeError, getattr, client, 'foo')
+
+    def test_templates(self):
+        from pyelastictest.futures import gather
+        client = self._make_one()
+        gather([client.create_template('t%s' % i, {'template': 'test%s' % i})
+                for i in range(5)], 10)
+        res = client.list_templates().result(10)
+        self.assertEqual(len(res), 5)
+
+    def test_bulk_index(self):
+        from pyelastictest.futures import gather
+        client = self._make_one()
+        gather([client.bulk_index('index%s' % i, 'doc', [
+            {'id': 1, 'foo': i}, {'id': 2, 'foo': i}]) for i in range(3)], 10)
+        client.refresh().result(10)
+        res = client.cluster_state(filter_nodes=True).result(10)
+        self.assertEqual(len(res['metadata']['indices']), 3)
+
+    def test_isolated(self):
+        from pyelastictest.isolated import Isolated
+        client = self._make_one()
+        client.wait_until_ready(self.es_cluster).result(30)
+        iso = Isolated()
+        client.setup_es(iso, self.es_cluster).result(10)
+        client.create_index('documents').result(10)
+        client.teardown_es(iso).result(10)
+        self.assertEqual(self.es_client.status()['indices'], {})
@@ -0,0 +1,59 @@
+import os
+from unittest import TestCase
+
+
+class TestBenchmark(TestCase):
+
+    def _report(self, **medians):
+        results = {}
+        for name, p50 in medians.items():
+            unit = name == 'bulk_load' and 'docs/s' or 's'
+            results[name] = {'p50': p50, 'p90': p50, 'p99': p50,
+                             'unit': unit}
+        return {'results': results}
+
+    def test_compare(self):
+        from pyelastictest.benchmark import compare
+        baseline = self._report(cold_start_1=2.0, bulk_load=1000.0)
+        report = self._report(cold_start_1=3.0, bulk_load=1100.0,
+                              node_restart=1.0)
+        comparison = compare(report, baseline)
+        self.assertEqual([c['name'] for c in comparison],
+                         ['bulk_load', 'cold_start_1'])
+        self.assertFalse(comparison[0]['regression'])
+        self.assertTrue(comparison[1]['regression'])
+        self.assertEqual(comparison[1]['change'], 0.5)
+
+    def test_compare_throughput(self):
+        from pyelastictest.benchmark import compare
+        comparison = compare(self._report(bulk_load=500.0),
+                             self._report(bulk_load=1000.0))
+        self.assertTrue(comparison[0]['regression'])
+
+    def test_run(self):
+        from pyelastictest.benchmark import format_report
+        from pyelastictest.benchmark import run_benchmarks
+        report = run_benchmarks(['cold_start', 'isolation'], runs=1,
+                                sizes=[1], indexes=2, templates=2)
+        self.assertEqual(
+            sorted(report['results'])[:2],
+            ['cold_start_1', 'isolation_delete_setup'])
+        self.assertEqual(report['results']['cold_start_1']['count'], 1)
+        self.assertTrue('cold_start_1' in format_report(report))
+
+    def test_run_without_es_path(self):
+        from pyelastictest.benchmark import run_benchmarks
+        environ = dict(os.environ)
+        os.environ.pop('ES_PATH', None)
+        os.environ['ES_BACKEND'] = 'memory'
+        try:
+            report = run_benchmarks(['cold_start'], runs=1, sizes=[1])
+        finally:
+            os.environ.clear()
+            os.environ.update(environ)
+        self.assertEqual(report['environment']['elasticsearch'], 'unknown')
+        self.assertEqual(report['results']['cold_start_1']['count'], 1)
+
+    def test_unknown(self):
+        from pyelastictest.benchmark import run_benchmarks
+        self.assertRaises(ValueError, run_benchmarks, ['foo'])
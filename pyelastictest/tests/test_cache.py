@@ -0,0 +1,156 @@
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+from unittest import TestCase
+
+
+class TestNodeTemplate(TestCase):
+
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.install_path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.install_path, 'lib'))
+        open(os.path.join(
+            self.install_path, 'lib', 'elasticsearch-0.20.5.jar'), 'w').close()
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_path, ignore_errors=True)
+        shutil.rmtree(self.install_path, ignore_errors=True)
+
+    def _populate(self, path, install_path):
+        self.calls.append(path)
+        os.mkdir(os.path.join(path, 'bin'))
+        with open(os.path.join(path, 'bin', 'elasticsearch'), 'w') as fd:
+            fd.write('#!/bin/sh')
+
+    def _make_one(self, config=''):
+        from pyelastictest.cache import NodeTemplate
+        return NodeTemplate(
+            self.cache_path, self.install_path, self._populate, config=config)
+
+    def test_es_version(self):
+        from pyelastictest.cache import get_es_version
+        self.assertEqual(get_es_version(self.install_path), '0.20.5')
+
+    def test_key(self):
+        self.assertEqual(self._make_one().key, self._make_one().key)
+        self.assertNotEqual(self._make_one().key,
+                            self._make_one(config='foo').key)
+
+    def test_copy_to(self):
+        template = self._make_one()
+        target1 = tempfile.mkdtemp(dir=self.cache_path)
+        target2 = tempfile.mkdtemp(dir=self.cache_path)
+        template.copy_to(target1)
+        template.copy_to(target2)
+        self.assertEqual(len(self.calls), 1)
+        for target in (target1, target2):
+            with open(os.path.join(target, 'bin', 'elasticsearch')) as fd:
+                self.assertEqual(fd.read(), '#!/bin/sh')
+
+
+class TestFixtureCache(TestCase):
+
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.clusters = []
+
+    def tearDown(self):
+        for cluster in self.clusters:
+            cluster.terminate()
+        shutil.rmtree(self.cache_path, ignore_errors=True)
+
+    def _make_one(self, **kw):
+        from pyelastictest.cache import FixtureCache
+        return FixtureCache(self.cache_path, **kw)
+
+    def _make_cluster(self):
+        from pyelastictest.cluster import Cluster
+        cluster = Cluster()
+        self.clusters.append(cluster)
+        return cluster
+
+    def _fill(self, cache, key, size):
+        entry = os.path.join(cache.path, key)
+        os.mkdir(entry)
+        with open(os.path.join(entry, 'node_0.tar'), 'wb') as fd:
+            fd.write(b'x' * size)
+        return entry
+
+    def test_key(self):
+        cache = self._make_one()
+        fixture = os.path.join(self.cache_path, 'fixture.json')
+        with open(fixture, 'w') as fd:
+            fd.write('{"foo": 1}\n')
+        key1 = cache.key(self.cache_path, files=[fixture])
+        self.assertEqual(key1, cache.key(self.cache_path, files=[fixture]))
+        self.assertNotEqual(key1, cache.key(
+            self.cache_path, files=[fixture], mappings={'doc': {}}))
+        with open(fixture, 'w') as fd:
+            fd.write('{"foo": 2}\n')
+        self.assertNotEqual(key1, cache.key(self.cache_path, files=[fixture]))
+
+    def test_evict_size(self):
+        cache = self._make_one(max_bytes=150)
+        old = self._fill(cache, 'old', 100)
+        os.utime(old, (1, time.time() - 10))
+        new = self._fill(cache, 'new', 100)
+        cache.evict()
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(new))
+
+    def test_evict_age(self):
+        cache = self._make_one(max_age=60)
+        old = self._fill(cache, 'old', 10)
+        os.utime(old, (1, time.time() - 120))
+        cache.evict()
+        self.assertFalse(os.path.exists(old))
+
+    def test_store_staging(self):
+        from pyelastictest import cache as cache_module
+        from pyelastictest.cluster import Cluster
+        cache = self._make_one()
+        cluster = Cluster(backend='memory')
+        self.clusters.append(cluster)
+        cluster.start()
+        os.makedirs(os.path.join(
+            cluster.nodes[0].working_path, 'data', cluster.name))
+        entries = []
+        tar_open = cache_module.tarfile.open
+
+        class Tarfile(object):
+
+            @staticmethod
+            def open(*args, **kw):
+                entries.append(os.listdir(cache.path))
+                return tar_open(*args, **kw)
+
+        cache_module.tarfile = Tarfile
+        try:
+            cache.store('key', cluster)
+        finally:
+            cache_module.tarfile = tarfile
+        # no partial entry is visible while archiving
+        self.assertEqual(entries, [[]])
+        self.assertEqual(os.listdir(cache.path), ['key'])
+        self.assertEqual(sorted(os.listdir(self.cache_path)), ['fixtures'])
+
+    def test_restore(self):
+        cache = self._make_one()
+        calls = []
+
+        def load(cluster):
+            calls.append(cluster)
+            cluster.client.index('fixture', 'doc', {'foo': 1}, id=1)
+
+        cluster = self._make_cluster()
+        self.assertFalse(cache.start_cluster(cluster, 'key', load))
+        cluster.terminate()
+        cluster = self._make_cluster()
+        self.assertTrue(cache.start_cluster(cluster, 'key', load))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cluster.client.get('fixture', 'doc', 1)['_source'],
+                         {'foo': 1})
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+
+class TestCDSArchive(TestCase):
+
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.install_path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.install_path, 'lib'))
+        self._write_jar('elasticsearch-0.20.5.jar')
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_path, ignore_errors=True)
+        shutil.rmtree(self.install_path, ignore_errors=True)
+
+    def _write_jar(self, name, data='jar'):
+        with open(os.path.join(self.install_path, 'lib', name), 'w') as fd:
+            fd.write(data)
+
+    def _make_one(self, version=17):
+        from pyelastictest.cds import CDSArchive
+        archive = CDSArchive(self.cache_path, self.install_path)
+        archive._version = version
+        return archive
+
+    def test_key_jar_set(self):
+        archive = self._make_one()
+        key = archive.key
+        self.assertEqual(archive.key, key)
+        self._write_jar('lucene-core-3.6.2.jar')
+        self.assertNotEqual(archive.key, key)
+
+    def test_key_java_version(self):
+        self.assertNotEqual(self._make_one(13).key, self._make_one(17).key)
+
+    def test_dump_and_use(self):
+        archive = self._make_one()
+        options, mode, tmp_path = archive.java_options()
+        self.assertEqual(mode, 'dump')
+        self.assertTrue(options[0].endswith(tmp_path))
+        # only one process writes the archive
+        self.assertEqual(archive.java_options()[1], 'default')
+        with open(tmp_path, 'w') as fd:
+            fd.write('archive')
+        self.assertTrue(archive.finish(tmp_path))
+        options, mode, tmp_path = archive.java_options()
+        self.assertEqual(mode, 'use')
+        self.assertEqual(options[0], '-XX:SharedArchiveFile=' + archive.path)
+
+    def test_failed_dump(self):
+        archive = self._make_one()
+        tmp_path = archive.java_options()[2]
+        self.assertFalse(archive.finish(tmp_path))
+        self.assertEqual(archive.java_options()[1], 'dump')
+
+    def test_unsupported(self):
+        archive = self._make_one(8)
+        self.assertEqual(archive.java_options(),
+                         (['-Xshare:auto'], 'default', None))
+
+
+class TestMeasureStartup(TestCase):
+
+    def test_measure(self):
+        from pyelastictest.cds import measure_startup
+        cache_path = tempfile.mkdtemp()
+        try:
+            result = measure_startup(cache_path=cache_path)
+        finally:
+            shutil.rmtree(cache_path, ignore_errors=True)
+        self.assertTrue(result['without'] > 0)
+        self.assertTrue(result['with'] > 0)
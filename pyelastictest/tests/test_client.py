@@ -44,8 +44,59 @@ class TestExtendedClient(IsolatedTestCase):
         self.assertEqual(len(res), 3)
         self.assertEqual(set(res.keys()), set(['t1', 't2', 't3']))
 
+    def test_delete_templates(self):
+        client = self._make_one()
+        for i in range(5):
+            client.create_template('t%s' % i, {'template': 'test%s' % i})
+        client.delete_templates(['t1', 't2', 't3'])
+        self.assertEqual(set(client.list_templates().keys()),
+                         set(['t0', 't4']))
+
+    def test_template_names(self):
+        client = self._make_one()
+        client.create_template('t1', {'template': 'test1'})
+        self.assertEqual(client.template_names(), set(['t1']))
+        client.create_template('t2', {'template': 'test2'})
+        client.delete_template('t1')
+        self.assertEqual(client.template_names(), set(['t2']))
+        # changes by other clients are only seen by uncached calls
+        self.es_client.create_template('t3', {'template': 'test3'})
+        self.assertEqual(client.template_names(), set(['t2']))
+        self.assertEqual(client.template_names(cached=False),
+                         set(['t2', 't3']))
+
     def test_cluster_state(self):
         client = self._make_one()
         res = client.cluster_state(filter_routing_table=True)
         self.assertTrue('nodes' in res)
         self.assertFalse('routing_table' in res)
+
+    def test_cluster_settings(self):
+        client = self._make_one()
+        res = client.cluster_settings()
+        self.assertEqual(res['transient'], {})
+        client.update_cluster_settings({
+            'transient': {'indices.ttl.interval': '90s'}})
+        res = client.cluster_settings()
+        self.assertEqual(res['transient'], {'indices.ttl.interval': '90s'})
+
+    def test_index_stats(self):
+        client = self._make_one()
+        client.index('test_index_1', 'doc', {'foo': 1})
+        client.refresh('test_index_1')
+        res = client.index_stats(['test_index_1'])
+        primaries = res['indices']['test_index_1']['primaries']
+        self.assertEqual(primaries['docs']['count'], 1)
+
+    def test_node_stats(self):
+        client = self._make_one()
+        res = client.node_stats(jvm='true')
+        node = list(res['nodes'].values())[0]
+        self.assertTrue(node['jvm']['mem']['heap_used_in_bytes'] > 0)
+
+    def test_bulk(self):
+        client = self._make_one()
+        client.bulk('{"index": {"_type": "doc", "_id": "1"}}\n'
+                    '{"foo": 1}\n', index='test_index_1', refresh='true')
+        res = client.get('test_index_1', 'doc', 1)
+        self.assertEqual(res['_source'], {'foo': 1})
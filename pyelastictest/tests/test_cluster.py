@@ -1,4 +1,5 @@
 import os
+import time
 from unittest import TestCase
 
 from pyelasticsearch import ElasticSearch
@@ -37,6 +38,84 @@ class TestCluster(TestCase):
         self.assertTrue(cluster.client is not None)
         self.assertEqual(cluster.client.health()['number_of_nodes'], 1)
 
+    def test_cluster_start_timings(self):
+        cluster = self._make_one(size=2)
+        cluster.start()
+        self.assertTrue(cluster.timings['start'] >= cluster.timings['ready'])
+        for node in cluster.nodes:
+            self.assertTrue(node.timings['joined'] >=
+                            node.timings['listening'])
+
+    def test_cluster_jvm_settings(self):
+        cluster = self._make_one(profile='low-memory')
+        cluster.start()
+        settings = cluster.jvm_settings[cluster[0].name]
+        self.assertEqual(settings['ES_MAX_MEM'], '128m')
+        self.assertTrue('-XX:+UseSerialGC' in settings['JAVA_OPTS'])
+
+    def test_cluster_rolling_restart(self):
+        cluster = self._make_one(size=2)
+        cluster.start()
+        results = cluster.rolling_restart()
+        self.assertEqual(len(results), 2)
+        self.assertTrue(cluster.timings['rolling_restart'] >=
+                        sum(r['seconds'] for r in results))
+        self.assertEqual(cluster.client.health()['status'], 'green')
+
+    def test_cluster_add_remove_node(self):
+        cluster = self._make_one()
+        cluster.start()
+        client = cluster.client
+        client.create_index('test', settings={
+            'settings': {'number_of_shards': 4}})
+        client.index('test', 'doc', {'foo': 1}, id=1, refresh=True)
+        result = cluster.add_node()
+        self.assertEqual(len(cluster), 2)
+        self.assertEqual(len(cluster.urls), 2)
+        self.assertTrue(result['node'] in cluster.nodes)
+        self.assertTrue(result['shards'] > 0)
+        self.assertTrue(result['seconds'] >= result['rebalance_seconds'])
+        result = cluster.remove_node(cluster[0])
+        self.assertEqual(len(cluster), 1)
+        self.assertTrue(result['shards'] > 0)
+        self.assertEqual(cluster.client.health()['number_of_nodes'], 1)
+        self.assertEqual(cluster.client.count('*', index='test')['count'], 1)
+
+    def _time_out_health(self):
+        from pyelastictest.client import ExtendedClient
+        health = ExtendedClient.health
+
+        def timed_out(client, *args, **kw):
+            result = health(client, *args, **kw)
+            if 'wait_for_nodes' in kw:
+                result['timed_out'] = True
+            return result
+        ExtendedClient.health = timed_out
+        self.addCleanup(setattr, ExtendedClient, 'health', health)
+
+    def test_cluster_add_node_timeout(self):
+        cluster = self._make_one(backend='memory')
+        cluster.start()
+        self._time_out_health()
+        self.assertRaises(OSError, cluster.add_node, timeout=1)
+
+    def test_cluster_remove_node_timeout(self):
+        cluster = self._make_one(size=2, backend='memory')
+        cluster.start()
+        self._time_out_health()
+        self.assertRaises(OSError, cluster.remove_node, timeout=1)
+
+    def test_cluster_remove_last_node(self):
+        cluster = self._make_one()
+        cluster.start()
+        self.assertRaises(ValueError, cluster.remove_node)
+
+    def test_cluster_start_crash(self):
+        cluster = self._make_one(profile={'java_opts': ['-XX:+NoSuchOption']})
+        begin = time.time()
+        self.assertRaises(OSError, cluster.start)
+        self.assertTrue(time.time() - begin < 10)
+
     def test_cluster_start_twice(self):
         cluster = self._make_one()
         cluster.start()
@@ -77,3 +156,88 @@ class TestCluster(TestCase):
         shard_info = client.status()['indices']['test_shards']['shards']['0']
         nodes = set([s['routing']['node'] for s in shard_info])
         self.assertTrue(len(nodes) > 1)
+
+
+class TestBootCluster(TestCase):
+
+    def setUp(self):
+        from pyelastictest import cluster
+        self._saved = (cluster.BOOT, cluster.CLUSTER)
+        cluster.BOOT = cluster.CLUSTER = None
+        self._backend = os.environ.get('ES_BACKEND')
+        os.environ['ES_BACKEND'] = 'memory'
+
+    def tearDown(self):
+        from pyelastictest import cluster
+        if cluster.CLUSTER is not None:
+            cluster.CLUSTER.terminate()
+        cluster.BOOT, cluster.CLUSTER = self._saved
+        if self._backend is None:
+            del os.environ['ES_BACKEND']
+        else:
+            os.environ['ES_BACKEND'] = self._backend
+
+    def test_boot_cluster(self):
+        from pyelastictest.cluster import boot_cluster
+        from pyelastictest.cluster import get_cluster
+        future = boot_cluster()
+        self.assertTrue(boot_cluster() is future)
+        cluster = get_cluster()
+        self.assertTrue(cluster is future.result())
+        self.assertEqual(cluster.client.health()['number_of_nodes'], 1)
+        self.assertTrue(boot_cluster().result() is cluster)
+
+
+class TestSpeedTemplate(TestCase):
+
+    def setUp(self):
+        self._cluster = None
+        self._env = os.environ.pop('ES_SPEED_TEMPLATE', None)
+
+    def tearDown(self):
+        if self._cluster:
+            self._cluster.terminate()
+        os.environ.pop('ES_SPEED_TEMPLATE', None)
+        if self._env is not None:
+            os.environ['ES_SPEED_TEMPLATE'] = self._env
+
+    def test_get_speed_template(self):
+        from pyelastictest.cluster import get_speed_template
+        from pyelastictest.cluster import SPEED_SETTINGS
+        self.assertEqual(get_speed_template(), None)
+        self.assertEqual(get_speed_template(False), None)
+        body = get_speed_template(True)
+        self.assertEqual(body['template'], '*')
+        self.assertEqual(body['settings'], SPEED_SETTINGS)
+        body = get_speed_template({'index.refresh_interval': '1s',
+                                   'index.number_of_replicas': None})
+        self.assertEqual(body['settings']['index.refresh_interval'], '1s')
+        self.assertFalse('index.number_of_replicas' in body['settings'])
+
+    def test_get_speed_template_environ(self):
+        from pyelastictest.cluster import get_speed_template
+        os.environ['ES_SPEED_TEMPLATE'] = '1'
+        self.assertTrue(get_speed_template() is not None)
+        os.environ['ES_SPEED_TEMPLATE'] = '{"index.refresh_interval": "-1"}'
+        body = get_speed_template()
+        self.assertEqual(body['settings']['index.refresh_interval'], '-1')
+
+    def test_protected(self):
+        from pyelastictest.cluster import Cluster
+        from pyelastictest.cluster import install_speed_template
+        from pyelastictest.cluster import reset_cluster
+        from pyelastictest.cluster import SPEED_TEMPLATE
+        cluster = self._cluster = Cluster(backend='memory',
+                                          speed_template=True)
+        cluster.start()
+        client = cluster.client
+        self.assertEqual(client.template_names(cached=False),
+                         set([SPEED_TEMPLATE]))
+        reset_cluster(cluster)
+        self.assertEqual(client.template_names(cached=False),
+                         set([SPEED_TEMPLATE]))
+        client.delete_template(SPEED_TEMPLATE)
+        self.assertTrue(install_speed_template(cluster))
+        self.assertFalse(install_speed_template(cluster))
+        self.assertEqual(client.template_names(cached=False),
+                         set([SPEED_TEMPLATE]))
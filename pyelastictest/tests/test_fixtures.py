@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from pyelastictest import IsolatedTestCase
+from pyelastictest.cluster import Cluster
+
+
+class TestFixtureLoader(IsolatedTestCase):
+
+    def setUp(self):
+        super(TestFixtureLoader, self).setUp()
+        self.loader = None
+
+    def tearDown(self):
+        if self.loader is not None:
+            self.loader.close()
+        super(TestFixtureLoader, self).tearDown()
+
+    def _make_one(self, **kw):
+        from pyelastictest.fixtures import FixtureLoader
+        self.loader = FixtureLoader(self.es_cluster.urls, **kw)
+        return self.loader
+
+    def test_load_generator(self):
+        loader = self._make_one(chunk_bytes=1024, min_chunk_bytes=1024)
+        docs = ({'id': i, 'foo': 'bar %s' % i} for i in range(1000))
+        stats = loader.load('documents', 'doc', docs)
+        self.assertEqual(stats['docs'], 1000)
+        self.assertEqual(stats['errors'], 0)
+        self.assertTrue(stats['requests'] > 1)
+        self.assertTrue(stats['docs_per_second'] > 0)
+        self.assertEqual(
+            self.es_client.count('*', index='documents')['count'], 1000)
+        self.assertEqual(self.es_client.get('documents', 'doc', 5)['_source'],
+                         {'id': 5, 'foo': 'bar 5'})
+        settings = self.es_client.get_settings('documents')
+        self.assertEqual(
+            settings['documents']['settings']['index.refresh_interval'], '1s')
+
+    def test_load_existing_index(self):
+        self.es_client.create_index('documents', settings={
+            'settings': {'index.refresh_interval': '5s'}})
+        loader = self._make_one()
+        loader.load('documents', 'doc', [{'foo': 1}, {'foo': 2}])
+        self.assertEqual(
+            self.es_client.count('*', index='documents')['count'], 2)
+        settings = self.es_client.get_settings('documents')
+        self.assertEqual(
+            settings['documents']['settings']['index.refresh_interval'], '5s')
+
+    def test_load_template_interval(self):
+        self.es_client.create_template('slow', {
+            'template': 'documents',
+            'settings': {'index.refresh_interval': '10s'},
+        })
+        loader = self._make_one()
+        loader.load('documents', 'doc', [{'foo': 1}])
+        settings = self.es_client.get_settings('documents')
+        self.assertEqual(
+            settings['documents']['settings']['index.refresh_interval'],
+            '10s')
+
+    def test_load_json_lines(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                for i in range(10):
+                    f.write(json.dumps({'id': i}) + '\n')
+                f.write('\n')
+            stats = self.es_client.load_fixtures('documents', 'doc', path)
+        finally:
+            os.remove(path)
+        self.assertEqual(stats['docs'], 10)
+        self.assertEqual(
+            self.es_client.count('*', index='documents')['count'], 10)
+
+
+class TestFixtureLoaderSpeedTemplate(TestCase):
+
+    def setUp(self):
+        self.cluster = Cluster(speed_template=True)
+        self.cluster.start()
+
+    def tearDown(self):
+        self.cluster.terminate()
+
+    def test_template_interval_kept(self):
+        from pyelastictest.cluster import SPEED_SETTINGS
+        client = self.cluster.client
+        client.load_fixtures('documents', 'doc', [{'id': 1}, {'id': 2}])
+        settings = client.get_settings('documents')
+        self.assertEqual(
+            settings['documents']['settings']['index.refresh_interval'],
+            SPEED_SETTINGS['index.refresh_interval'])
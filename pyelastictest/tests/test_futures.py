@@ -0,0 +1,68 @@
+import threading
+import time
+from unittest import TestCase
+
+
+class TestFuture(TestCase):
+
+    def _make_one(self):
+        from pyelastictest.futures import Future
+        return Future()
+
+    def test_result(self):
+        future = self._make_one()
+        self.assertFalse(future.done())
+        future.set_result(1)
+        self.assertTrue(future.done())
+        self.assertEqual(future.result(), 1)
+
+    def test_exception(self):
+        future = self._make_one()
+        future.set_exception(ValueError('foo'))
+        self.assertRaises(ValueError, future.result)
+
+    def test_timeout(self):
+        future = self._make_one()
+        self.assertRaises(OSError, future.result, 0.01)
+
+    def test_callback(self):
+        future = self._make_one()
+        results = []
+        future.add_done_callback(lambda f: results.append(f.result()))
+        future.set_result(2)
+        future.add_done_callback(lambda f: results.append(f.result()))
+        self.assertEqual(results, [2, 2])
+
+    def test_run_in_thread(self):
+        from pyelastictest.futures import run_in_thread
+        future = run_in_thread(lambda a, b: a + b, 1, b=2)
+        self.assertEqual(future.result(1), 3)
+
+
+class TestExecutor(TestCase):
+
+    def _make_one(self, workers=4):
+        from pyelastictest.futures import Executor
+        return Executor(workers)
+
+    def test_submit(self):
+        from pyelastictest.futures import gather
+        executor = self._make_one()
+        futures = [executor.submit(lambda i: i * 2, i) for i in range(10)]
+        self.assertEqual(gather(futures, 1), [i * 2 for i in range(10)])
+        executor.shutdown()
+
+    def test_parallel(self):
+        executor = self._make_one(workers=2)
+        barrier = threading.Event()
+        first = executor.submit(barrier.wait, 1)
+        second = executor.submit(barrier.set)
+        second.result(1)
+        first.result(1)
+        executor.shutdown()
+
+    def test_exception(self):
+        executor = self._make_one()
+        future = executor.submit(time.sleep, 'foo')
+        self.assertRaises(TypeError, future.result, 1)
+        executor.shutdown()
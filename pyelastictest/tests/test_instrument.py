@@ -0,0 +1,78 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from pyelastictest import IsolatedTestCase
+
+
+class TestRequestRecorder(TestCase):
+
+    def _make_one(self, **kw):
+        from pyelastictest.instrument import RequestRecorder
+        return RequestRecorder(**kw)
+
+    def test_endpoint(self):
+        from pyelastictest.instrument import endpoint
+        self.assertEqual(endpoint(['test', 'doc', 1]), '/{name}/{name}/{name}')
+        self.assertEqual(endpoint(['test', '_search']), '/{name}/_search')
+        self.assertEqual(endpoint([]), '/')
+
+    def test_summary(self):
+        recorder = self._make_one()
+        recorder.record('GET', ['a', '_search'], 200, 10, 100, 0.0, 0.5)
+        recorder.record('GET', ['b', '_search'], 200, 10, 200, 1.0, 1.0)
+        recorder.record('PUT', ['a'], 400, 5, None, 2.0, 0.1)
+        summary = recorder.summary()
+        self.assertEqual(len(summary), 2)
+        self.assertEqual(summary[0]['endpoint'], '/{name}/_search')
+        self.assertEqual(summary[0]['count'], 2)
+        self.assertEqual(summary[0]['seconds'], 1.5)
+        self.assertEqual(summary[0]['max_seconds'], 1.0)
+        self.assertEqual(summary[0]['bytes_received'], 300)
+        self.assertEqual(summary[1]['statuses'], {'400': 1})
+        self.assertTrue('/{name}/_search' in recorder.format_summary())
+
+    def test_export_trace(self):
+        recorder = self._make_one(trace=True)
+        recorder.record('GET', ['_cluster', 'health'], 200, 0, 50, 1.0, 0.25)
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            recorder.export_trace(path)
+            with open(path) as trace:
+                events = json.load(trace)['traceEvents']
+        finally:
+            os.remove(path)
+        self.assertEqual(events[0]['name'], 'GET /_cluster/health')
+        self.assertEqual(events[0]['ts'], 1000000)
+        self.assertEqual(events[0]['dur'], 250000)
+
+    def test_start_stop(self):
+        from pyelastictest.instrument import RECORDERS
+        from pyelastictest.instrument import record_request
+        recorder = self._make_one().start()
+        try:
+            record_request('GET', ['_status'], 200, 0, 10, 0.0, 0.1)
+        finally:
+            recorder.stop()
+        record_request('GET', ['_status'], 200, 0, 10, 0.0, 0.1)
+        self.assertFalse(recorder in RECORDERS)
+        self.assertEqual(recorder.summary()[0]['count'], 1)
+
+
+class TestIsolatedRecording(IsolatedTestCase):
+
+    record_requests = True
+
+    def test_client_requests(self):
+        client = self.es_client
+        client.index('test', 'doc', {'foo': 1}, id=1)
+        client.get('test', 'doc', 1)
+        summary = dict(((item['method'], item['endpoint']), item)
+                       for item in self.es_recorder.summary())
+        item = summary[('PUT', '/{name}/{name}/{name}')]
+        self.assertEqual(item['count'], 1)
+        self.assertTrue(item['bytes_sent'] > 0)
+        self.assertTrue(item['bytes_received'] > 0)
+        self.assertTrue(('GET', '/{name}/{name}/{name}') in summary)
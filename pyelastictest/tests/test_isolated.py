@@ -27,6 +27,133 @@ class TestIsolated(TestCase):
         self.assertEqual(len(self.cluster.client.status()['indices']), 0)
 
 
+class TestIsolatedSnapshot(TestCase):
+
+    def setUp(self):
+        self.cluster = Cluster()
+        self.cluster.start()
+
+    def tearDown(self):
+        self.cluster.terminate()
+
+    def _make_one(self):
+        from pyelastictest.isolated import Isolated
+        iso = Isolated()
+        iso.isolation = 'snapshot'
+        return iso
+
+    def test_unknown_isolation(self):
+        from pyelastictest.isolated import Isolated
+        iso = Isolated()
+        self.assertRaises(ValueError, iso.setup_es, self.cluster, 'foo')
+
+    def test_restore(self):
+        client = self.cluster.client
+        client.index('fixture', 'doc', {'foo': 1}, id=1)
+        client.index('fixture', 'doc', {'foo': 2}, id=2)
+        client.create_template('before', {'template': 'fixture*'})
+        iso = self._make_one()
+        iso.setup_es(self.cluster)
+        client.delete('fixture', 'doc', 1)
+        client.index('other', 'doc', {'foo': 3})
+        client.create_template('before', {'template': 'changed*'})
+        client.create_template('inside', {'template': 'other*'})
+        iso.teardown_es()
+        self.assertTrue(iso.teardown_time > 0)
+        client.refresh()
+        self.assertEqual(list(client.status()['indices'].keys()), ['fixture'])
+        self.assertEqual(client.get('fixture', 'doc', 1)['_source'],
+                         {'foo': 1})
+        self.assertEqual(client.count('*', index='fixture')['count'], 2)
+        self.assertEqual(list(client.list_templates().keys()), ['before'])
+        self.assertEqual(client.get_template('before')['before']['template'],
+                         'fixture*')
+
+    def test_restore_cluster_settings(self):
+        client = self.cluster.client
+        key = 'indices.recovery.concurrent_streams'
+        client.update_cluster_settings({'persistent': {key: '3'},
+                                        'transient': {key: '4'}})
+        iso = self._make_one()
+        iso.setup_es(self.cluster)
+        client.update_cluster_settings({'persistent': {key: '5'},
+                                        'transient': {key: '6'}})
+        iso.teardown_es()
+        settings = client.cluster_settings()
+        self.assertEqual(settings['persistent'][key], '3')
+        self.assertEqual(settings['transient'][key], '4')
+
+    def test_unchanged(self):
+        client = self.cluster.client
+        client.index('fixture', 'doc', {'foo': 1}, id=1)
+        iso = self._make_one()
+        iso.setup_es(self.cluster)
+        iso.teardown_es()
+        self.assertEqual(client.get('fixture', 'doc', 1)['_version'], 1)
+
+    def test_restored_not_snapshotted_again(self):
+        client = self.cluster.client
+        client.index('fixture', 'doc', {'foo': 1}, id=1)
+        # restoring gives the index different indexing statistics
+        client.index('fixture', 'doc', {'foo': 2}, id=1)
+        iso = self._make_one()
+        iso.setup_es(self.cluster)
+        client.delete('fixture', 'doc', 1)
+        iso.teardown_es()
+        snapshotted = []
+        iso = self._make_one()
+        original = iso._snapshot_index
+        iso._snapshot_index = lambda name, count: (
+            snapshotted.append(name) or original(name, count))
+        iso.setup_es(self.cluster)
+        iso.teardown_es()
+        self.assertEqual(snapshotted, [])
+
+
+class TestIsolatedNamespace(TestCase):
+
+    def setUp(self):
+        self.cluster = Cluster()
+        self.cluster.start()
+
+    def tearDown(self):
+        self.cluster.terminate()
+
+    def _make_one(self):
+        from pyelastictest.isolated import Isolated
+        iso = Isolated()
+        iso.setup_es(self.cluster, isolation='namespace')
+        return iso
+
+    def test_prefixed(self):
+        iso1 = self._make_one()
+        iso2 = self._make_one()
+        self.assertNotEqual(iso1.prefixed('foo'), iso2.prefixed('foo'))
+        self.assertTrue(iso1.prefixed('foo').endswith('_foo'))
+        iso1.teardown_es()
+        iso2.teardown_es()
+
+    def test_concurrent(self):
+        client = self.cluster.client
+        iso1 = self._make_one()
+        iso2 = self._make_one()
+        client.index(iso1.prefixed('documents'), 'doc', {'foo': 1})
+        client.index(iso2.prefixed('documents'), 'doc', {'foo': 2})
+        client.create_template(iso1.prefixed('tmpl'), {'template': 'a*'})
+        client.create_template(iso2.prefixed('tmpl'), {'template': 'b*'})
+        iso1.teardown_es()
+        self.assertEqual(list(client.status()['indices'].keys()),
+                         [iso2.prefixed('documents')])
+        self.assertEqual(list(client.list_templates().keys()),
+                         [iso2.prefixed('tmpl')])
+        iso2.teardown_es()
+        self.assertEqual(client.status()['indices'], {})
+
+    def test_teardown_without_indexes(self):
+        iso = self._make_one()
+        iso.teardown_es()
+
+
 class TestIsolatedContextManager(TestCase):
 
     def setUp(self):
@@ -64,3 +191,32 @@ class TestIsolatedContextManager(TestCase):
                              set(['before', 'inside']))
         self.assertEqual(
             self.cluster.client.list_templates().keys(), ['before'])
+
+
+class TestIsolatedSpeedTemplate(TestCase):
+
+    def setUp(self):
+        self.cluster = Cluster(speed_template=True)
+        self.cluster.start()
+
+    def tearDown(self):
+        self.cluster.terminate()
+
+    def test_speed_template_kept(self):
+        from pyelastictest.cluster import SPEED_TEMPLATE
+        from pyelastictest.isolated import isolated
+        client = self.cluster.client
+        for isolation in ('delete', 'snapshot', 'namespace'):
+            with isolated(self.cluster, isolation=isolation):
+                pass
+            self.assertEqual(client.template_names(cached=False),
+                             set([SPEED_TEMPLATE]))
+
+    def test_speed_template_recreated(self):
+        from pyelastictest.cluster import SPEED_TEMPLATE
+        from pyelastictest.isolated import isolated
+        client = self.cluster.client
+        client.delete_template(SPEED_TEMPLATE)
+        with isolated(self.cluster) as iso:
+            self.assertEqual(iso.es_client.template_names(cached=False),
+                             set([SPEED_TEMPLATE]))
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from pyelastictest import IsolatedTestCase
+
+
+def make_document(n):
+    return {'title': 'Document %s' % n, 'value': n}
+
+
+class TestWorkload(TestCase):
+
+    def _make_one(self, *args, **kw):
+        from pyelastictest.load import Workload
+        return Workload(*args, **kw)
+
+    def test_phases(self):
+        workload = self._make_one('load', make_document, rate=100,
+                                  phases=[{'name': 'warmup', 'duration': 1},
+                                          {'name': 'peak', 'duration': 2,
+                                           'rate': 500}])
+        self.assertEqual([p['rate'] for p in workload.phases], [100, 500])
+        self.assertEqual(workload.phases[1]['write_ratio'], 0.5)
+        self.assertEqual(workload.document(3)['value'], 3)
+
+    def test_from_file(self):
+        from pyelastictest.load import Workload
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, 'w') as spec:
+            json.dump({'index': 'load', 'documents': [{'a': 1}, {'a': 2}],
+                       'queries': [{'weight': 2, 'body': {'size': 1}}],
+                       'duration': 3}, spec)
+        try:
+            workload = Workload.from_file(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(workload.document(3), {'a': 2})
+        self.assertEqual(workload.queries, [(2, {'size': 1})])
+        self.assertEqual(workload.phases[0]['duration'], 3)
+
+
+class TestRunLoad(IsolatedTestCase):
+
+    def test_threads(self):
+        from pyelastictest.load import run_load
+        from pyelastictest.load import Workload
+        workload = Workload('load', make_document, duration=1, rate=50)
+        report = run_load(self.es_cluster, workload, workers=2)
+        self.assertEqual(report[0]['name'], 'main')
+        self.assertEqual(report[0]['errors'], 0)
+        self.assertTrue(report[0]['requests'] > 0)
+        self.assertTrue(report[0]['write']['p99'] >= 0)
+
+    def test_existing_index(self):
+        from pyelastictest.load import run_load
+        from pyelastictest.load import Workload
+        self.es_client.create_index('load')
+        workload = Workload('load', make_document, duration=0.5,
+                            write_ratio=0)
+        report = run_load(self.es_cluster, workload, workers=1)
+        self.assertEqual(report[0]['errors'], 0)
+
+    def test_processes(self):
+        from pyelastictest.load import run_load
+        from pyelastictest.load import Workload
+        workload = Workload('load', make_document, write_ratio=1,
+                            phases=[{'name': 'first', 'duration': 0.5},
+                                    {'name': 'second', 'duration': 0.5}])
+        report = run_load(self.es_cluster, workload, workers=2,
+                          processes=True)
+        self.assertEqual([p['name'] for p in report], ['first', 'second'])
+        self.assertEqual(report[1]['read'], {'count': 0})
@@ -0,0 +1,94 @@
+import logging
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+
+class RecordingHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestLogPump(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.logger = logging.getLogger('test_logpump')
+        self.handler = RecordingHandler()
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def _pump(self, data, **kw):
+        from pyelastictest.logpump import LogPump
+        read_fd, write_fd = os.pipe()
+        pump = LogPump(os.fdopen(read_fd, 'rb'),
+                       os.path.join(self.path, 'out.log'), self.logger, **kw)
+        pump.start()
+        with os.fdopen(write_fd, 'wb') as stream:
+            stream.write(data)
+        pump.join(5)
+        return pump
+
+    def test_parse_level(self):
+        from pyelastictest.logpump import parse_level
+        self.assertEqual(parse_level(
+            '[2013-03-12 10:00:00,123][WARN ][cluster  ] foo'),
+            logging.WARNING)
+        self.assertEqual(parse_level('\tat java.lang.Thread.run', 1), 1)
+
+    def test_ring_buffer(self):
+        data = ''.join('line %s\n' % i for i in range(20)).encode('utf-8')
+        pump = self._pump(data, size=5)
+        self.assertEqual(pump.tail(), ['line %s' % i for i in range(15, 20)])
+        self.assertEqual(pump.tail(2), ['line 18', 'line 19'])
+        view = pump.view()
+        try:
+            self.assertEqual(view[:], data)
+        finally:
+            view.close()
+
+    def test_forward_warnings(self):
+        self._pump(b'[2013-03-12][INFO ][node] started\n'
+                   b'[2013-03-12][ERROR][node] failed\n'
+                   b'\tat java.lang.Thread.run\n'
+                   b'[2013-03-12][INFO ][node] stopped\n')
+        self.assertEqual([r.getMessage() for r in self.handler.records], [
+            '[2013-03-12][ERROR][node] failed',
+            '\tat java.lang.Thread.run',
+        ])
+        self.assertEqual(self.handler.records[0].levelno, logging.ERROR)
+
+    def test_empty_view(self):
+        pump = self._pump(b'')
+        self.assertTrue(pump.view() is None)
+
+    def test_watch(self):
+        from pyelastictest.logpump import LogPump
+        read_fd, write_fd = os.pipe()
+        pump = LogPump(os.fdopen(read_fd, 'rb'),
+                       os.path.join(self.path, 'out.log'), self.logger)
+        started = pump.watch(r'\]: started$')
+        other = pump.watch('never')
+        pump.start()
+        stream = os.fdopen(write_fd, 'wb')
+        stream.write(b'[node] {0.20.5}[1]: initialized\n'
+                     b'[node] {0.20.5}[1]: started\n')
+        stream.flush()
+        self.assertTrue(started.wait(5))
+        self.assertFalse(other.is_set())
+        self.assertFalse(pump.closed)
+        stream.close()
+        # closing the pipe releases all waiters
+        self.assertTrue(other.wait(5))
+        pump.join(5)
+        self.assertTrue(pump.closed)
+        self.assertTrue(pump.watch('late').is_set())
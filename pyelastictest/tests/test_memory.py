@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+from pyelasticsearch.exceptions import ElasticHttpNotFoundError
+
+from pyelastictest.cluster import Cluster
+from pyelastictest.isolated import isolated
+
+
+class TestMemoryBackend(TestCase):
+
+    def setUp(self):
+        self.cluster = Cluster(backend='memory', size=2)
+        self.cluster.start()
+        self.client = self.cluster.client
+
+    def tearDown(self):
+        self.cluster.terminate()
+
+    def test_unknown_backend(self):
+        self.assertRaises(ValueError, Cluster, backend='foo')
+
+    def test_health(self):
+        health = self.client.health()
+        self.assertEqual(health['cluster_name'], self.cluster.name)
+        self.assertEqual(health['number_of_nodes'], 2)
+        self.cluster[1].stop()
+        self.assertEqual(self.client.health()['number_of_nodes'], 1)
+
+    def test_rolling_restart(self):
+        self.client.index('documents', 'doc', {'foo': 1}, id=1)
+        results = self.cluster.rolling_restart()
+        self.assertEqual([r['shards'] for r in results], [0, 0])
+        self.assertEqual(self.client.get('documents', 'doc', 1)['_source'],
+                         {'foo': 1})
+
+    def test_add_remove_node(self):
+        self.cluster.add_node()
+        self.assertEqual(self.client.health()['number_of_nodes'], 3)
+        self.cluster.remove_node()
+        self.assertEqual(self.cluster.client.health()['number_of_nodes'], 2)
+
+    def test_documents(self):
+        self.client.index('documents', 'doc', {'foo': 'Hello World'}, id=1)
+        self.client.index('documents', 'doc', {'foo': 'bar'}, id=2)
+        self.assertEqual(self.client.get('documents', 'doc', 1)['_source'],
+                         {'foo': 'Hello World'})
+        res = self.client.search({'query': {'term': {'foo': 'hello'}}},
+                                 index='documents')
+        self.assertEqual(res['hits']['total'], 1)
+        self.assertEqual(self.client.count('*', index='documents')['count'], 2)
+        self.client.delete('documents', 'doc', 1)
+        self.assertRaises(ElasticHttpNotFoundError,
+                          self.client.get, 'documents', 'doc', 1)
+
+    def test_bulk(self):
+        self.client.bulk_index('documents', 'doc', [
+            {'id': 1, 'foo': 1}, {'id': 2, 'foo': 2}])
+        self.assertEqual(self.client.count('*', index='documents')['count'], 2)
+
+    def test_delete_all_indexes(self):
+        self.client.create_index('first')
+        self.client.create_index('second')
+        self.client.delete_all_indexes()
+        self.assertEqual(self.client.status()['indices'], {})
+        self.assertEqual(self.client.send_request('GET', [])['version'],
+                         {'number': '0.20.5'})
+
+    def test_templates(self):
+        self.client.create_template('t1', {
+            'template': 'test_*',
+            'settings': {'number_of_shards': 3},
+        })
+        self.client.create_index('test_1')
+        self.assertEqual(self.client.status('test_1')['_shards']['total'], 3)
+        self.assertEqual(list(self.client.list_templates().keys()), ['t1'])
+        self.client.delete_template('t1')
+        self.assertFalse(self.client.get_template('t1'))
+
+    def test_isolated(self):
+        for isolation in ('delete', 'snapshot', 'namespace'):
+            with isolated(self.cluster, isolation=isolation) as iso:
+                iso.es_client.index(iso.prefixed('documents'), 'doc',
+                                    {'foo': 1})
+            self.assertEqual(self.client.status()['indices'], {})
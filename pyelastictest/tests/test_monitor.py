@@ -0,0 +1,67 @@
+import os
+import time
+from unittest import TestCase
+
+
+class TestResourceMonitor(TestCase):
+
+    def setUp(self):
+        self._cluster = None
+
+    def tearDown(self):
+        if self._cluster is not None:
+            self._cluster.terminate()
+
+    def test_read_proc_stat(self):
+        from pyelastictest.monitor import read_proc_stat
+        cpu, rss = read_proc_stat(os.getpid())
+        self.assertTrue(cpu >= 0)
+        self.assertTrue(rss > 0)
+        self.assertEqual(read_proc_stat(-1), (None, None))
+
+    def test_parse_node_stats(self):
+        from pyelastictest.monitor import parse_node_stats
+        stats = {'nodes': {'abc': {
+            'jvm': {
+                'mem': {'heap_used_in_bytes': 10,
+                        'heap_committed_in_bytes': 20},
+                'gc': {'collection_count': 3,
+                       'collection_time_in_millis': 40},
+            },
+            'thread_pool': {'index': {'rejected': 1},
+                            'search': {'rejected': 2}},
+        }}}
+        self.assertEqual(parse_node_stats(stats), (10, 20, 3, 40, 3))
+        self.assertEqual(parse_node_stats({}), (None,) * 5)
+
+    def test_summary(self):
+        from pyelastictest.monitor import ResourceMonitor
+        from pyelastictest.monitor import Sample
+        monitor = ResourceMonitor(None, size=2)
+        monitor.samples['node'] = []
+        for sample in (Sample(0.0, 1.0, 100, 10, 50, 1, 0, None),
+                       Sample(2.0, 2.0, 300, 30, 50, 3, 100, None)):
+            monitor.samples['node'].append(sample)
+        summary = monitor.summary()['node']
+        self.assertEqual(summary['cpu_percent'], 50.0)
+        self.assertEqual(summary['rss'], 300)
+        self.assertEqual(summary['gc_count'], 2)
+        self.assertEqual(summary['gc_seconds'], 0.1)
+        self.assertEqual(summary['gc_percent'], 5.0)
+        self.assertEqual(summary['rejected'], None)
+        report = {}
+        monitor.attach(report, 'test')
+        self.assertEqual(report['resources']['test']['samples']['node'][1],
+                         [2.0, 2.0, 300, 30, 50, 3, 100, None])
+
+    def test_cluster(self):
+        from pyelastictest.cluster import Cluster
+        cluster = self._cluster = Cluster(monitor_interval=0.1)
+        cluster.start()
+        time.sleep(0.5)
+        cluster.stop()
+        self.assertFalse(cluster.monitor.running)
+        summary = cluster.monitor.summary()[cluster[0].name]
+        self.assertTrue(summary['samples'] > 1)
+        self.assertTrue(summary['rss'] > 0)
+        self.assertTrue(summary['heap_used'] > 0)
@@ -1,8 +1,12 @@
+import time
+from unittest import TestCase
+
 from requests.exceptions import ConnectionError
 from pyelasticsearch import ElasticSearch
 
 from pyelastictest import IsolatedTestCase
 from pyelastictest.cluster import Cluster
+from pyelastictest.node import get_profile
 
 
 class TestIsolatedTestCase(IsolatedTestCase):
@@ -27,3 +31,57 @@ class TestIsolatedTestCase(IsolatedTestCase):
 
         self.cluster[0].stop()
         self.assertEqual(es_health()['number_of_nodes'], 2)
+
+    def test_wait_until_started_exited(self):
+        node = self.cluster[0]
+        node.process.kill()
+        node.process.wait()
+        begin = time.time()
+        self.assertRaises(OSError, node.wait_until_started, 30)
+        self.assertTrue(time.time() - begin < 5)
+
+    def test_log_view(self):
+        node = self.cluster[0]
+        view = node.log_view()
+        try:
+            self.assertTrue(b'started' in view[:])
+        finally:
+            view.close()
+        self.assertTrue(node.stdout.tail())
+
+    def test_restart(self):
+        node = self.cluster[1]
+        port = node.port
+        client = self.cluster.client
+        client.index('test', 'doc', {'foo': 1}, id=1)
+        client.refresh('test')
+        result = node.restart()
+        self.assertEqual(node.port, port)
+        self.assertTrue(result['seconds'] >= result['joined'])
+        self.assertEqual(result, node.timings['restart'])
+        self.assertEqual(client.get('test', 'doc', 1)['_source'], {'foo': 1})
+
+    def test_jvm_settings(self):
+        settings = self.cluster[0].jvm_settings
+        self.assertEqual(settings['profile'], 'fast-start')
+        self.assertEqual(settings['ES_MIN_MEM'], '64m')
+        self.assertTrue('-Xshare:auto' in settings['JAVA_OPTS'])
+
+
+class TestProfile(TestCase):
+
+    def test_named(self):
+        profile = get_profile('throughput')
+        self.assertEqual(profile['name'], 'throughput')
+        self.assertEqual(profile['max_memory'], '1g')
+
+    def test_overrides(self):
+        profile = get_profile({'base': 'low-memory', 'max_memory': '256m'})
+        self.assertEqual(profile['name'], 'low-memory')
+        self.assertEqual(profile['max_memory'], '256m')
+        self.assertEqual(profile['gc'], 'serial')
+        self.assertEqual(get_profile(profile), profile)
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, get_profile, 'turbo')
+        self.assertRaises(ValueError, get_profile, {'gc': 'zgc'})
@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+
+class TestClusterPool(TestCase):
+
+    def setUp(self):
+        self.pool_path = tempfile.mkdtemp()
+        self._pool = None
+
+    def tearDown(self):
+        if self._pool is not None:
+            self._pool.stop()
+        shutil.rmtree(self.pool_path, ignore_errors=True)
+
+    def _make_one(self, **kw):
+        from pyelastictest.pool import ClusterPool
+        self._pool = ClusterPool(self.pool_path, interval=0.5, **kw)
+        return self._pool
+
+    def _lease(self, **kw):
+        from pyelastictest.pool import lease_cluster
+        return lease_cluster(self.pool_path, **kw)
+
+    def test_lease_without_pool(self):
+        self.assertRaises(OSError, self._lease, timeout=0.2)
+
+    def test_is_pool_running(self):
+        from pyelastictest.pool import is_pool_running
+        self.assertFalse(is_pool_running(self.pool_path))
+        pool = self._make_one(size=0)
+        pool.start()
+        self.assertTrue(is_pool_running(self.pool_path))
+        from pyelastictest.pool import ClusterPool
+        self.assertRaises(OSError, ClusterPool(self.pool_path, size=0).start)
+        pool.stop()
+        self.assertFalse(is_pool_running(self.pool_path))
+
+    def test_idle_timeout(self):
+        from pyelastictest.pool import is_pool_running
+        pool = self._make_one(size=0, idle_timeout=0.2)
+        pool.interval = 0.05
+        begin = time.time()
+        pool.serve_forever()
+        self.assertTrue(time.time() - begin >= 0.2)
+        self.assertFalse(is_pool_running(self.pool_path))
+
+    def test_lease_release(self):
+        pool = self._make_one(size=1)
+        pool.start()
+        self.assertTrue(pool.wait(60))
+        lease = self._lease()
+        self.assertTrue(lease.cluster.is_healthy())
+        lease.cluster.client.index('documents', 'doc', {'foo': 1})
+        # the only cluster is leased
+        self.assertRaises(OSError, self._lease, timeout=0.2)
+        name = lease.cluster.name
+        lease.release()
+        lease = self._lease()
+        self.assertEqual(lease.cluster.name, name)
+        self.assertEqual(lease.cluster.client.status()['indices'], {})
+        lease.release()
+
+    def test_replace_dead_cluster(self):
+        pool = self._make_one(size=1)
+        pool.start()
+        self.assertTrue(pool.wait(60))
+        name = pool.clusters[0].name
+        pool.clusters[0].stop()
+        pool.check()
+        self.assertTrue(pool.wait(60))
+        self.assertNotEqual(pool.clusters[0].name, name)
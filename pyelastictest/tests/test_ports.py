@@ -0,0 +1,111 @@
+import shutil
+import socket
+import tempfile
+from unittest import TestCase
+
+
+class TestPortAllocator(TestCase):
+
+    def setUp(self):
+        self.port_path = tempfile.mkdtemp()
+        self._allocators = []
+
+    def tearDown(self):
+        for allocator in self._allocators:
+            allocator.release_all()
+        shutil.rmtree(self.port_path, ignore_errors=True)
+
+    def _make_one(self):
+        from pyelastictest.ports import PortAllocator
+        allocator = PortAllocator(port_path=self.port_path)
+        self._allocators.append(allocator)
+        return allocator
+
+    def _bind(self, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.bind(('127.0.0.1', port))
+        except socket.error:
+            return False
+        finally:
+            sock.close()
+        return True
+
+    def test_reserve(self):
+        allocator = self._make_one()
+        ports = set(allocator.reserve() for i in range(10))
+        self.assertEqual(len(ports), 10)
+        for port in ports:
+            self.assertFalse(self._bind(port))
+
+    def test_unbind(self):
+        allocator = self._make_one()
+        port = allocator.reserve()
+        allocator.unbind(port)
+        self.assertTrue(self._bind(port))
+        self.assertTrue(port in allocator._locks)
+
+    def test_unbound_port_stays_reserved(self):
+        first = self._make_one()
+        port = first.reserve()
+        first.unbind(port)
+        second = self._make_one()
+        # the OS might hand out the same port again, but the lock file
+        # keeps the second allocator from reserving it
+        ports = [second.reserve() for i in range(20)]
+        self.assertFalse(port in ports)
+
+    def test_release(self):
+        first = self._make_one()
+        port = first.reserve()
+        first.release(port)
+        self.assertEqual(first._sockets, {})
+        self.assertEqual(first._locks, {})
+        from pyelastictest.ports import lock_file
+        lock = lock_file('%s/%s.lock' % (self.port_path, port))
+        self.assertTrue(lock is not None)
+        lock.close()
+
+    def test_release_all(self):
+        allocator = self._make_one()
+        for i in range(3):
+            allocator.reserve()
+        allocator.release_all()
+        self.assertEqual(allocator._locks, {})
+
+
+class TestPortBindError(TestCase):
+
+    def test_pattern(self):
+        from pyelastictest.ports import BIND_ERROR_PATTERN
+        line = ('org.elasticsearch.transport.BindTransportException: '
+                'Failed to bind to [9300]')
+        self.assertTrue(BIND_ERROR_PATTERN.search(line))
+        self.assertFalse(BIND_ERROR_PATTERN.search('[node] started'))
+
+    def test_is_os_error(self):
+        from pyelastictest.ports import PortBindError
+        error = PortBindError('taken', node='node')
+        self.assertTrue(isinstance(error, OSError))
+        self.assertEqual(error.node, 'node')
+
+
+class TestInheritance(TestCase):
+
+    def setUp(self):
+        self.port_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.port_path, ignore_errors=True)
+
+    def test_not_inherited(self):
+        import fcntl
+        from pyelastictest.ports import PortAllocator
+        allocator = PortAllocator(port_path=self.port_path)
+        try:
+            port = allocator.reserve()
+            for fd in (allocator._sockets[port], allocator._locks[port]):
+                flags = fcntl.fcntl(fd.fileno(), fcntl.F_GETFD)
+                self.assertTrue(flags & fcntl.FD_CLOEXEC)
+        finally:
+            allocator.release_all()
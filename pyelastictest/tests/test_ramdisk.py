@@ -0,0 +1,107 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+
+class TestRamdisk(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def test_parse_size(self):
+        from pyelastictest.ramdisk import parse_size
+        self.assertEqual(parse_size('512'), 512)
+        self.assertEqual(parse_size('2k'), 2048)
+        self.assertEqual(parse_size('1.5M'), 1536 * 1024)
+        self.assertEqual(parse_size('2gb'), 2 * 1024 ** 3)
+        self.assertEqual(parse_size(100), 100)
+        self.assertRaises(ValueError, parse_size, 'lots')
+
+    def test_get_ram_budget(self):
+        from pyelastictest.ramdisk import get_ram_budget
+        from pyelastictest.ramdisk import RAM_NODE_SIZE
+        self.assertEqual(get_ram_budget('1m'), 1024 ** 2)
+        old = os.environ.pop('ES_RAM_BUDGET', None)
+        try:
+            self.assertEqual(get_ram_budget(size=3), 3 * RAM_NODE_SIZE)
+        finally:
+            if old is not None:
+                os.environ['ES_RAM_BUDGET'] = old
+
+    def test_get_ram_path(self):
+        from pyelastictest.ramdisk import get_ram_path
+        self.assertEqual(get_ram_path(self.path), self.path)
+        self.assertRaises(ValueError, get_ram_path,
+                          os.path.join(self.path, 'missing'))
+
+    def test_is_ram_backed(self):
+        from pyelastictest.ramdisk import is_ram_backed
+        mounts = os.path.join(self.path, 'mounts')
+        with open(mounts, 'w') as fd:
+            fd.write('/dev/sda1 / ext4 rw 0 0\n'
+                     'tmpfs /dev/shm tmpfs rw 0 0\n')
+        self.assertTrue(is_ram_backed('/dev/shm', mounts))
+        self.assertTrue(is_ram_backed('/dev/shm/foo', mounts))
+        self.assertFalse(is_ram_backed('/dev/shmfoo', mounts))
+        self.assertFalse(is_ram_backed('/tmp', mounts))
+        self.assertTrue(is_ram_backed('/', self.path + '/missing') is None)
+
+    def test_disk_usage(self):
+        from pyelastictest.ramdisk import disk_usage
+        empty = disk_usage(self.path)
+        name = os.path.join(self.path, 'data')
+        with open(name, 'w') as fd:
+            fd.write('x' * 100000)
+        used = disk_usage(self.path)
+        self.assertTrue(used >= empty + 100000)
+        # hardlinks are counted once
+        os.link(name, os.path.join(self.path, 'link'))
+        self.assertEqual(disk_usage(self.path), used)
+
+
+class TestRamCluster(TestCase):
+
+    def setUp(self):
+        self.ram_path = tempfile.mkdtemp()
+        self._cluster = None
+
+    def tearDown(self):
+        if self._cluster is not None:
+            self._cluster.terminate()
+        shutil.rmtree(self.ram_path, ignore_errors=True)
+
+    def _make_one(self, **kw):
+        from pyelastictest.cluster import Cluster
+        self._cluster = Cluster(backend='memory', ram_path=self.ram_path,
+                                **kw)
+        return self._cluster
+
+    def _add_node(self, cluster):
+        node = cluster._create_node(0, 0)
+        cluster.nodes.append(node)
+        return node
+
+    def test_budget(self):
+        from pyelastictest.ramdisk import RAM_NODE_SIZE
+        cluster = self._make_one(size=2, ram_budget=RAM_NODE_SIZE)
+        self.assertTrue(cluster.working_path.startswith(self.ram_path))
+        first = self._add_node(cluster)
+        second = self._add_node(cluster)
+        self.assertTrue(cluster.in_ram(first))
+        self.assertFalse(cluster.in_ram(second))
+        self.assertTrue(second.working_path.startswith(cluster.disk_path))
+
+    def test_disk_usage_at_teardown(self):
+        cluster = self._make_one()
+        node = self._add_node(cluster)
+        with open(os.path.join(node.working_path, 'data'), 'w') as fd:
+            fd.write('x' * 100000)
+        cluster.terminate()
+        usage = cluster.disk_usage[node.name]
+        self.assertTrue(usage['in_ram'])
+        self.assertTrue(usage['bytes'] >= 100000)
+        self.assertFalse(os.path.exists(cluster.working_path))
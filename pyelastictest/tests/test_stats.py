@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+
+class TestStats(TestCase):
+
+    def test_percentile(self):
+        from pyelastictest.stats import percentile
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 100), 5)
+        self.assertEqual(percentile([1, 2], 50), 1.5)
+        self.assertRaises(ValueError, percentile, [], 50)
+
+    def test_summarize(self):
+        from pyelastictest.stats import summarize
+        result = summarize([1, 2, 3, 4])
+        self.assertEqual(result['count'], 4)
+        self.assertEqual(result['mean'], 2.5)
+        self.assertEqual(result['p50'], 2.5)
+        self.assertEqual(result['max'], 4)
+
+
+class TestHistogram(TestCase):
+
+    def test_percentiles(self):
+        from pyelastictest.stats import Histogram
+        histogram = Histogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000.0)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.percentile(50), 0.5, 2)
+        self.assertAlmostEqual(histogram.percentile(99), 0.99, 2)
+
+    def test_merge(self):
+        from pyelastictest.stats import Histogram
+        first = Histogram()
+        first.record(0.001)
+        second = Histogram(first.to_dict())
+        second.record(0.002)
+        first.merge(second)
+        self.assertEqual(first.count, 3)
+        self.assertEqual(Histogram().summarize(), {'count': 0})
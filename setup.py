@@ -47,4 +47,12 @@ setup(
     extras_require={
         'test': tests_require,
     },
+    entry_points={
+        'console_scripts': [
+            'pyelastictest = pyelastictest.command:main',
+        ],
+        'nose.plugins.0.10': [
+            'elasticsearch = pyelastictest.noseplugin:BackgroundBoot',
+        ],
+    },
 )